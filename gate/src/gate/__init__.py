@@ -2,6 +2,7 @@
 
 from gate.config import (
     EXPORT_CONFIG_FILENAME,
+    STATE_DIR_NAME,
     TRANSCRIPT_DIR_NAME,
     GateConfig,
     TranscriptUploadConfig,
@@ -10,6 +11,7 @@ from gate.logic import should_continue, write_output
 
 __all__ = [
     "EXPORT_CONFIG_FILENAME",
+    "STATE_DIR_NAME",
     "TRANSCRIPT_DIR_NAME",
     "GateConfig",
     "TranscriptUploadConfig",
@@ -0,0 +1,177 @@
+"""asyncio upload engine for very high transcript file counts.
+
+The default engine gives each upload a thread, which is the right trade-off for a
+handful of large transcripts but not for thousands of small subagent files. With
+``TRANSCRIPT_UPLOAD_ASYNC`` set, small files are instead sent from a single event loop
+through an aiobotocore client (optional dependency, ``pip install gate[async]``):
+
+- a semaphore keeps up to ``async_concurrency`` PutObject requests in flight, and
+  the client's connection pool is sized to match so they share warm connections;
+- each small file is read, transformed and encoded in a worker thread
+  (:func:`asyncio.to_thread`), so EFS reads and redaction never stall the loop;
+- files that need multipart uploads (larger than ``part_size``) and shards are still
+  handed to the threaded path via :func:`asyncio.to_thread`, bounded by the usual
+  worker count, so journaling and buffer pooling behave exactly as before.
+
+Redaction, packing, compression, checksums, bandwidth shaping and index sidecars apply
+to both paths.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any, Protocol
+
+from gate.compaction import UploadedFile
+from gate.config import TranscriptUploadConfig
+from gate.sharding import ShardStats
+from gate.streaming import checksum_kwargs
+from gate.transcript_upload import (
+    UploadContext,
+    UploadEntry,
+    _new_indexers,
+    _record_progress,
+    _sidecars,
+    _upload_task,
+    _with_credentials,
+)
+
+logger = logging.getLogger("gate")
+
+UploadResult = tuple[UploadEntry, UploadedFile | Exception]
+
+
+class AsyncS3Uploader(Protocol):
+    """The async S3 call used for small files (an aiobotocore client satisfies it)."""
+
+    async def put_object(
+        self, *, Bucket: str, Key: str, Body: bytes, ContentType: str, **kwargs: Any
+    ) -> Any: ...
+
+
+def aiobotocore_available() -> bool:
+    return importlib.util.find_spec("aiobotocore") is not None
+
+
+def run_async_uploads(
+    ctx: UploadContext,
+    tasks: list[tuple[UploadEntry, ShardStats | None]],
+    config: TranscriptUploadConfig,
+    threads: int,
+    uploader: AsyncS3Uploader | None = None,
+) -> list[UploadResult]:
+    """Upload ``tasks`` from an event loop; returns each entry with its result or error."""
+
+    async def _main() -> list[UploadResult]:
+        if uploader is not None:
+            return await upload_entries(ctx, tasks, uploader, config.async_concurrency, threads)
+        async with _create_client(config) as client:
+            return await upload_entries(ctx, tasks, client, config.async_concurrency, threads)
+
+    return asyncio.run(_main())
+
+
+async def upload_entries(
+    ctx: UploadContext,
+    tasks: list[tuple[UploadEntry, ShardStats | None]],
+    uploader: AsyncS3Uploader,
+    concurrency: int,
+    threads: int,
+) -> list[UploadResult]:
+    requests = asyncio.Semaphore(concurrency)
+    large = asyncio.Semaphore(threads)
+
+    async def _one(entry: UploadEntry, shard: ShardStats | None) -> UploadResult:
+        started = time.monotonic()
+        result: UploadedFile | Exception
+        try:
+            end = os.path.getsize(entry.file_path) if entry.end is None else entry.end
+            if shard is not None or end - entry.start > ctx.part_size:
+                async with large:
+                    started = time.monotonic()
+                    result = await asyncio.to_thread(_upload_task, ctx, entry, shard)
+            else:
+                async with requests:
+                    started = time.monotonic()
+                    result = await _put_small(ctx, uploader, entry)
+        except Exception as exc:
+            result = exc
+        _record_progress(ctx, entry, result, time.monotonic() - started)
+        return entry, result
+
+    return await asyncio.gather(*(_one(entry, shard) for entry, shard in tasks))
+
+
+async def _put_small(
+    ctx: UploadContext, uploader: AsyncS3Uploader, entry: UploadEntry
+) -> UploadedFile:
+    """Send a file that fits in one request, reading and transforming it off the loop."""
+    logger.debug("Uploading transcript: %s", entry.key)
+    uploaded, data, encoding, sidecars = await asyncio.to_thread(_prepare_small, ctx, entry)
+    if ctx.throttle is not None:
+        await asyncio.to_thread(ctx.throttle.consume, len(data))
+    await uploader.put_object(
+        Bucket=ctx.bucket_name,
+        Key=entry.key,
+        Body=data,
+        ContentType="application/jsonl",
+        **encoding,
+        **checksum_kwargs(ctx.checksum_algorithm, data),
+    )
+    for key, index in sidecars:
+        await uploader.put_object(
+            Bucket=ctx.bucket_name,
+            Key=key,
+            Body=index,
+            ContentType="application/json",
+            **checksum_kwargs(ctx.checksum_algorithm, index),
+        )
+    return uploaded
+
+
+def _prepare_small(
+    ctx: UploadContext, entry: UploadEntry
+) -> tuple[UploadedFile, bytes, dict[str, Any], list[tuple[str, bytes]]]:
+    """Read, transform, index and encode a small file (blocking: runs in a worker thread).
+
+    Returns the file's stat snapshot, the request body with its encoding arguments, and
+    the index sidecars as (key, body) pairs.
+    """
+    with open(entry.file_path, "rb") as f:
+        st = os.fstat(f.fileno())
+        f.seek(entry.start)
+        # Bounded by the stat snapshot, so later appends are left for the next run
+        raw = f.read((st.st_size if entry.end is None else entry.end) - entry.start)
+    packed, text = ctx.transform_with_text(memoryview(raw), entry)
+    body = bytes(packed)
+    indexers = _new_indexers(ctx)
+    for _, indexer in indexers:
+        indexer.feed(text if indexer.reads_values else body)
+    data, encoding = ctx.encode(body)
+    uploaded = UploadedFile(entry.key, entry.file_path, st.st_size, st.st_mtime_ns)
+    return uploaded, bytes(data), encoding, _sidecars(entry.key, indexers)
+
+
+@asynccontextmanager
+async def _create_client(config: TranscriptUploadConfig) -> AsyncIterator[AsyncS3Uploader]:
+    """Build an aiobotocore S3 client whose connection pool matches the request limit."""
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+
+    client_kwargs: dict[str, Any] = {
+        "region_name": config.region,
+        "config": AioConfig(max_pool_connections=config.async_concurrency),
+    }
+    if config.endpoint_url:
+        client_kwargs["endpoint_url"] = config.endpoint_url
+    if config.assume_role_arn:
+        config = await asyncio.to_thread(_with_credentials, config)
+        client_kwargs.update(config.credentials or {})
+    async with get_session().create_client("s3", **client_kwargs) as client:
+        yield client
@@ -1,18 +1,20 @@
 """CLI entry point: argument parsing, orchestration, error handling."""
 
+from __future__ import annotations
+
 import argparse
 import logging
 import sys
+from typing import TYPE_CHECKING
+
+from gate import log_queue, logic
+from gate.config import GateConfig, ProfilingConfig, TranscriptUploadConfig
 
-from gate import logic
-from gate.config import GateConfig, TranscriptUploadConfig
+if TYPE_CHECKING:
+    from gate.upload_setup import UploadSetup
 
-logging.basicConfig(
-    stream=sys.stderr,
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-    datefmt="%Y-%m-%dT%H:%M:%S",
-)
+# Records are written to stderr by a background thread (see gate.log_queue)
+log_queue.configure(sys.stderr)
 logger = logging.getLogger("gate")
 
 
@@ -31,6 +33,15 @@ def main() -> None:
         raise SystemExit(2)
 
     config = GateConfig.from_env()
+    upload_config = TranscriptUploadConfig.from_env()
+    # Client set-up and the directory scan run while the decision is made and written
+    setup = None
+    if upload_config is not None:
+        from gate import upload_setup
+
+        setup = upload_setup.start(
+            upload_config, config.transcript_dir, config.state_dir, args.depth
+        )
 
     continuing, reason = logic.should_continue(
         config, args.export_config, args.depth, args.max_depth
@@ -46,21 +57,71 @@ def main() -> None:
     logic.write_output("true" if continuing else "false", args.output)
 
     # Upload transcripts to S3 (independent of routing decision)
-    _upload_transcripts(config)
-
-
-def _upload_transcripts(config: GateConfig) -> None:
-    """Upload transcripts to S3 if AWS config is available. Failures are logged, not raised."""
-    upload_config = TranscriptUploadConfig.from_env()
+    _upload_transcripts(config, args.depth, final=not continuing, setup=setup)
+
+
+def _upload_transcripts(
+    config: GateConfig,
+    depth: int,
+    final: bool = False,
+    setup: UploadSetup | None = None,
+) -> None:
+    """Upload transcripts to S3 if AWS config is available. Failures are logged, not raised.
+
+    Files that fail are spooled in the state directory and retried first by the next
+    run; on the ``final`` cycle (the workflow stops) the spool is flushed before exiting.
+    Cycles the upload policy skips send no new files but still drain the spool, so that
+    it does not grow until the final cycle (see :mod:`gate.upload_policy`).
+    ``setup`` is the client and scan started before the decision, if any (see
+    :mod:`gate.upload_setup`).
+    """
+    upload_config = setup.config if setup is not None else TranscriptUploadConfig.from_env()
     if upload_config is None:
         logger.info("Transcript upload skipped: AWS_S3_BUCKET_NAME not configured")
         return
 
     try:
+        from gate.spool import has_spooled
+        from gate.upload_policy import record_upload, should_upload
+
+        due, reason = should_upload(
+            upload_config, config.transcript_dir, config.state_dir, depth, final
+        )
+        if not due:
+            logger.info(
+                "Transcript upload deferred: policy=%s (%s)", upload_config.upload_policy, reason
+            )
+            if has_spooled(config.state_dir):
+                from gate.transcript_upload import upload_transcripts
+
+                count = upload_transcripts(
+                    config.transcript_dir,
+                    upload_config,
+                    state_dir=config.state_dir,
+                    depth=depth,
+                    spool_only=True,
+                )
+                logger.info("Spool drained: %d file(s)", count)
+            return
+
         from gate.transcript_upload import upload_transcripts
 
-        count = upload_transcripts(config.transcript_dir, upload_config)
+        uploader, transcript_files = None, None
+        if setup is not None:
+            upload_config, uploader = setup.uploader()
+            transcript_files = setup.transcript_files()
+        count = upload_transcripts(
+            config.transcript_dir,
+            upload_config,
+            uploader,
+            state_dir=config.state_dir,
+            depth=depth,
+            final=final,
+            transcript_files=transcript_files,
+        )
         logger.info("Transcript upload complete: %d file(s)", count)
+        if upload_config.upload_policy == "bytes":
+            record_upload(config.transcript_dir, config.state_dir)
     except Exception:
         logger.exception("Transcript upload failed (non-fatal)")
 
@@ -78,7 +139,22 @@ def _write_fallback_output() -> None:
 
 
 def run() -> None:
-    """Entry point with error handling. Always produces output."""
+    """Entry point with error handling. Always produces output.
+
+    With ``GATE_PROFILE`` set, the whole run is profiled (see :mod:`gate.profiling`).
+    """
+    profiling = ProfilingConfig.from_env()
+    if profiling is None:
+        _run()
+        return
+
+    from gate.profiling import profile_run
+
+    with profile_run(profiling, GateConfig.from_env().state_dir):
+        _run()
+
+
+def _run() -> None:
     try:
         main()
     except SystemExit:
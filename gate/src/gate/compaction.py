@@ -0,0 +1,117 @@
+"""Post-upload compaction of the shared transcript directory.
+
+Transcripts accumulate in ``<work_dir>/.transcripts`` across every depth of a workflow,
+so without compaction each gate run rescans (and re-uploads) the whole history. Once
+every file of a session has been uploaded, compaction takes the session out of the
+scanned tree:
+
+- ``move``:   rename ``<sid>.jsonl`` and ``<sid>/`` into ``<work_dir>/.gate/archive/``
+- ``delete``: remove the uploaded files
+- ``stub``:   remove the uploaded files, leaving ``<sid>.uploaded.json`` (never scanned)
+  that records which keys and sizes were archived
+
+Safety: a session is only compacted if each of its files still has the size and mtime
+it had when it was read for upload, so nothing written after the upload is lost. The
+agent's ``collect_transcripts`` only ever copies the current pod's sessions into the
+directory (a re-copied session simply reappears and is uploaded again), and the session
+ID it reports is derived from ``$CLAUDE_DIR``, not from this directory.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+
+from gate.config import COMPACTION_MODES
+
+logger = logging.getLogger("gate")
+
+ARCHIVE_DIR_NAME = "archive"
+STUB_SUFFIX = ".uploaded.json"
+
+
+@dataclass(frozen=True, slots=True)
+class UploadedFile:
+    """A file confirmed uploaded, with the stat snapshot taken when it was read."""
+
+    key: str
+    file_path: str
+    size: int
+    mtime_ns: int
+
+    def unchanged(self) -> bool:
+        try:
+            st = os.stat(self.file_path)
+        except OSError:
+            return False
+        return st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+
+
+def compact_session(
+    transcript_dir: str,
+    session_id: str,
+    uploaded: list[UploadedFile],
+    mode: str,
+    state_dir: str | None = None,
+) -> bool:
+    """Compact one fully-uploaded session. Returns True if it was compacted."""
+    if mode not in COMPACTION_MODES:
+        raise ValueError(f"unknown compaction mode: {mode}")
+
+    main_path = os.path.join(transcript_dir, f"{session_id}.jsonl")
+    session_dir = os.path.join(transcript_dir, session_id)
+    if not all(f.unchanged() for f in uploaded):
+        logger.info("Session changed after upload, not compacting: %s", session_id)
+        return False
+    uploaded_paths = {f.file_path for f in uploaded}
+    if main_path not in uploaded_paths or _has_unuploaded(session_dir, uploaded_paths):
+        logger.info("Session has files that were not uploaded, not compacting: %s", session_id)
+        return False
+
+    if mode == "move":
+        if state_dir is None:
+            logger.warning("Compaction mode 'move' needs a state directory; skipping")
+            return False
+        archive_dir = os.path.join(state_dir, ARCHIVE_DIR_NAME)
+        os.makedirs(archive_dir, exist_ok=True)
+        os.replace(main_path, os.path.join(archive_dir, f"{session_id}.jsonl"))
+        if os.path.isdir(session_dir):
+            target = os.path.join(archive_dir, session_id)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(session_dir, target)
+    else:
+        if mode == "stub":
+            _write_stub(os.path.join(transcript_dir, f"{session_id}{STUB_SUFFIX}"), uploaded)
+        for path in uploaded_paths:  # a sharded file appears once per shard
+            os.remove(path)
+        _remove_empty_dirs(session_dir)
+    return True
+
+
+def _has_unuploaded(session_dir: str, uploaded_paths: set[str]) -> bool:
+    """True if the session's subagent directory holds a .jsonl file that was not uploaded."""
+    subagent_dir = os.path.join(session_dir, "subagents")
+    if not os.path.isdir(subagent_dir):
+        return False
+    return any(
+        name.endswith(".jsonl") and os.path.join(subagent_dir, name) not in uploaded_paths
+        for name in os.listdir(subagent_dir)
+    )
+
+
+def _write_stub(path: str, uploaded: list[UploadedFile]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"files": [{"key": u.key, "size": u.size} for u in uploaded]}, f)
+    os.replace(tmp, path)
+
+
+def _remove_empty_dirs(session_dir: str) -> None:
+    for path in (os.path.join(session_dir, "subagents"), session_dir):
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass  # missing, or still holds non-transcript files
@@ -2,12 +2,114 @@
 
 from __future__ import annotations
 
+import json
+import logging
 import os
-from dataclasses import dataclass
+import string
+from dataclasses import dataclass, field
+
+logger = logging.getLogger("gate")
 
 # Filename constants (keep in sync with export-handler/src/constants.ts)
 EXPORT_CONFIG_FILENAME = "export_config.json"
 TRANSCRIPT_DIR_NAME = ".transcripts"
+# Gate-private state (upload journals etc.); lives beside, never inside, the transcript dir
+STATE_DIR_NAME = ".gate"
+
+MIB = 1024 * 1024
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+S3_MIN_PART_SIZE = 5 * MIB
+DEFAULT_PART_SIZE = 8 * MIB
+DEFAULT_ASYNC_CONCURRENCY = 256
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_BUDGET = 0.1
+# Hedged bytes may never come close to the bytes sent (hedging must not double traffic)
+MAX_HEDGE_BUDGET = 0.5
+# S3 additional checksums computable with the stdlib (CRC32C/CRC64NVME need awscrt)
+CHECKSUM_ALGORITHMS = ("CRC32", "SHA256")
+DEFAULT_CHECKSUM_ALGORITHM = "CRC32"
+# Post-upload transcript directory compaction modes (see gate.compaction)
+COMPACTION_MODES = ("move", "delete", "stub")
+# When a cycle uploads (see gate.upload_policy); "" / "off" mean "always"
+UPLOAD_POLICIES = ("always", "every", "final", "bytes")
+DEFAULT_UPLOAD_MIN_BYTES = 16 * MIB
+# Where packed-out blobs live: per session or shared by all sessions (see gate.packing)
+PACKING_SCOPES = ("session", "global")
+DEFAULT_PACKING_MIN_SIZE = 4 * 1024
+DEFAULT_ZSTD_LEVEL = 3
+DEFAULT_ZSTD_MAX_SIZE = 256 * 1024
+# Seconds between aggregated upload progress lines (see gate.progress)
+DEFAULT_PROGRESS_INTERVAL = 10.0
+# Object key templates, rendered below the prefix (see _iter_uploads in
+# gate.transcript_upload). "{path}" is "<session>" for a main transcript and
+# "<session>/<name>" for a subagent's; "legacy" is the original flat layout. The
+# default "partitioned" one has no depth partition, so each cycle overwrites one object
+# per transcript, and its date is the workflow's creation date (when known), so a
+# workflow running past midnight does not start a second copy.
+KEY_TEMPLATE_FIELDS = (
+    "date",
+    "year",
+    "month",
+    "day",
+    "workflow",
+    "workflow_uid",
+    "depth",
+    "role",
+    "session",
+    "name",
+    "path",
+)
+KEY_TEMPLATES = {
+    "legacy": "{path}.jsonl",
+    "partitioned": "date={date}/workflow={workflow}/role={role}/{path}.jsonl",
+}
+DEFAULT_KEY_TEMPLATE = KEY_TEMPLATES["partitioned"]
+# Profiling artifacts: <state_dir>/profiles/<run>/, uploaded under <prefix>/diagnostics/<run>/
+PROFILE_DIR_NAME = "profiles"
+DIAGNOSTICS_PREFIX = "diagnostics"
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float env var, falling back to ``default`` (with a warning) if invalid."""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r (expected number)", name, raw)
+        return default
+
+
+def _env_choice(name: str, choices: tuple[str, ...]) -> str:
+    """Read an optional enumerated env var; empty, "off" or invalid values yield ""."""
+    raw = os.environ.get(name, "").strip().lower()
+    if raw in ("", "off"):
+        return ""
+    if raw in choices:
+        return raw
+    logger.warning("Ignoring invalid %s=%r (expected one of %s)", name, raw, ", ".join(choices))
+    return ""
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean env var ("1", "true", "yes" or "on" enable it); unset gives ``default``."""
+    raw = os.environ.get(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer env var, falling back to ``default`` (with a warning) if invalid."""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r (expected integer)", name, raw)
+        return default
 
 
 @dataclass(frozen=True, slots=True)
@@ -25,6 +127,21 @@ class GateConfig:
             transcript_dir=os.path.join(work_dir, TRANSCRIPT_DIR_NAME),
         )
 
+    @property
+    def state_dir(self) -> str:
+        """Directory for gate-private state, a sibling of the transcript directory."""
+        return os.path.join(os.path.dirname(self.transcript_dir), STATE_DIR_NAME)
+
+
+@dataclass(frozen=True, slots=True)
+class Destination:
+    """An additional bucket every transcript object is also written to (see gate.fanout)."""
+
+    bucket_name: str
+    region: str
+    endpoint_url: str | None = None
+    assume_role_arn: str | None = None
+
 
 @dataclass(frozen=True, slots=True)
 class TranscriptUploadConfig:
@@ -35,6 +152,81 @@ class TranscriptUploadConfig:
     endpoint_url: str | None = None
     prefix: str = ""
     assume_role_arn: str | None = None
+    # STS endpoint for AssumeRole; never one of the S3 endpoints in endpoint_urls
+    sts_endpoint_url: str | None = None
+    # AssumeRole credentials, fetched once and shared by every client built from this
+    # config (see gate.transcript_upload.prepare_uploader)
+    credentials: dict[str, str] | None = field(default=None, repr=False, compare=False)
+    # Candidate endpoints, probed at start-up for the fastest (see gate.endpoints)
+    endpoint_urls: tuple[str, ...] = ()
+    part_size: int = DEFAULT_PART_SIZE
+    checksum_algorithm: str = DEFAULT_CHECKSUM_ALGORITHM
+    # Which cycles upload: "always", "every" (upload_every-th cycle), "final" or "bytes"
+    # (transcripts grew by upload_min_bytes); the final cycle always does
+    upload_policy: str = "always"
+    upload_every: int = 1
+    upload_min_bytes: int = DEFAULT_UPLOAD_MIN_BYTES
+    # Layout of transcript keys below the prefix, and the workflow they are partitioned by
+    key_template: str = DEFAULT_KEY_TEMPLATE
+    workflow_name: str = ""
+    workflow_uid: str = ""
+    # RFC 3339 creation time of the workflow; its date is the "date" partition
+    workflow_created: str = ""
+    # Spread each session's keys over this many hashed sub-prefixes (0 = off; see
+    # gate.key_sharding)
+    key_shards: int = 0
+    # Aggregate upload bandwidth cap in bytes/s shared by all upload threads (0 = unlimited)
+    bandwidth_limit: int = 0
+    bandwidth_burst: int = 0
+    bandwidth_min_share: int = 0
+    # Send small files from an asyncio engine (needs aiobotocore) instead of threads
+    async_uploads: bool = False
+    async_concurrency: int = DEFAULT_ASYNC_CONCURRENCY
+    # Duplicate single-request PUTs slower than this latency percentile (threaded engine;
+    # see gate.hedging)
+    hedging: bool = False
+    hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE
+    # Hedged bytes allowed per byte uploaded
+    hedge_budget: float = DEFAULT_HEDGE_BUDGET
+    # Post-upload compaction of the transcript dir: "" (off), "move", "delete" or "stub"
+    compaction: str = ""
+    # Split transcripts larger than this many bytes into line-aligned shards (0 = off)
+    shard_size: int = 0
+    # Upload an event offset index (<stem>.events.json) beside each transcript object
+    event_index: bool = False
+    # Upload a keyword index (<stem>.keywords.json) beside each transcript object
+    keyword_index: bool = False
+    # Upload the lines appended since the previous cycle as a per-depth delta object
+    deltas: bool = False
+    # Scrub secrets from transcripts before upload (see gate.redaction)
+    redaction: bool = False
+    # Processes for redaction scanning (0 = scan in the upload threads)
+    redaction_workers: int = 0
+    # Move large string values out into content-addressed blobs: "" (off), "session" or
+    # "global" (see gate.packing)
+    packing: str = ""
+    packing_min_size: int = DEFAULT_PACKING_MIN_SIZE
+    # zstd dictionary file for compressing small single-request objects ("" = off; needs
+    # zstandard, see gate.dictionaries)
+    zstd_dictionary: str = ""
+    zstd_level: int = DEFAULT_ZSTD_LEVEL
+    zstd_max_size: int = DEFAULT_ZSTD_MAX_SIZE
+    # Percent of sessions whose main / subagent transcripts are uploaded (see gate.sampling)
+    sample_main_percent: float = 100.0
+    sample_subagent_percent: float = 100.0
+    # Always upload sessions whose main transcript ended in an error
+    sample_keep_errors: bool = True
+    # Buckets that receive a copy of every object besides bucket_name (same keys)
+    destinations: tuple[Destination, ...] = ()
+    # Seconds between "Upload progress" lines, and a file that gets one JSON line per
+    # uploaded object ("" = none; see gate.progress)
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL
+    upload_log: str = ""
+
+    @property
+    def sampling(self) -> bool:
+        """True if some transcripts may be skipped by the sampling policy."""
+        return self.sample_main_percent < 100 or self.sample_subagent_percent < 100
 
     @classmethod
     def from_env(cls) -> TranscriptUploadConfig | None:
@@ -43,13 +235,164 @@ class TranscriptUploadConfig:
         if not bucket:
             return None
         region = os.environ.get("AWS_REGION", "ap-northeast-2")
-        endpoint_url = os.environ.get("AWS_ENDPOINT_URL") or None
+        endpoint_urls = tuple(
+            url for url in os.environ.get("AWS_ENDPOINT_URLS", "").replace(",", " ").split()
+        )
+        endpoint_url = os.environ.get("AWS_ENDPOINT_URL") or next(iter(endpoint_urls), None)
         prefix = os.environ.get("AWS_S3_PREFIX", "").strip("/")
         assume_role_arn = os.environ.get("AWS_ASSUME_ROLE_ARN") or None
+        sts_endpoint_url = (
+            os.environ.get("AWS_STS_ENDPOINT_URL") or os.environ.get("AWS_ENDPOINT_URL") or None
+        )
+        part_size = max(
+            _env_int("TRANSCRIPT_UPLOAD_PART_SIZE_MB", DEFAULT_PART_SIZE // MIB) * MIB,
+            S3_MIN_PART_SIZE,
+        )
         return cls(
             bucket_name=bucket,
             region=region,
             endpoint_url=endpoint_url,
             prefix=prefix,
             assume_role_arn=assume_role_arn,
+            sts_endpoint_url=sts_endpoint_url,
+            endpoint_urls=endpoint_urls,
+            part_size=part_size,
+            checksum_algorithm=_checksum_algorithm_from_env(),
+            upload_policy=_env_choice("TRANSCRIPT_UPLOAD_POLICY", UPLOAD_POLICIES) or "always",
+            upload_every=max(_env_int("TRANSCRIPT_UPLOAD_EVERY", 1), 1),
+            upload_min_bytes=max(
+                int(_env_float("TRANSCRIPT_UPLOAD_MIN_MB", DEFAULT_UPLOAD_MIN_BYTES / MIB) * MIB),
+                0,
+            ),
+            key_template=_key_template_from_env(),
+            workflow_name=os.environ.get("WORKFLOW_NAME", "").strip(),
+            workflow_uid=os.environ.get("WORKFLOW_UID", "").strip(),
+            workflow_created=os.environ.get("WORKFLOW_CREATION_TIMESTAMP", "").strip(),
+            key_shards=max(_env_int("TRANSCRIPT_KEY_SHARDS", 0), 0),
+            bandwidth_limit=max(int(_env_float("TRANSCRIPT_UPLOAD_BANDWIDTH_MIB", 0) * MIB), 0),
+            bandwidth_burst=max(int(_env_float("TRANSCRIPT_UPLOAD_BURST_MIB", 0) * MIB), 0),
+            bandwidth_min_share=max(int(_env_float("TRANSCRIPT_UPLOAD_MIN_SHARE_MIB", 0) * MIB), 0),
+            async_uploads=_env_flag("TRANSCRIPT_UPLOAD_ASYNC"),
+            async_concurrency=max(
+                _env_int("TRANSCRIPT_UPLOAD_ASYNC_CONCURRENCY", DEFAULT_ASYNC_CONCURRENCY), 1
+            ),
+            hedging=_env_flag("TRANSCRIPT_UPLOAD_HEDGE"),
+            hedge_percentile=min(
+                max(_env_float("TRANSCRIPT_UPLOAD_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE), 50),
+                99.9,
+            ),
+            hedge_budget=min(
+                max(_env_float("TRANSCRIPT_UPLOAD_HEDGE_BUDGET", DEFAULT_HEDGE_BUDGET), 0),
+                MAX_HEDGE_BUDGET,
+            ),
+            compaction=_env_choice("TRANSCRIPT_COMPACTION", COMPACTION_MODES),
+            shard_size=max(_env_int("TRANSCRIPT_SHARD_SIZE_MB", 0), 0) * MIB,
+            event_index=_env_flag("TRANSCRIPT_EVENT_INDEX"),
+            keyword_index=_env_flag("TRANSCRIPT_KEYWORD_INDEX"),
+            deltas=_env_flag("TRANSCRIPT_DELTAS"),
+            redaction=_env_flag("TRANSCRIPT_REDACTION"),
+            redaction_workers=max(_env_int("TRANSCRIPT_REDACTION_WORKERS", 0), 0),
+            packing=_env_choice("TRANSCRIPT_PACKING", PACKING_SCOPES),
+            packing_min_size=max(
+                _env_int("TRANSCRIPT_PACKING_MIN_KB", DEFAULT_PACKING_MIN_SIZE // 1024), 1
+            )
+            * 1024,
+            zstd_dictionary=os.environ.get("TRANSCRIPT_ZSTD_DICTIONARY", "").strip(),
+            zstd_level=min(max(_env_int("TRANSCRIPT_ZSTD_LEVEL", DEFAULT_ZSTD_LEVEL), 1), 22),
+            zstd_max_size=max(_env_int("TRANSCRIPT_ZSTD_MAX_KB", DEFAULT_ZSTD_MAX_SIZE // 1024), 0)
+            * 1024,
+            sample_main_percent=_percent_from_env("TRANSCRIPT_SAMPLE_MAIN_PERCENT"),
+            sample_subagent_percent=_percent_from_env("TRANSCRIPT_SAMPLE_SUBAGENT_PERCENT"),
+            sample_keep_errors=_env_flag("TRANSCRIPT_SAMPLE_KEEP_ERRORS", default=True),
+            destinations=_destinations_from_env(region),
+            progress_interval=max(
+                _env_float("TRANSCRIPT_PROGRESS_INTERVAL", DEFAULT_PROGRESS_INTERVAL), 0
+            ),
+            upload_log=os.environ.get("TRANSCRIPT_UPLOAD_LOG", "").strip(),
+        )
+
+
+def _checksum_algorithm_from_env() -> str:
+    """TRANSCRIPT_UPLOAD_CHECKSUM: CRC32 (default), SHA256, or "none" to send no checksum."""
+    raw = os.environ.get("TRANSCRIPT_UPLOAD_CHECKSUM", "").strip().upper()
+    if not raw:
+        return DEFAULT_CHECKSUM_ALGORITHM
+    if raw == "NONE":
+        return ""
+    normalized = raw.replace("-", "")
+    if normalized in CHECKSUM_ALGORITHMS:
+        return normalized
+    logger.warning("Ignoring invalid TRANSCRIPT_UPLOAD_CHECKSUM=%r", raw)
+    return DEFAULT_CHECKSUM_ALGORITHM
+
+
+def _key_template_from_env() -> str:
+    """TRANSCRIPT_KEY_TEMPLATE: "partitioned" (default), "legacy", or a custom template.
+
+    A custom template may only use KEY_TEMPLATE_FIELDS, must end in ".jsonl" (sidecar and
+    delta keys are derived from it) and must keep keys unique: it needs "{path}", or both
+    "{session}" and "{name}". Invalid templates fall back to the default.
+    """
+    raw = os.environ.get("TRANSCRIPT_KEY_TEMPLATE", "").strip().strip("/")
+    if not raw:
+        return DEFAULT_KEY_TEMPLATE
+    if raw.lower() in KEY_TEMPLATES:
+        return KEY_TEMPLATES[raw.lower()]
+    try:
+        fields = {name for _, name, _, _ in string.Formatter().parse(raw) if name is not None}
+    except ValueError:
+        fields = {""}
+    unique = "path" in fields or {"session", "name"} <= fields
+    if fields <= set(KEY_TEMPLATE_FIELDS) and unique and raw.endswith(".jsonl"):
+        return raw
+    logger.warning("Ignoring invalid TRANSCRIPT_KEY_TEMPLATE=%r", raw)
+    return DEFAULT_KEY_TEMPLATE
+
+
+def _percent_from_env(name: str) -> float:
+    """A sample rate in percent, clamped to [0, 100]; unset means 100 (no sampling)."""
+    return min(max(_env_float(name, 100.0), 0.0), 100.0)
+
+
+def _destinations_from_env(default_region: str) -> tuple[Destination, ...]:
+    """AWS_S3_EXTRA_DESTINATIONS: JSON list of {"bucket", "region", "endpoint_url",
+    "assume_role_arn"} objects (only "bucket" is required). Invalid values are ignored.
+    """
+    raw = os.environ.get("AWS_S3_EXTRA_DESTINATIONS", "").strip()
+    if not raw:
+        return ()
+    try:
+        items = json.loads(raw)
+        destinations = tuple(
+            Destination(
+                bucket_name=str(item["bucket"]),
+                region=str(item.get("region") or default_region),
+                endpoint_url=item.get("endpoint_url") or None,
+                assume_role_arn=item.get("assume_role_arn") or None,
+            )
+            for item in items
+        )
+    except (ValueError, TypeError, KeyError, AttributeError):
+        logger.warning("Ignoring invalid AWS_S3_EXTRA_DESTINATIONS=%r", raw)
+        return ()
+    return tuple(d for d in destinations if d.bucket_name)
+
+
+@dataclass(frozen=True, slots=True)
+class ProfilingConfig:
+    """Profiling of the gate run itself (see gate.profiling)."""
+
+    # Number of top allocation sites to record with tracemalloc (0 = tracemalloc off)
+    tracemalloc_top: int = 0
+    # Also upload the artifacts to the transcript bucket under DIAGNOSTICS_PREFIX
+    upload: bool = False
+
+    @classmethod
+    def from_env(cls) -> ProfilingConfig | None:
+        """Return config if GATE_PROFILE is enabled, else None (no profiling)."""
+        if not _env_flag("GATE_PROFILE"):
+            return None
+        return cls(
+            tracemalloc_top=max(_env_int("GATE_PROFILE_TRACEMALLOC", 0), 0),
+            upload=_env_flag("GATE_PROFILE_UPLOAD"),
         )
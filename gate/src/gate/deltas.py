@@ -0,0 +1,117 @@
+"""Per-cycle delta objects: only the lines appended since the previous gate run.
+
+Every upload replaces the whole session object, so a consumer interested in "what
+happened this cycle" would otherwise have to diff full transcripts between depths.
+With deltas enabled, the gate remembers how far into each transcript the previous
+cycle got and uploads the newly appended complete lines as a separate object, keyed
+by the workflow depth:
+
+  <stem>.jsonl -> <stem>.deltas/depth-00003.jsonl
+
+The offsets live in ``<state_dir>/offsets.json``, keyed by the file's path below the
+transcript directory (object keys can change every cycle with a partitioned key
+template). Each entry also holds a fingerprint of the bytes just before the offset; if
+the file shrank or that fingerprint no longer matches (the transcript was rewritten),
+the next delta starts again from the beginning of the file. A trailing line without its
+newline is left for the next cycle, so every delta object is valid JSONL. A delta that
+fails to upload is spooled like a full upload (see :mod:`gate.spool`) and its offset
+advanced, so it is delivered under its own depth's key, even after the last cycle.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger("gate")
+
+DELTAS_SUFFIX = ".deltas"
+OFFSETS_FILENAME = "offsets.json"
+# Version 1 keyed offsets by object key; such files are discarded
+OFFSETS_VERSION = 2
+
+_SCAN_CHUNK = 64 * 1024
+# Bytes ending at a remembered offset whose digest identifies the file's prefix
+_FINGERPRINT_BYTES = 64
+
+
+def delta_key(key: str, depth: int) -> str:
+    """Key of the delta object for ``key`` (a ``.jsonl`` key) at workflow ``depth``."""
+    stem = key[: -len(".jsonl")] if key.endswith(".jsonl") else key
+    return f"{stem}{DELTAS_SUFFIX}/depth-{depth:05d}.jsonl"
+
+
+def last_line_end(file_path: str, start: int, size: int) -> int:
+    """Offset just past the last newline in ``[start, size)``, or ``start`` if there is none."""
+    with open(file_path, "rb") as f:
+        pos = size
+        while pos > start:
+            chunk_start = max(start, pos - _SCAN_CHUNK)
+            f.seek(chunk_start)
+            chunk = f.read(pos - chunk_start)
+            i = chunk.rfind(b"\n")
+            if i >= 0:
+                return chunk_start + i + 1
+            pos = chunk_start
+    return start
+
+
+def _fingerprint(file_path: str, offset: int) -> str:
+    with open(file_path, "rb") as f:
+        f.seek(max(offset - _FINGERPRINT_BYTES, 0))
+        return hashlib.sha256(f.read(min(offset, _FINGERPRINT_BYTES))).hexdigest()[:32]
+
+
+class OffsetTracker:
+    """Per-file byte offsets reached by the previous cycle, persisted in the state dir."""
+
+    def __init__(self, state_dir: str) -> None:
+        self.path = os.path.join(state_dir, OFFSETS_FILENAME)
+        self.offsets: dict[str, dict[str, int | str]] = self._load()
+
+    def _load(self) -> dict[str, dict[str, int | str]]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") != OFFSETS_VERSION:
+                raise ValueError(f"unsupported version {data.get('version')!r}")
+            return dict(data["files"])
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError, KeyError, AttributeError) as exc:
+            logger.warning("Discarding unreadable delta offsets %s: %s", self.path, exc)
+            return {}
+
+    def start(self, key: str, file_path: str, size: int) -> int:
+        """Where this cycle's delta of ``key`` begins: the remembered offset if still valid."""
+        entry = self.offsets.get(key)
+        if entry is None:
+            return 0
+        offset = entry.get("offset")
+        if not isinstance(offset, int) or not 0 < offset <= size:
+            return 0
+        if _fingerprint(file_path, offset) != entry.get("fingerprint"):
+            logger.info("Transcript %s was rewritten; its delta restarts from the beginning", key)
+            return 0
+        return offset
+
+    def plan(self, key: str, file_path: str) -> tuple[int, int] | None:
+        """Byte range of the complete lines appended to ``key`` since the last cycle."""
+        size = os.path.getsize(file_path)
+        start = self.start(key, file_path, size)
+        end = last_line_end(file_path, start, size)
+        return (start, end) if end > start else None
+
+    def advance(self, key: str, file_path: str, offset: int) -> None:
+        self.offsets[key] = {"offset": offset, "fingerprint": _fingerprint(file_path, offset)}
+
+    def save(self, keys: set[str]) -> None:
+        """Write the offsets of ``keys`` atomically (tmp file + rename); others are dropped."""
+        files = {key: entry for key, entry in sorted(self.offsets.items()) if key in keys}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": OFFSETS_VERSION, "files": files}, f)
+        os.replace(tmp, self.path)
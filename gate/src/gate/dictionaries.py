@@ -0,0 +1,269 @@
+r"""zstd compression of small transcripts with a trained dictionary.
+
+Subagent transcripts are short, so generic compression finds little to reuse inside
+any one of them -- yet they all share the same event structure, field names and tool
+boilerplate. A zstd dictionary trained offline on a sample of transcripts primes the
+compressor with that shared content:
+
+    python -m gate.dictionaries train -o transcripts.zdict ~/samples/
+    python -m gate.dictionaries bench --dictionary transcripts.zdict ~/samples/
+
+``bench`` compares the compression ratio and throughput of plain zstd with the
+dictionary on the given files.
+
+With ``TRANSCRIPT_ZSTD_DICTIONARY`` pointing at such a file, objects uploaded in a
+single request and no larger than ``zstd_max_size`` are sent zstd-compressed (same
+key, ``Content-Encoding: zstd``) with the dictionary's id in the object metadata
+(``x-amz-meta-zstd-dictionary-id``). Each dictionary is versioned by that id and
+stored beside the uploads as ``<prefix>/dictionaries/zstd-<id>.dict`` before the
+first object that needs it; :func:`decompress` restores an object given its dictionary.
+Sidecar indexes describe the uncompressed content.
+
+Needs the optional ``zstandard`` package (``pip install gate[zstd]``); it is imported
+only when a dictionary is configured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from gate.streaming import BufferBody
+
+if TYPE_CHECKING:
+    from gate.throttle import TokenBucket
+    from gate.transcript_upload import S3Uploader
+
+logger = logging.getLogger("gate")
+
+DICTIONARIES_PREFIX = "dictionaries"
+METADATA_KEY = "zstd-dictionary-id"
+PUBLISHED_FILENAME = "dictionaries.json"
+DEFAULT_DICTIONARY_SIZE = 112 * 1024
+DEFAULT_MAX_SAMPLES = 10_000
+# Only files up to this size are used as training samples by default
+DEFAULT_SAMPLE_MAX_SIZE = 256 * 1024
+
+
+def zstandard_available() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+
+def dictionary_key(prefix: str, dict_id: int) -> str:
+    name = f"{DICTIONARIES_PREFIX}/zstd-{dict_id}.dict"
+    return f"{prefix}/{name}" if prefix else name
+
+
+class DictCompressor:
+    """Compresses bodies of at most ``max_size`` bytes with a zstd dictionary.
+
+    Thread-safe: each thread gets its own compressor (zstandard's are not shareable).
+    """
+
+    def __init__(self, dict_data: bytes, level: int, max_size: int) -> None:
+        import zstandard
+
+        self.dict_data = dict_data
+        self.max_size = max_size
+        self._dict = zstandard.ZstdCompressionDict(dict_data)
+        self._dict.precompute_compress(level=level)
+        self.dict_id = self._dict.dict_id()
+        self.level = level
+        self.put_kwargs: dict[str, Any] = {
+            "ContentEncoding": "zstd",
+            "Metadata": {METADATA_KEY: str(self.dict_id)},
+        }
+        self.files = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def compress(self, data: bytes | bytearray | memoryview) -> bytes:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            import zstandard
+
+            compressor = zstandard.ZstdCompressor(dict_data=self._dict, level=self.level)
+            self._local.compressor = compressor
+        compressed = compressor.compress(data)
+        with self._lock:
+            self.files += 1
+            self.bytes_in += len(data)
+            self.bytes_out += len(compressed)
+        return compressed
+
+    def log_summary(self) -> None:
+        if self.files:
+            logger.info(
+                "Compressed %d file(s) with zstd dictionary %d: %.1f KiB -> %.1f KiB",
+                self.files,
+                self.dict_id,
+                self.bytes_in / 1024,
+                self.bytes_out / 1024,
+            )
+
+
+def load_compressor(path: str, level: int, max_size: int) -> DictCompressor | None:
+    """The compressor for the dictionary at ``path``, or None (with a warning) if unusable."""
+    if not zstandard_available():
+        logger.warning("TRANSCRIPT_ZSTD_DICTIONARY needs zstandard; uploading uncompressed")
+        return None
+    try:
+        with open(path, "rb") as f:
+            return DictCompressor(f.read(), level, max_size)
+    except Exception as exc:
+        logger.warning("Cannot load zstd dictionary %s (%s); uploading uncompressed", path, exc)
+        return None
+
+
+def publish(
+    compressor: DictCompressor,
+    uploader: S3Uploader,
+    bucket_name: str,
+    prefix: str,
+    state_dir: str | None,
+    throttle: TokenBucket | None = None,
+) -> None:
+    """Upload the dictionary beside the transcripts, unless an earlier run already did.
+
+    With ``throttle``, the upload is charged to the transcripts' bandwidth cap.
+    """
+    key = dictionary_key(prefix, compressor.dict_id)
+    record = {"bucket": bucket_name, "key": key}
+    path = os.path.join(state_dir, PUBLISHED_FILENAME) if state_dir is not None else None
+    if path is not None and record in _read_published(path):
+        return
+    uploader.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=BufferBody(
+            memoryview(compressor.dict_data),
+            on_read=throttle.stream() if throttle is not None else None,
+        ),
+        ContentType="application/octet-stream",
+    )
+    logger.info("Stored zstd dictionary %d at %s", compressor.dict_id, key)
+    if path is not None:
+        published = [r for r in _read_published(path) if r != record] + [record]
+        os.makedirs(state_dir, exist_ok=True)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(published, f)
+        os.replace(f"{path}.tmp", path)
+
+
+def _read_published(path: str) -> list[dict[str, str]]:
+    try:
+        with open(path) as f:
+            published = json.load(f)
+        return published if isinstance(published, list) else []
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as exc:
+        logger.warning("Discarding unreadable dictionary list %s: %s", path, exc)
+        return []
+
+
+def decompress(data: bytes, dict_data: bytes) -> bytes:
+    """Restore an object compressed with the dictionary ``dict_data``."""
+    import zstandard
+
+    dctx = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dict_data))
+    return dctx.decompress(data)
+
+
+def train(samples: list[bytes], size: int = DEFAULT_DICTIONARY_SIZE, dict_id: int = 0) -> bytes:
+    """Train a dictionary of about ``size`` bytes (``dict_id`` 0 picks a random id)."""
+    import zstandard
+
+    return zstandard.train_dictionary(size, samples, dict_id=dict_id).as_bytes()
+
+
+def benchmark(samples: list[bytes], dict_data: bytes, level: int) -> dict[str, dict[str, float]]:
+    """Compression ratio and throughput (MB/s of input) of plain zstd vs the dictionary."""
+    import zstandard
+
+    compressors = {
+        "plain": zstandard.ZstdCompressor(level=level),
+        "dictionary": DictCompressor(dict_data, level, max_size=0),
+    }
+    total = sum(len(s) for s in samples)
+    results = {}
+    for name, compressor in compressors.items():
+        started = time.perf_counter()
+        out = sum(len(compressor.compress(s)) for s in samples)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        results[name] = {"ratio": total / max(out, 1), "mb_per_s": total / elapsed / 1e6}
+    return results
+
+
+def _load_samples(paths: list[str], max_size: int, max_samples: int) -> list[bytes]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in names if n.endswith(".jsonl"))
+        else:
+            files.append(path)
+    files = sorted(f for f in files if 0 < os.path.getsize(f) <= max_size)
+    if len(files) > max_samples:
+        files = random.Random(0).sample(files, max_samples)
+    samples = []
+    for file in files:
+        with open(file, "rb") as f:
+            samples.append(f.read())
+    return samples
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m gate.dictionaries",
+        description="Train and benchmark zstd dictionaries for small transcripts.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_cmd = commands.add_parser("train", help="train a dictionary from sample transcripts")
+    train_cmd.add_argument("-o", "--output", required=True)
+    train_cmd.add_argument("--size", type=int, default=DEFAULT_DICTIONARY_SIZE)
+    train_cmd.add_argument("--dict-id", type=int, default=0, help="version id (0: random)")
+    bench_cmd = commands.add_parser("bench", help="compare plain and dictionary compression")
+    bench_cmd.add_argument("--dictionary", required=True)
+    bench_cmd.add_argument("--level", type=int, default=3)
+    for command in (train_cmd, bench_cmd):
+        command.add_argument("--max-size", type=int, default=DEFAULT_SAMPLE_MAX_SIZE)
+        command.add_argument("--max-samples", type=int, default=DEFAULT_MAX_SAMPLES)
+        command.add_argument("paths", nargs="+", help=".jsonl files or directories")
+    args = parser.parse_args(argv)
+
+    if not zstandard_available():
+        print("zstandard is not installed (pip install gate[zstd])", file=sys.stderr)
+        return 2
+    samples = _load_samples(args.paths, args.max_size, args.max_samples)
+    if not samples:
+        print("no sample transcripts found", file=sys.stderr)
+        return 1
+    if args.command == "train":
+        dict_data = train(samples, args.size, args.dict_id)
+        with open(args.output, "wb") as f:
+            f.write(dict_data)
+        compressor = DictCompressor(dict_data, level=3, max_size=0)
+        print(f"{args.output}: dictionary {compressor.dict_id}, {len(dict_data)} bytes")
+        return 0
+    with open(args.dictionary, "rb") as f:
+        dict_data = f.read()
+    total = sum(len(s) for s in samples)
+    print(f"{len(samples)} file(s), {total / 1e6:.2f} MB, zstd level {args.level}")
+    for name, result in benchmark(samples, dict_data, args.level).items():
+        print(f"{name:>10}: ratio {result['ratio']:6.2f}  {result['mb_per_s']:8.1f} MB/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""Probing and failover among several S3 endpoints.
+
+S3 is reachable from the cluster through a VPC gateway endpoint, an interface endpoint
+or the regional public endpoint, and which is fastest varies by node and time of day.
+With ``AWS_ENDPOINT_URLS`` listing candidates, each run:
+
+1. probes every candidate in parallel with one unauthenticated ``HEAD /`` (any HTTP
+   answer below 500 within ``PROBE_TIMEOUT`` counts as healthy; S3 answers 403 or 400),
+   logging one ``Endpoint probe`` line per candidate;
+2. uploads through the healthy endpoint with the lowest latency;
+3. fails over to the next-best endpoint once ``FAILOVER_AFTER`` consecutive calls fail
+   with connection errors, timeouts or 5xx responses, retrying the failed call there.
+
+Clients for the other endpoints are only built when a failover needs them.
+"""
+
+from __future__ import annotations
+
+import http.client
+import logging
+import threading
+import time
+import urllib.parse
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from gate.transcript_upload import S3Uploader
+
+logger = logging.getLogger("gate")
+
+PROBE_TIMEOUT = 2.0
+FAILOVER_AFTER = 3
+# botocore exception classes (matched by name, so botocore is not imported here) that
+# mean the endpoint itself is unreachable or failing
+_ENDPOINT_ERRORS = frozenset(
+    {
+        "ConnectionError",
+        "EndpointConnectionError",
+        "ConnectTimeoutError",
+        "ReadTimeoutError",
+        "ConnectionClosedError",
+        "HTTPClientError",
+    }
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Probe:
+    """Result of probing one endpoint; ``latency`` is None if it did not answer."""
+
+    url: str
+    latency: float | None
+    status: int | None = None
+    error: str = ""
+
+    @property
+    def healthy(self) -> bool:
+        return self.latency is not None and self.status is not None and self.status < 500
+
+
+def probe(url: str, timeout: float = PROBE_TIMEOUT) -> Probe:
+    """Time one ``HEAD /`` request (connection set-up included) to ``url``."""
+    parts = urllib.parse.urlsplit(url)
+    connection_class = (
+        http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    )
+    connection = connection_class(parts.hostname or "", parts.port, timeout=timeout)
+    started = time.monotonic()
+    try:
+        connection.request("HEAD", parts.path or "/")
+        status = connection.getresponse().status
+    except (OSError, http.client.HTTPException) as exc:
+        return Probe(url, None, error=str(exc) or type(exc).__name__)
+    finally:
+        connection.close()
+    return Probe(url, time.monotonic() - started, status)
+
+
+def rank_endpoints(urls: tuple[str, ...], timeout: float = PROBE_TIMEOUT) -> list[str]:
+    """Probe ``urls`` in parallel; healthy ones by latency first, then the others."""
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        probes = list(executor.map(lambda url: probe(url, timeout), urls))
+    for result in probes:
+        logger.info(
+            "Endpoint probe: url=%s healthy=%s latency_ms=%s status=%s%s",
+            result.url,
+            result.healthy,
+            f"{result.latency * 1000:.1f}" if result.latency is not None else "-",
+            result.status if result.status is not None else "-",
+            f" error={result.error!r}" if result.error else "",
+        )
+    healthy = sorted((p for p in probes if p.healthy), key=lambda p: p.latency or 0.0)
+    ranked = [p.url for p in healthy] + [p.url for p in probes if not p.healthy]
+    if healthy:
+        logger.info("Selected S3 endpoint %s", ranked[0])
+    else:
+        logger.warning("No S3 endpoint answered the probe; trying %s first", ranked[0])
+    return ranked
+
+
+def is_endpoint_failure(exc: BaseException) -> bool:
+    """True for errors that say more about the endpoint than about the request."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    if any(cls.__name__ in _ENDPOINT_ERRORS for cls in type(exc).__mro__):
+        return True
+    response: Any = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return isinstance(status, int) and status >= 500
+    return False
+
+
+class FailoverUploader:
+    """S3 client that moves to the next endpoint when the current one keeps failing.
+
+    Args:
+        urls: Endpoints in order of preference (see :func:`rank_endpoints`).
+        make_client: Builds the client for an endpoint URL.
+        failover_after: Consecutive endpoint failures that trigger a failover.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        make_client: Callable[[str], S3Uploader],
+        failover_after: int = FAILOVER_AFTER,
+    ) -> None:
+        self.urls = urls
+        self.failover_after = failover_after
+        self.failovers = 0
+        self._make_client = make_client
+        self._index = 0
+        self._client = make_client(urls[0])
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return self.urls[self._index]
+
+    def put_object(self, **kwargs: Any) -> Any:
+        return self._call("put_object", kwargs)
+
+    def create_multipart_upload(self, **kwargs: Any) -> dict[str, Any]:
+        return self._call("create_multipart_upload", kwargs)
+
+    def upload_part(self, **kwargs: Any) -> dict[str, Any]:
+        return self._call("upload_part", kwargs)
+
+    def complete_multipart_upload(self, **kwargs: Any) -> dict[str, Any]:
+        return self._call("complete_multipart_upload", kwargs)
+
+    def abort_multipart_upload(self, **kwargs: Any) -> dict[str, Any]:
+        return self._call("abort_multipart_upload", kwargs)
+
+    def _call(self, method: str, kwargs: dict[str, Any]) -> Any:
+        with self._lock:
+            client, index = self._client, self._index
+        try:
+            response = getattr(client, method)(**kwargs)
+        except Exception as exc:
+            if not is_endpoint_failure(exc) or not self._failed(index, exc):
+                raise
+            body = kwargs.get("Body")
+            if hasattr(body, "seek"):
+                body.seek(0)
+            with self._lock:
+                client = self._client
+            return getattr(client, method)(**kwargs)
+        with self._lock:
+            if index == self._index:
+                self._failures = 0
+        return response
+
+    def _failed(self, index: int, exc: Exception) -> bool:
+        """Count a failure on endpoint ``index``; True if the call should be retried."""
+        with self._lock:
+            if index != self._index:
+                # Another thread already failed over; retry on the new endpoint
+                return True
+            self._failures += 1
+            if self._failures < self.failover_after or self._index + 1 == len(self.urls):
+                return False
+            self._index += 1
+            self._failures = 0
+            self.failovers += 1
+            logger.warning(
+                "S3 endpoint %s failed %d time(s) in a row (%s); failing over to %s",
+                self.urls[index],
+                self.failover_after,
+                exc,
+                self.url,
+            )
+            self._client = self._make_client(self.url)
+            return True
@@ -0,0 +1,139 @@
+"""Event offset index sidecars for uploaded transcripts.
+
+While a transcript streams to S3, an :class:`EventIndexer` parses each JSONL event and
+records where it sits in the uploaded object. The index is uploaded beside the object
+(``<stem>.jsonl`` -> ``<stem>.events.json``) so clients can fetch only the events they
+need with ranged GETs instead of downloading the whole transcript:
+
+    {"version": 1, "key": ..., "size": ..., "lines": ...,
+     "types":   {"assistant": [[offset, length], ...], ...},
+     "tools":   {"Bash": [[offset, length], ...], ...},
+     "errors":  [[offset, length], ...],
+     "minutes": {"2025-01-01T12:34": [start, end], ...}}
+
+``tools`` lists the events holding a ``tool_use`` of that name and ``errors`` those
+holding a ``tool_result`` with ``is_error`` set. ``minutes`` gives, per minute of event
+timestamps, the byte range spanning its events. Offsets refer to the uploaded bytes,
+so they stay correct when redaction changes line lengths.
+"""
+
+from __future__ import annotations
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+
+EVENT_INDEX_VERSION = 1
+EVENT_INDEX_SUFFIX = ".events.json"
+# Length of the ISO-8601 prefix kept for timestamp buckets ("YYYY-MM-DDTHH:MM")
+_MINUTE_PREFIX = 16
+
+
+def event_index_key(key: str) -> str:
+    """Key of the event index sidecar for the object at ``key``."""
+    stem = key[: -len(".jsonl")] if key.endswith(".jsonl") else key
+    return f"{stem}{EVENT_INDEX_SUFFIX}"
+
+
+class LineObserver(ABC):
+    """Splits an object's content, fed part by part, into lines for :meth:`_add`."""
+
+    # True to be fed the content before packing (values inline), not as uploaded
+    reads_values = False
+
+    def __init__(self) -> None:
+        self._pending: list[bytes] = []
+
+    def feed(self, data: bytes | bytearray | memoryview) -> None:
+        """Index every line completed by ``data``; a trailing partial line is kept."""
+        raw = bytes(data)
+        pos = 0
+        while (newline := raw.find(b"\n", pos)) >= 0:
+            line = raw[pos:newline]
+            if self._pending:
+                line = b"".join([*self._pending, line])
+                self._pending.clear()
+            self._add(line, len(line) + 1)
+            pos = newline + 1
+        if pos < len(raw):
+            self._pending.append(raw[pos:])
+
+    def finish(self) -> None:
+        """Index a final line that has no trailing newline."""
+        if self._pending:
+            line = b"".join(self._pending)
+            self._pending.clear()
+            self._add(line, len(line))
+
+    @abstractmethod
+    def _add(self, line: bytes, length: int) -> None:
+        """Handle one line (``length`` includes its newline, if any)."""
+
+
+class EventIndexer(LineObserver):
+    """Builds an event offset index from an object's content, fed part by part."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.types: dict[str, list[list[int]]] = {}
+        self.tools: dict[str, list[list[int]]] = {}
+        self.errors: list[list[int]] = []
+        self.minutes: dict[str, list[int]] = {}
+        self.lines = 0
+        self.size = 0
+
+    def _add(self, line: bytes, length: int) -> None:
+        start = self.size
+        self.size += length
+        self.lines += 1
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        span = [start, length]
+        event_type = event.get("type")
+        if isinstance(event_type, str):
+            self.types.setdefault(event_type, []).append(span)
+        timestamp = event.get("timestamp")
+        if isinstance(timestamp, str):
+            bucket = self.minutes.get(timestamp[:_MINUTE_PREFIX])
+            if bucket is None:
+                self.minutes[timestamp[:_MINUTE_PREFIX]] = [start, start + length]
+            else:
+                bucket[0] = min(bucket[0], start)
+                bucket[1] = max(bucket[1], start + length)
+        self._add_content(event, span)
+
+    def _add_content(self, event: dict[str, Any], span: list[int]) -> None:
+        message = event.get("message")
+        content = message.get("content") if isinstance(message, dict) else None
+        if not isinstance(content, list):
+            return
+        tools = set()
+        error = False
+        for item in content:
+            if not isinstance(item, dict):
+                continue
+            if item.get("type") == "tool_use" and isinstance(item.get("name"), str):
+                tools.add(item["name"])
+            elif item.get("type") == "tool_result" and item.get("is_error"):
+                error = True
+        for name in sorted(tools):
+            self.tools.setdefault(name, []).append(span)
+        if error:
+            self.errors.append(span)
+
+    def to_json(self, key: str) -> bytes:
+        index = {
+            "version": EVENT_INDEX_VERSION,
+            "key": key,
+            "size": self.size,
+            "lines": self.lines,
+            "types": self.types,
+            "tools": self.tools,
+            "errors": self.errors,
+            "minutes": self.minutes,
+        }
+        return json.dumps(index, separators=(",", ":")).encode()
@@ -0,0 +1,314 @@
+"""Read-once fan-out of transcript uploads to several buckets.
+
+A :class:`FanOutUploader` stands in for the S3 client: every call the upload path
+makes (put, multipart create/part/complete/abort) is sent to each destination
+concurrently, with the same request body. The file is therefore read, redacted and
+checksummed once however many buckets receive it; the bodies sent to the other
+buckets are extra views over the same pooled buffer (see :class:`BufferBody.copy`).
+
+Destinations are independent:
+
+- each call is retried per destination (``attempts`` times, with exponential backoff),
+  without re-sending to the destinations that already accepted it;
+- a destination that keeps failing is dropped for the rest of that object, while the
+  others carry on; the object's final call (``put_object`` or
+  ``complete_multipart_upload``) then raises :class:`DestinationError`, naming each
+  failed destination, so the session is reported as failed and is not compacted;
+- only when every destination fails does the call raise that error directly.
+
+A file that failed for some destinations only is spooled for just those, and the spool
+drain sends it through :meth:`FanOutUploader.only`, so the destinations that already
+have it are not written again.
+
+Multipart upload ids and part ETags are per destination; they are combined into one
+JSON string so the checkpoint journal stores them like any other id or ETag.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, BinaryIO
+
+from gate.multipart import _error_code
+from gate.streaming import BufferBody
+
+if TYPE_CHECKING:
+    from gate.transcript_upload import S3Uploader
+
+logger = logging.getLogger("gate")
+
+DESTINATION_ATTEMPTS = 3
+DESTINATION_BACKOFF = 0.5
+# S3 errors that retrying the same request cannot fix
+_PERMANENT_ERRORS = ("NoSuchUpload", "NoSuchBucket", "AccessDenied")
+
+
+@dataclass(frozen=True, slots=True)
+class Target:
+    """One destination: a client and the bucket it writes to."""
+
+    name: str
+    bucket_name: str
+    uploader: S3Uploader
+
+
+class DestinationError(Exception):
+    """An object reached some destinations but not all of them."""
+
+    def __init__(self, key: str, failures: dict[str, Exception]) -> None:
+        self.key = key
+        self.failures = failures
+        details = "; ".join(f"{name}: {exc}" for name, exc in failures.items())
+        super().__init__(f"{key} failed for {len(failures)} destination(s): {details}")
+
+
+class _NoSuchUpload(Exception):
+    """Shaped like botocore's ClientError(NoSuchUpload), so the journaled upload restarts."""
+
+    response = {"Error": {"Code": "NoSuchUpload"}}
+
+
+class FanOutUploader:
+    """S3 client double that tees every call to each of ``targets`` (the first is primary).
+
+    Args:
+        targets: Destinations, in reporting order.
+        workers: Threads for the calls to the non-primary destinations (the primary's
+            call runs in the caller's thread).
+        attempts: Tries per call and destination.
+        backoff: Delay before the first retry, doubled for each further one.
+    """
+
+    def __init__(
+        self,
+        targets: list[Target],
+        workers: int,
+        attempts: int = DESTINATION_ATTEMPTS,
+        backoff: float = DESTINATION_BACKOFF,
+    ) -> None:
+        self.targets = targets
+        self.workers = workers
+        self.attempts = max(attempts, 1)
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+        self._lock = threading.Lock()
+        # Per object key: destinations dropped for it, with the error that dropped them
+        self._failed: dict[str, dict[str, Exception]] = {}
+        self._failed_objects: dict[str, int] = {t.name: 0 for t in targets}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def only(self, names: Iterable[str]) -> FanOutUploader | None:
+        """A fan-out to the destinations named in ``names`` (None if none are configured).
+
+        The first of them in this uploader's order becomes the primary. Names that are
+        not configured (any more) are ignored.
+        """
+        wanted = set(names)
+        targets = [t for t in self.targets if t.name in wanted]
+        if not targets:
+            return None
+        return FanOutUploader(targets, self.workers, self.attempts, self.backoff)
+
+    def log_summary(self) -> None:
+        for name, count in self._failed_objects.items():
+            if count:
+                logger.warning("Destination %s: %d object(s) failed", name, count)
+
+    # ── S3Uploader calls ──
+
+    def put_object(
+        self, *, Bucket: str, Key: str, Body: BinaryIO | bytes, ContentType: str, **kwargs: Any
+    ) -> Any:
+        self._reset(Key)
+        try:
+            responses = self._dispatch(
+                Key,
+                self.targets,
+                lambda t: t.uploader.put_object(
+                    Bucket=t.bucket_name,
+                    Key=Key,
+                    Body=_copy(Body),
+                    ContentType=ContentType,
+                    **kwargs,
+                ),
+            )
+        except Exception:
+            self._finish(Key, raise_error=False)
+            raise
+        self._finish(Key)
+        return next(iter(responses.values()))
+
+    def create_multipart_upload(
+        self, *, Bucket: str, Key: str, ContentType: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        self._reset(Key)
+        responses = self._dispatch(
+            Key,
+            self.targets,
+            lambda t: t.uploader.create_multipart_upload(
+                Bucket=t.bucket_name, Key=Key, ContentType=ContentType, **kwargs
+            ),
+        )
+        return {"UploadId": json.dumps({n: r["UploadId"] for n, r in responses.items()})}
+
+    def upload_part(
+        self,
+        *,
+        Bucket: str,
+        Key: str,
+        UploadId: str,
+        PartNumber: int,
+        Body: BinaryIO | bytes,
+        **kwargs: Any,
+    ) -> dict[str, Any]:
+        ids = self._upload_ids(Key, UploadId)
+        responses = self._dispatch(
+            Key,
+            [t for t in self.targets if t.name in ids],
+            lambda t: t.uploader.upload_part(
+                Bucket=t.bucket_name,
+                Key=Key,
+                UploadId=ids[t.name],
+                PartNumber=PartNumber,
+                Body=_copy(Body),
+                **kwargs,
+            ),
+        )
+        return {"ETag": json.dumps({n: r["ETag"] for n, r in responses.items()})}
+
+    def complete_multipart_upload(
+        self, *, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict[str, Any]
+    ) -> dict[str, Any]:
+        ids = self._upload_ids(Key, UploadId)
+        etags = [json.loads(p["ETag"]) for p in MultipartUpload["Parts"]]
+        for name in list(ids):
+            if not all(name in tags for tags in etags):
+                self._drop(Key, name, _NoSuchUpload(f"missing parts for {name}"))
+                del ids[name]
+
+        def _complete(t: Target) -> Any:
+            parts = [
+                {**p, "ETag": tags[t.name]} for p, tags in zip(MultipartUpload["Parts"], etags)
+            ]
+            return t.uploader.complete_multipart_upload(
+                Bucket=t.bucket_name,
+                Key=Key,
+                UploadId=ids[t.name],
+                MultipartUpload={"Parts": parts},
+            )
+
+        try:
+            responses = self._dispatch(Key, [t for t in self.targets if t.name in ids], _complete)
+        except Exception:
+            self._finish(Key, raise_error=False)
+            raise
+        self._finish(Key)
+        return next(iter(responses.values()))
+
+    def abort_multipart_upload(self, *, Bucket: str, Key: str, UploadId: str) -> dict[str, Any]:
+        ids = self._upload_ids(Key, UploadId)
+        self._dispatch(
+            Key,
+            [t for t in self.targets if t.name in ids],
+            lambda t: t.uploader.abort_multipart_upload(
+                Bucket=t.bucket_name, Key=Key, UploadId=ids[t.name]
+            ),
+        )
+        return {}
+
+    # ── internals ──
+
+    def _upload_ids(self, key: str, upload_id: str) -> dict[str, str]:
+        """Per-destination upload ids still live for ``key`` (dropped ones excluded)."""
+        try:
+            ids = json.loads(upload_id)
+            if not isinstance(ids, dict):
+                raise ValueError(upload_id)
+        except ValueError:
+            # Journaled before fan-out was enabled: start the upload over
+            raise _NoSuchUpload(upload_id) from None
+        for target in self.targets:
+            if target.name not in ids:
+                # Dropped before this object's upload was started (possibly by a past run)
+                self._drop(key, target.name, _NoSuchUpload(f"no upload for {target.name}"))
+        with self._lock:
+            failed = self._failed.get(key, {})
+            return {n: i for n, i in ids.items() if n not in failed}
+
+    def _dispatch(
+        self, key: str, targets: list[Target], call: Callable[[Target], Any]
+    ) -> dict[str, Any]:
+        """Run ``call`` for every live target concurrently; returns responses by name.
+
+        Targets that still fail after retrying are dropped for ``key``. Raises the first
+        target's error if none succeeded.
+        """
+        with self._lock:
+            failed = dict(self._failed.get(key, {}))
+        live = [t for t in targets if t.name not in failed]
+        if not live:
+            raise next(iter(failed.values()), _NoSuchUpload(key))
+        futures: dict[str, Future] = {
+            t.name: self._executor.submit(self._attempt, t, call) for t in live[1:]
+        }
+        results: dict[str, Any] = {}
+        errors: dict[str, Exception] = {}
+        try:
+            results[live[0].name] = self._attempt(live[0], call)
+        except Exception as exc:
+            errors[live[0].name] = exc
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as exc:
+                errors[name] = exc
+        for name, exc in errors.items():
+            self._drop(key, name, exc)
+        if not results:
+            raise next(iter(errors.values()))
+        return results
+
+    def _attempt(self, target: Target, call: Callable[[Target], Any]) -> Any:
+        for attempt in range(self.attempts):
+            try:
+                return call(target)
+            except Exception as exc:
+                if attempt + 1 == self.attempts or _error_code(exc) in _PERMANENT_ERRORS:
+                    raise
+                logger.warning("Retrying destination %s after error: %s", target.name, exc)
+                time.sleep(self.backoff * 2**attempt)
+        raise AssertionError("unreachable")
+
+    def _drop(self, key: str, name: str, exc: Exception) -> None:
+        with self._lock:
+            failed = self._failed.setdefault(key, {})
+            if name in failed:
+                return
+            failed[name] = exc
+        logger.error("Destination %s failed for %s: %s", name, key, exc)
+
+    def _reset(self, key: str) -> None:
+        with self._lock:
+            self._failed.pop(key, None)
+
+    def _finish(self, key: str, raise_error: bool = True) -> None:
+        """Count ``key``'s failed destinations; raise :class:`DestinationError` if any."""
+        with self._lock:
+            failures = self._failed.pop(key, {})
+            for name in failures:
+                self._failed_objects[name] += 1
+        if failures and raise_error:
+            raise DestinationError(key, failures)
+
+
+def _copy(body: BinaryIO | bytes) -> BinaryIO | bytes:
+    """Give each destination its own reader over the body's bytes (no data is copied)."""
+    return body.copy() if isinstance(body, BufferBody) else body
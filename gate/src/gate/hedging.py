@@ -0,0 +1,183 @@
+"""Hedged PUTs for small and medium transcript objects.
+
+A gate run lasts as long as its slowest upload, and a few single-request PUTs stall
+for seconds even on a healthy endpoint. With hedging enabled, a PUT still running
+after the ``percentile``-th latency observed for objects of its size is duplicated on
+a second client -- a separate connection pool, so the duplicate does not queue behind
+the stalled connection -- and whichever request finishes first wins.
+
+Hedges are capped by a byte budget: at most ``budget`` times the bytes sent so far
+(including the request being hedged), with ``budget`` capped at ``MAX_HEDGE_BUDGET``, so
+hedging adds a bounded fraction of traffic and never doubles it -- also on small runs,
+whose first objects are not hedged until enough has been sent. Until a size class has enough
+samples, ``DEFAULT_HEDGE_DELAY`` stands in for its percentile.
+
+The losing request is not cancelled (boto3 cannot abort a call in flight); the body's
+buffer is handed back through ``on_done`` only once every request has finished.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from gate.transcript_upload import S3Uploader
+
+logger = logging.getLogger("gate")
+
+DEFAULT_HEDGE_DELAY = 1.0
+# Latencies kept per size class, and needed before the observed percentile is used
+LATENCY_WINDOW = 256
+MIN_SAMPLES = 16
+# Upper bounds of the object size classes latencies are tracked in (the last is open)
+SIZE_CLASSES = (64 * 1024, 1024 * 1024)
+
+
+class LatencyTracker:
+    """Rolling window of request latencies per object size class."""
+
+    def __init__(self, percentile: float) -> None:
+        self.percentile = percentile
+        self._samples = [deque(maxlen=LATENCY_WINDOW) for _ in range(len(SIZE_CLASSES) + 1)]
+        self._lock = threading.Lock()
+
+    def record(self, size: int, seconds: float) -> None:
+        with self._lock:
+            self._samples[bisect.bisect_left(SIZE_CLASSES, size)].append(seconds)
+
+    def delay(self, size: int) -> float:
+        """Seconds after which a request for an object of ``size`` bytes is hedged."""
+        with self._lock:
+            samples = sorted(self._samples[bisect.bisect_left(SIZE_CLASSES, size)])
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        index = min(int(len(samples) * self.percentile / 100), len(samples) - 1)
+        return samples[index]
+
+
+class Hedger:
+    """Sends single-request uploads, duplicating the slow ones on a second client.
+
+    Args:
+        uploader: Client for the first request.
+        make_hedge_client: Builds the client for duplicates (called once, on first use).
+        workers: Concurrent uploads the hedger serves (each may need two threads).
+        percentile: Latency percentile after which a request is hedged.
+        budget: Hedged bytes allowed per byte sent.
+    """
+
+    def __init__(
+        self,
+        uploader: S3Uploader,
+        make_hedge_client: Callable[[], S3Uploader],
+        workers: int,
+        percentile: float,
+        budget: float,
+    ) -> None:
+        self.uploader = uploader
+        self.latency = LatencyTracker(percentile)
+        self.budget = budget
+        self.hedged = 0
+        self.wins = 0
+        self._make_hedge_client = make_hedge_client
+        self._hedge_client: S3Uploader | None = None
+        self._executor = ThreadPoolExecutor(max_workers=2 * max(workers, 1))
+        self._lock = threading.Lock()
+        self._sent_bytes = 0
+        self._hedged_bytes = 0
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self.hedged:
+            logger.info(
+                "Hedged %d upload(s) (%.1f KiB); the duplicate won %d",
+                self.hedged,
+                self._hedged_bytes / 1024,
+                self.wins,
+            )
+
+    def send(
+        self, request: Callable[[S3Uploader], Any], size: int, on_done: Callable[[], None]
+    ) -> Any:
+        """Run ``request`` (a ``size``-byte upload) and return the first successful response.
+
+        ``on_done`` is called exactly once, when no request is still in flight.
+        """
+        with self._lock:
+            self._sent_bytes += size
+        try:
+            primary = self._submit(request, self.uploader, size, record=True)
+        except BaseException:
+            on_done()
+            raise
+        futures = [primary]
+        try:
+            done, _ = wait(futures, timeout=self.latency.delay(size))
+            if not done and self._reserve(size):
+                try:
+                    futures.append(self._submit(request, self._client(), size, record=False))
+                except Exception:
+                    logger.warning("Could not send hedged upload", exc_info=True)
+            return self._first_success(futures, primary)
+        finally:
+            _when_all_done(futures, on_done)
+
+    def _submit(
+        self, request: Callable[[S3Uploader], Any], client: S3Uploader, size: int, record: bool
+    ) -> Future:
+        def _timed() -> Any:
+            started = time.monotonic()
+            response = request(client)
+            if record:
+                self.latency.record(size, time.monotonic() - started)
+            return response
+
+        return self._executor.submit(_timed)
+
+    def _reserve(self, size: int) -> bool:
+        with self._lock:
+            if self._hedged_bytes + size > self.budget * self._sent_bytes:
+                return False
+            self._hedged_bytes += size
+            self.hedged += 1
+            return True
+
+    def _client(self) -> S3Uploader:
+        with self._lock:
+            if self._hedge_client is None:
+                self._hedge_client = self._make_hedge_client()
+            return self._hedge_client
+
+    def _first_success(self, futures: list[Future], primary: Future) -> Any:
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        with self._lock:
+                            self.wins += 1
+                    return future.result()
+        return primary.result()
+
+
+def _when_all_done(futures: list[Future], callback: Callable[[], None]) -> None:
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _one_done(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    for future in futures:
+        future.add_done_callback(_one_done)
@@ -0,0 +1,60 @@
+"""Hash-sharded key prefixes, spreading a bucket's request rate over many prefixes.
+
+S3 scales request rates per key prefix, so when many workflows reach their gate at the
+same time, every PUT under the one configured ``AWS_S3_PREFIX`` competes for the same
+limit and some get SlowDown responses. With ``TRANSCRIPT_KEY_SHARDS=N``, each session's
+objects (transcripts, subagents, shards, deltas, sidecars and session-scoped blobs) go
+below one of N sub-prefixes chosen by a hash of the session id::
+
+    <prefix>/<session>.jsonl  ->  <prefix>/<shard>/<session>.jsonl
+
+where ``<shard>`` is a fixed-width hex number below N. With a key template that has
+partition segments, the shard follows them, so a date or workflow is still one prefix::
+
+    <prefix>/date=<d>/workflow=<w>/role=main/<shard>/<session>.jsonl
+
+The choice is deterministic, so readers find a session's objects without listing:
+:func:`session_prefix` (or ``python -m gate.key_sharding --shards N <session>``) gives
+the prefix below which the session's key continues (for session-scoped blobs, and for
+transcripts under the "legacy" template). Changing N moves new uploads of a session
+to a different prefix.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import sys
+
+
+def key_shard(session_id: str, shards: int) -> str:
+    """The sub-prefix of ``session_id`` among ``shards`` (hex, as wide as ``shards - 1``)."""
+    digest = hashlib.sha256(session_id.encode()).digest()
+    index = int.from_bytes(digest[:8], "big") % shards
+    return f"{index:0{len(f'{shards - 1:x}')}x}"
+
+
+def session_prefix(prefix: str, session_id: str, shards: int) -> str:
+    """The prefix the keys of ``session_id`` start with (``prefix`` itself if unsharded)."""
+    if shards <= 1:
+        return prefix
+    shard = key_shard(session_id, shards)
+    return f"{prefix}/{shard}" if prefix else shard
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m gate.key_sharding",
+        description="Print the S3 key prefix of each session under hash-sharded keys.",
+    )
+    parser.add_argument("--shards", type=int, required=True, help="TRANSCRIPT_KEY_SHARDS")
+    parser.add_argument("--prefix", default="", help="AWS_S3_PREFIX")
+    parser.add_argument("sessions", nargs="+")
+    args = parser.parse_args(argv)
+    for session_id in args.sessions:
+        print(f"{session_id}\t{session_prefix(args.prefix.strip('/'), session_id, args.shards)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+r"""Inverted keyword index sidecars, and a helper to search many of them at once.
+
+While a transcript streams to S3, a :class:`KeywordIndexer` collects the terms ops
+search for, and the result is uploaded beside the object (``<stem>.jsonl`` ->
+``<stem>.keywords.json``):
+
+    {"version": 1, "key": ..., "lines": ...,
+     "tools":    {"Bash": 12, "Edit": 3, ...},
+     "paths":    {"src/app.py": 2, ...},
+     "commands": {"git commit": 1, "pytest": 4, ...},
+     "errors":   {"modulenotfounderror: no module named <str>": 1, ...}}
+
+Each field maps a term to the number of events it appears in:
+
+- ``tools``:    names of ``tool_use`` items
+- ``paths``:    ``file_path`` / ``path`` / ``notebook_path`` inputs of tool calls
+- ``commands``: Bash commands reduced to the program (and subcommand, if any)
+- ``errors``:   error signatures -- the first line of an ``is_error`` tool result,
+  lower-cased, with numbers, hex ids and quoted strings replaced by placeholders
+
+At most ``MAX_TERMS`` terms are kept per field, so sidecars stay small.
+
+To search, fetch only the sidecars (e.g. ``aws s3 sync s3://<bucket>/<prefix> idx
+--exclude '*' --include '*.keywords.json'``) and query them without touching any
+transcript::
+
+    python -m gate.keyword_index --path src/app.py --error 'permission denied' \
+        idx/**/*.keywords.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections.abc import Iterable
+from typing import Any
+
+from gate.event_index import LineObserver
+
+KEYWORD_INDEX_VERSION = 1
+KEYWORD_INDEX_SUFFIX = ".keywords.json"
+FIELDS = ("tools", "paths", "commands", "errors")
+MAX_TERMS = 1000
+_PATH_INPUTS = ("file_path", "path", "notebook_path")
+_SIGNATURE_LENGTH = 160
+_SIGNATURE_SUBS = (
+    (re.compile(r"'[^']*'|\"[^\"]*\"|`[^`]*`"), "<str>"),
+    (re.compile(r"\b0x[0-9a-f]+\b|\b[0-9a-f]{8,}\b"), "<hex>"),
+    (re.compile(r"\d+"), "<n>"),
+    (re.compile(r"\s+"), " "),
+)
+
+
+def keyword_index_key(key: str) -> str:
+    """Key of the keyword index sidecar for the object at ``key``."""
+    stem = key[: -len(".jsonl")] if key.endswith(".jsonl") else key
+    return f"{stem}{KEYWORD_INDEX_SUFFIX}"
+
+
+def command_term(command: str) -> str:
+    """Reduce a shell command to its program name, plus a subcommand if one follows."""
+    words = command.split()
+    if not words:
+        return ""
+    program = os.path.basename(words[0])
+    if len(words) > 1 and re.fullmatch(r"[a-z][a-z0-9-]*", words[1]):
+        return f"{program} {words[1]}"
+    return program
+
+
+def error_signature(text: str) -> str:
+    """Normalize an error message so that occurrences of the same error compare equal."""
+    first = next((line for line in text.strip().splitlines() if line.strip()), "")
+    signature = first.strip().lower()
+    for pattern, placeholder in _SIGNATURE_SUBS:
+        signature = pattern.sub(placeholder, signature)
+    return signature[:_SIGNATURE_LENGTH]
+
+
+class KeywordIndexer(LineObserver):
+    """Builds a keyword index from an object's content, fed part by part.
+
+    It reads values before packing, so error signatures come from the error text rather
+    than from a blob reference.
+    """
+
+    reads_values = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.terms: dict[str, dict[str, int]] = {field: {} for field in FIELDS}
+        self.lines = 0
+
+    def _add(self, line: bytes, length: int) -> None:
+        self.lines += 1
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        message = event.get("message") if isinstance(event, dict) else None
+        content = message.get("content") if isinstance(message, dict) else None
+        if not isinstance(content, list):
+            return
+        found: dict[str, set[str]] = {field: set() for field in FIELDS}
+        for item in content:
+            if not isinstance(item, dict):
+                continue
+            if item.get("type") == "tool_use":
+                self._tool_use(item, found)
+            elif item.get("type") == "tool_result" and item.get("is_error"):
+                found["errors"].add(error_signature(_result_text(item.get("content"))))
+        for field, terms in found.items():
+            counts = self.terms[field]
+            for term in terms - {""}:
+                if term in counts or len(counts) < MAX_TERMS:
+                    counts[term] = counts.get(term, 0) + 1
+
+    @staticmethod
+    def _tool_use(item: dict[str, Any], found: dict[str, set[str]]) -> None:
+        if isinstance(item.get("name"), str):
+            found["tools"].add(item["name"])
+        tool_input = item.get("input")
+        if not isinstance(tool_input, dict):
+            return
+        for name in _PATH_INPUTS:
+            if isinstance(tool_input.get(name), str):
+                found["paths"].add(tool_input[name])
+        if isinstance(tool_input.get("command"), str):
+            found["commands"].add(command_term(tool_input["command"]))
+
+    def to_json(self, key: str) -> bytes:
+        index = {"version": KEYWORD_INDEX_VERSION, "key": key, "lines": self.lines, **self.terms}
+        return json.dumps(index, separators=(",", ":")).encode()
+
+
+def _result_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            item["text"]
+            for item in content
+            if isinstance(item, dict) and isinstance(item.get("text"), str)
+        )
+    return ""
+
+
+def merge_indexes(indexes: Iterable[dict[str, Any]]) -> dict[str, dict[str, dict[str, int]]]:
+    """Invert many keyword indexes: field -> term -> {object key: count}."""
+    merged: dict[str, dict[str, dict[str, int]]] = {field: {} for field in FIELDS}
+    for index in indexes:
+        key = index.get("key", "")
+        for field in FIELDS:
+            for term, count in index.get(field, {}).items():
+                merged[field].setdefault(term, {})[key] = count
+    return merged
+
+
+def search(merged: dict[str, dict[str, dict[str, int]]], field: str, query: str) -> dict[str, int]:
+    """Objects whose ``field`` has a term containing ``query`` (errors match normalized)."""
+    if field == "errors":
+        query = error_signature(query)
+    hits: dict[str, int] = {}
+    for term, keys in merged[field].items():
+        if query in term:
+            for key, count in keys.items():
+                hits[key] = hits.get(key, 0) + count
+    return hits
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m gate.keyword_index",
+        description="Find transcripts by tool, file path, command or error signature.",
+    )
+    parser.add_argument("--tool", action="append", default=[])
+    parser.add_argument("--path", action="append", default=[])
+    parser.add_argument("--command", action="append", default=[])
+    parser.add_argument("--error", action="append", default=[])
+    parser.add_argument("indexes", nargs="+", help="*.keywords.json sidecar files")
+    args = parser.parse_args(argv)
+
+    def _load(path: str) -> dict[str, Any]:
+        with open(path) as f:
+            return json.load(f)
+
+    queries = [
+        (field, query)
+        for field, values in (
+            ("tools", args.tool),
+            ("paths", args.path),
+            ("commands", args.command),
+            ("errors", args.error),
+        )
+        for query in values
+    ]
+    if not queries:
+        parser.error("give at least one of --tool, --path, --command or --error")
+    merged = merge_indexes(_load(path) for path in args.indexes)
+    matches: set[str] | None = None
+    for field, query in queries:
+        keys = set(search(merged, field, query))
+        matches = keys if matches is None else matches & keys
+    for key in sorted(matches or ()):
+        print(key)
+    return 0 if matches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
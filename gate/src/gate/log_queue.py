@@ -0,0 +1,46 @@
+"""Queue-backed logging, so log calls never wait on stderr.
+
+A run that uploads thousands of files logs from many worker threads, and with a plain
+``StreamHandler`` each record is a synchronous write to stderr under the handler's
+lock. :func:`configure` instead installs a ``QueueHandler`` on the root logger: records
+are formatted by the caller and put on an in-memory queue, and a ``QueueListener``
+thread writes them out. The listener is stopped (and the queue drained) at interpreter
+exit, so nothing logged before ``sys.exit`` is lost.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import TextIO
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+LOG_DATEFMT = "%Y-%m-%dT%H:%M:%S"
+
+
+def configure(
+    stream: TextIO | None = None,
+    level: int = logging.INFO,
+    logger: logging.Logger | None = None,
+) -> QueueListener | None:
+    """Route ``logger`` (the root logger by default) through a queue to ``stream``.
+
+    ``stream`` defaults to stderr. Like :func:`logging.basicConfig`, this does nothing
+    (and returns None) if the logger already has handlers. Returns the started listener
+    otherwise.
+    """
+    root = logger if logger is not None else logging.getLogger()
+    if root.handlers:
+        return None
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
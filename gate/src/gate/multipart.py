@@ -0,0 +1,354 @@
+"""Resumable S3 multipart uploads backed by an on-disk checkpoint journal.
+
+Every in-progress multipart upload has one JSON record in the journal directory
+(``<work_dir>/.gate/multipart/``) holding the upload id, the source file's size and
+mtime, and the ETag of every completed part. The record is rewritten atomically after
+each part, so a gate run that is killed or retried resumes where the previous attempt
+stopped instead of re-sending the whole file. Per-part checksums are journaled too,
+since CompleteMultipartUpload must repeat them. When parts are line-aligned (for
+redaction) their boundaries depend on the content, so the source offset each part ends
+at is journaled as well and a resumed upload continues from the last one.
+
+A record whose source file has changed (or disappeared) since it was written is stale:
+its upload is aborted on S3 and the record is dropped. Uploads that are never resumed
+are cleaned up by the next gate run; a bucket lifecycle rule
+(AbortIncompleteMultipartUpload) is still recommended as a backstop.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, Any, BinaryIO
+
+from gate.streaming import checksum_kwargs, iter_parts
+
+if TYPE_CHECKING:
+    from gate.transcript_upload import Observer, S3Uploader, UploadContext, UploadEntry
+
+logger = logging.getLogger("gate")
+
+JOURNAL_DIR_NAME = "multipart"
+
+
+@dataclass(slots=True)
+class JournalRecord:
+    """Checkpoint of one multipart upload."""
+
+    bucket: str
+    key: str
+    file_path: str
+    upload_id: str
+    size: int
+    mtime_ns: int
+    part_size: int
+    parts: dict[int, str] = field(default_factory=dict)
+    checksum_algorithm: str = ""
+    checksums: dict[int, str] = field(default_factory=dict)
+    # Source offset just past each uploaded part
+    offsets: dict[int, int] = field(default_factory=dict)
+    # Signature of the transformation applied to the parts (e.g. redaction), "" for none
+    transform: str = ""
+
+    def matches(
+        self,
+        st: os.stat_result,
+        part_size: int,
+        checksum_algorithm: str = "",
+        transform: str = "",
+    ) -> bool:
+        """True if the record was written for this exact file version and part layout."""
+        return (
+            self.size == st.st_size
+            and self.mtime_ns == st.st_mtime_ns
+            and self.part_size == part_size
+            and self.checksum_algorithm == checksum_algorithm
+            and self.transform == transform
+        )
+
+    def resume_point(self, start: int = 0) -> tuple[int, int]:
+        """Return ``(part_number, offset)`` of the first part still to upload.
+
+        ``start`` is the source offset the upload began at (non-zero for shards).
+
+        Parts are uploaded in order, so completed parts form a prefix; anything after a
+        gap is dropped and re-sent.
+        """
+        done = 0
+        while done + 1 in self.parts:
+            done += 1
+        for n in [n for n in self.parts if n > done]:
+            del self.parts[n]
+            self.checksums.pop(n, None)
+            self.offsets.pop(n, None)
+        if done == 0:
+            return 1, start
+        return done + 1, self.offsets.get(done, start + done * self.part_size)
+
+
+class UploadJournal:
+    """Directory of :class:`JournalRecord` files, one per (bucket, key)."""
+
+    def __init__(self, journal_dir: str) -> None:
+        self.journal_dir = journal_dir
+
+    def _path(self, bucket: str, key: str) -> str:
+        digest = hashlib.sha256(f"{bucket}/{key}".encode()).hexdigest()[:32]
+        return os.path.join(self.journal_dir, f"{digest}.json")
+
+    def _read(self, path: str) -> JournalRecord | None:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            for name in ("parts", "checksums", "offsets"):
+                data[name] = {int(n): value for n, value in data.get(name, {}).items()}
+            return JournalRecord(**data)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as exc:
+            logger.warning("Discarding unreadable upload journal %s: %s", path, exc)
+            _remove(path)
+            return None
+
+    def load(self, bucket: str, key: str) -> JournalRecord | None:
+        return self._read(self._path(bucket, key))
+
+    def records(self) -> list[JournalRecord]:
+        if not os.path.isdir(self.journal_dir):
+            return []
+        records = []
+        for name in sorted(os.listdir(self.journal_dir)):
+            if name.endswith(".json"):
+                record = self._read(os.path.join(self.journal_dir, name))
+                if record is not None:
+                    records.append(record)
+        return records
+
+    def save(self, record: JournalRecord) -> None:
+        """Write the record atomically (tmp file + rename)."""
+        os.makedirs(self.journal_dir, exist_ok=True)
+        path = self._path(record.bucket, record.key)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(asdict(record), f)
+        os.replace(tmp, path)
+
+    def discard(self, record: JournalRecord) -> None:
+        _remove(self._path(record.bucket, record.key))
+
+    def abort_stale(self, uploader: S3Uploader, bucket_name: str) -> int:
+        """Abort uploads in ``bucket_name`` whose source file no longer matches its record.
+
+        Returns:
+            Number of uploads aborted.
+        """
+        aborted = 0
+        for record in self.records():
+            if record.bucket != bucket_name:
+                continue
+            try:
+                st = os.stat(record.file_path)
+            except OSError:
+                st = None
+            if st is not None and record.matches(
+                st, record.part_size, record.checksum_algorithm, record.transform
+            ):
+                continue
+            logger.info("Aborting stale multipart upload: %s", record.key)
+            _abort(uploader, record)
+            self.discard(record)
+            aborted += 1
+        return aborted
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _error_code(exc: Exception) -> str:
+    """Return the S3 error code of a botocore ClientError (empty for anything else)."""
+    response: Any = getattr(exc, "response", None)
+    if not isinstance(response, dict):
+        return ""
+    return str(response.get("Error", {}).get("Code", ""))
+
+
+def _abort(uploader: S3Uploader, record: JournalRecord) -> None:
+    try:
+        uploader.abort_multipart_upload(
+            Bucket=record.bucket, Key=record.key, UploadId=record.upload_id
+        )
+    except Exception as exc:
+        # NoSuchUpload etc.: nothing left to clean up on the S3 side
+        logger.warning("Could not abort multipart upload %s: %s", record.key, exc)
+
+
+def upload_multipart(
+    ctx: UploadContext,
+    entry: UploadEntry,
+    f: BinaryIO,
+    observe: Observer | None = None,
+) -> None:
+    """Upload ``entry``'s byte range of the open file ``f`` as a multipart upload.
+
+    Resumes from the journal if possible. ``observe`` is called with each part's
+    uploaded bytes, in order; parts sent by an earlier attempt are re-read locally (not
+    re-sent) so that the observer still sees the whole range.
+
+    Without a journal a failed upload is aborted immediately. With one, the upload and
+    its completed parts are left in place for the next attempt to resume.
+    """
+    st = os.fstat(f.fileno())
+    journal = ctx.journal
+    if journal is not None:
+        record = journal.load(ctx.bucket_name, entry.key)
+        if record is not None and not record.matches(
+            st, ctx.part_size, ctx.checksum_algorithm, ctx.transform_signature
+        ):
+            logger.info("Source changed since last attempt, restarting upload: %s", entry.key)
+            _abort(ctx.uploader, record)
+            journal.discard(record)
+            record = None
+        if record is not None:
+            try:
+                _upload_parts(ctx, entry, record, f, observe)
+                return
+            except Exception as exc:
+                if _error_code(exc) != "NoSuchUpload":
+                    raise
+                logger.warning("Journaled upload no longer exists, restarting: %s", entry.key)
+                journal.discard(record)
+
+    create_kwargs = {"ChecksumAlgorithm": ctx.checksum_algorithm} if ctx.checksum_algorithm else {}
+    response = ctx.uploader.create_multipart_upload(
+        Bucket=ctx.bucket_name, Key=entry.key, ContentType="application/jsonl", **create_kwargs
+    )
+    record = JournalRecord(
+        bucket=ctx.bucket_name,
+        key=entry.key,
+        file_path=entry.file_path,
+        upload_id=response["UploadId"],
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        part_size=ctx.part_size,
+        checksum_algorithm=ctx.checksum_algorithm,
+        transform=ctx.transform_signature,
+    )
+    if journal is not None:
+        journal.save(record)
+    try:
+        _upload_parts(ctx, entry, record, f, observe)
+    except Exception:
+        if journal is None:
+            _abort(ctx.uploader, record)
+        raise
+
+
+def _send_part(
+    ctx: UploadContext,
+    record: JournalRecord,
+    part_number: int,
+    data: bytes | memoryview,
+    end: int,
+    stream: Callable[[int], None] | None,
+) -> None:
+    """Upload one part, covering the file up to ``end``, and journal it."""
+    checksum = checksum_kwargs(record.checksum_algorithm, data)
+    response = ctx.uploader.upload_part(
+        Bucket=record.bucket,
+        Key=record.key,
+        UploadId=record.upload_id,
+        PartNumber=part_number,
+        Body=ctx.body(memoryview(data), stream),
+        **checksum,
+    )
+    record.parts[part_number] = response["ETag"]
+    record.offsets[part_number] = end
+    for value in checksum.values():
+        record.checksums[part_number] = value
+    if ctx.journal is not None:
+        ctx.journal.save(record)
+
+
+def _upload_parts(
+    ctx: UploadContext,
+    entry: UploadEntry,
+    record: JournalRecord,
+    f: BinaryIO,
+    observe: Observer | None,
+) -> None:
+    """Send every part not yet in ``record`` and complete the upload.
+
+    The file is read once, part by part, into a single pooled buffer; each part is
+    transformed (if configured), checksummed and sent without further copies, unless
+    the transform left it shorter than ``ctx.min_part_size``: such parts are joined
+    with the following ones first.
+    """
+    part_number, offset = record.resume_point(entry.start)
+    if part_number > 1:
+        logger.info(
+            "Resuming multipart upload: %s (%d part(s) already uploaded)",
+            record.key,
+            part_number - 1,
+        )
+    stream = ctx.new_stream()
+    with ctx.pool.buffer() as buf:
+        if observe is not None and offset > entry.start:
+            line_start = True
+            for view, _ in iter_parts(f, buf, entry.start, ctx.line_aligned, end=offset):
+                observe(*ctx.transform_with_text(view, entry, line_start))
+                line_start = view[-1:] == b"\n"
+        parts = iter_parts(
+            f,
+            buf,
+            offset,
+            line_aligned=ctx.line_aligned,
+            min_part=ctx.min_part_size,
+            end=entry.end,
+        )
+        # Parts usually start a line, but not after one longer than half the buffer
+        line_start = offset == entry.start or os.pread(f.fileno(), 1, offset - 1) == b"\n"
+        # Transformed parts can shrink below S3's minimum part size (packing moves values
+        # out, redaction shortens secrets); they are held back until enough accumulates
+        pending: list[bytes] = []
+        pending_size = 0
+        for view, end in parts:
+            data, text = ctx.transform_with_text(view, entry, line_start)
+            line_start = view[-1:] == b"\n"
+            if observe is not None:
+                observe(data, text)
+            if not ctx.line_aligned or (not pending and len(data) >= ctx.min_part_size):
+                _send_part(ctx, record, part_number, data, end, stream)
+                part_number += 1
+                continue
+            pending.append(bytes(data))
+            pending_size += len(data)
+            if pending_size >= ctx.min_part_size:
+                _send_part(ctx, record, part_number, b"".join(pending), end, stream)
+                part_number += 1
+                pending.clear()
+                pending_size = 0
+        if pending:
+            _send_part(ctx, record, part_number, b"".join(pending), end, stream)
+
+    parts = []
+    for n, etag in sorted(record.parts.items()):
+        part: dict[str, Any] = {"PartNumber": n, "ETag": etag}
+        if n in record.checksums:
+            part[f"Checksum{record.checksum_algorithm}"] = record.checksums[n]
+        parts.append(part)
+    ctx.uploader.complete_multipart_upload(
+        Bucket=record.bucket,
+        Key=record.key,
+        UploadId=record.upload_id,
+        MultipartUpload={"Parts": parts},
+    )
+    if ctx.journal is not None:
+        ctx.journal.discard(record)
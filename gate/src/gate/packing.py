@@ -0,0 +1,225 @@
+"""Transcript packing: large JSON string values moved out into content-addressed blobs.
+
+Transcripts repeat the same large values over and over -- system prompts, files read
+again, big tool results. With packing enabled, every JSON string literal of at least
+``min_size`` bytes (as written, i.e. JSON-escaped) is uploaded once as a blob named by
+its SHA-256 and replaced in the transcript by a reference that is itself a JSON string,
+so packed transcripts are still valid JSONL::
+
+    "content": "<200 KiB of file>"  ->  "content": "\\u0000blob:<sha256>"
+
+Blobs are stored per session (``<prefix>/<sid>.blobs/<sha256>``) or, with the "global"
+scope, shared by all sessions (``<prefix>/blobs/<sha256>``); session blobs follow the
+session's hash-sharded prefix, if any (see :mod:`gate.key_sharding`). The keys of blobs already
+uploaded are remembered in the state directory, so later cycles do not send them again.
+:func:`rehydrate_lines` restores the original bytes exactly, fetching each blob lazily
+the first time a line refers to it.
+
+Only complete lines are packed: a part's leading fragment (when it does not start at a
+line boundary) and trailing fragment pass through unchanged. Literals are found with a
+regular expression that cannot cross a newline, so a malformed line can only affect
+itself. An original literal that happens to look like a reference is always moved to a
+blob, in lines of any length, so rehydration never mistakes it for one.
+
+Packed parts of a multipart upload are joined until they reach S3's minimum part size
+again (see :mod:`gate.multipart`). Keyword index sidecars are built from the content
+before packing, so error signatures still see the error text.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from typing import TYPE_CHECKING
+
+from gate.config import PACKING_SCOPES
+from gate.key_sharding import session_prefix
+from gate.streaming import BufferBody, checksum_kwargs
+
+if TYPE_CHECKING:
+    from gate.throttle import TokenBucket
+    from gate.transcript_upload import S3Uploader
+
+logger = logging.getLogger("gate")
+
+# Bump when the packed format changes (journaled multipart uploads are then restarted)
+PACKING_VERSION = 1
+BLOBS_SUFFIX = ".blobs"
+GLOBAL_BLOBS_PREFIX = "blobs"
+KNOWN_BLOBS_FILENAME = "blobs.json"
+REFERENCE_PREFIX = b"\\u0000blob:"
+# A JSON string literal (no raw newlines, as in valid JSONL), unrolled for speed
+_STRING = re.compile(rb'"[^"\\\n]*(?:\\.[^"\\\n]*)*"')
+_REFERENCE = re.compile(rb'"' + re.escape(REFERENCE_PREFIX) + rb'([0-9a-f]{64})"')
+_REHYDRATE_CACHE = 64
+
+
+def blob_key(prefix: str, scope: str, session_id: str, digest: str, key_shards: int = 0) -> str:
+    if scope == "session":
+        prefix = session_prefix(prefix, session_id, key_shards)
+    base = f"{session_id}{BLOBS_SUFFIX}" if scope == "session" else GLOBAL_BLOBS_PREFIX
+    return f"{prefix}/{base}/{digest}" if prefix else f"{base}/{digest}"
+
+
+class Packer:
+    """Replaces large string literals with blob references, uploading each blob once.
+
+    Thread-safe: parts of different files are packed concurrently, and a blob that two
+    threads need at once is uploaded by one of them while the other waits.
+    """
+
+    def __init__(
+        self,
+        uploader: S3Uploader,
+        bucket_name: str,
+        prefix: str,
+        scope: str,
+        min_size: int,
+        checksum_algorithm: str = "",
+        known: Iterable[str] = (),
+        key_shards: int = 0,
+        throttle: TokenBucket | None = None,
+    ) -> None:
+        if scope not in PACKING_SCOPES:
+            raise ValueError(f"unknown packing scope: {scope!r}")
+        self.uploader = uploader
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.scope = scope
+        self.min_size = min_size
+        self.checksum_algorithm = checksum_algorithm
+        self.key_shards = key_shards
+        # Blobs share the transcripts' bandwidth cap (see gate.throttle)
+        self.throttle = throttle
+        self.uploaded: set[str] = set(known)
+        self.blobs_sent = 0
+        self.bytes_sent = 0
+        self.bytes_packed = 0
+        self._lock = threading.Lock()
+        self._blob_locks: dict[str, threading.Lock] = {}
+
+    @property
+    def signature(self) -> str:
+        return f"pack-v{PACKING_VERSION}-{self.scope}-{self.min_size}"
+
+    def pack(
+        self, data: bytes | bytearray | memoryview, session_id: str, line_start: bool = True
+    ) -> bytes | bytearray | memoryview:
+        """Pack the complete lines in ``data`` (one part of an object of ``session_id``)."""
+        raw = bytes(data)
+        start = 0 if line_start else raw.find(b"\n") + 1
+        end = raw.rfind(b"\n") + 1
+        if not line_start and start == 0:
+            return data
+        # Reference look-alikes are escaped in lines of any size
+        lookalikes = raw.find(REFERENCE_PREFIX, start, end) >= 0
+        if end - start < self.min_size and not lookalikes:
+            return data
+        out: list[bytes] = [raw[:start]]
+        pos = start
+        while pos < end:
+            line_end = raw.index(b"\n", pos) + 1
+            if line_end - pos > self.min_size or (
+                lookalikes and raw.find(REFERENCE_PREFIX, pos, line_end) >= 0
+            ):
+                out.append(self._pack_line(raw, pos, line_end, session_id))
+            else:
+                out.append(raw[pos:line_end])
+            pos = line_end
+        out.append(raw[end:])
+        packed = b"".join(out)
+        if packed == raw:
+            return data
+        with self._lock:
+            self.bytes_packed += len(raw) - len(packed)
+        return packed
+
+    def _pack_line(self, raw: bytes, pos: int, end: int, session_id: str) -> bytes:
+        out = []
+        for match in _STRING.finditer(raw, pos, end):
+            inner = raw[match.start() + 1 : match.end() - 1]
+            if len(inner) < self.min_size and not inner.startswith(REFERENCE_PREFIX):
+                continue
+            digest = hashlib.sha256(inner).hexdigest()
+            self._upload_blob(
+                blob_key(self.prefix, self.scope, session_id, digest, self.key_shards), inner
+            )
+            out.append(raw[pos : match.start()])
+            out.append(b'"' + REFERENCE_PREFIX + digest.encode() + b'"')
+            pos = match.end()
+        out.append(raw[pos:end])
+        return b"".join(out)
+
+    def _upload_blob(self, key: str, body: bytes) -> None:
+        with self._lock:
+            if key in self.uploaded:
+                return
+            lock = self._blob_locks.setdefault(key, threading.Lock())
+        with lock:
+            with self._lock:
+                if key in self.uploaded:
+                    return
+            stream = self.throttle.stream() if self.throttle is not None else None
+            self.uploader.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=BufferBody(memoryview(body), on_read=stream),
+                ContentType="application/octet-stream",
+                **checksum_kwargs(self.checksum_algorithm, body),
+            )
+            with self._lock:
+                self.uploaded.add(key)
+                self.blobs_sent += 1
+                self.bytes_sent += len(body)
+
+    def log_summary(self) -> None:
+        logger.info(
+            "Packing: %.1f MB moved out of transcripts, %d new blob(s) (%.1f MB) uploaded",
+            self.bytes_packed / 1e6,
+            self.blobs_sent,
+            self.bytes_sent / 1e6,
+        )
+
+
+def load_known_blobs(state_dir: str, bucket_name: str) -> set[str]:
+    """Keys of the blobs earlier runs uploaded to ``bucket_name``."""
+    path = os.path.join(state_dir, KNOWN_BLOBS_FILENAME)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return set(data["keys"]) if data.get("bucket") == bucket_name else set()
+    except FileNotFoundError:
+        return set()
+    except (OSError, ValueError, TypeError, KeyError) as exc:
+        logger.warning("Discarding unreadable blob list %s: %s", path, exc)
+        return set()
+
+
+def save_known_blobs(state_dir: str, bucket_name: str, keys: set[str]) -> None:
+    """Write the blob list atomically (tmp file + rename)."""
+    path = os.path.join(state_dir, KNOWN_BLOBS_FILENAME)
+    os.makedirs(state_dir, exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"bucket": bucket_name, "keys": sorted(keys)}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def rehydrate_lines(lines: Iterable[bytes], fetch: Callable[[str], bytes]) -> Iterator[bytes]:
+    """Yield ``lines`` of a packed transcript with every blob reference restored.
+
+    ``fetch`` maps a blob's SHA-256 to its content (e.g. a GET of :func:`blob_key`); it is
+    only called for blobs that are referenced, and recent results are cached.
+    """
+    cached = functools.lru_cache(maxsize=_REHYDRATE_CACHE)(fetch)
+
+    def _restore(match: re.Match[bytes]) -> bytes:
+        return b'"' + cached(match.group(1).decode()) + b'"'
+
+    for line in lines:
+        yield _REFERENCE.sub(_restore, line) if REFERENCE_PREFIX in line else line
@@ -0,0 +1,178 @@
+"""Opt-in profiling of a gate run.
+
+With ``GATE_PROFILE`` set, :func:`profile_run` wraps the whole run and writes into
+``<work_dir>/.gate/profiles/<run>/``:
+
+- ``gate.prof``:       cProfile dump (load with ``pstats`` or snakeviz), merged over the
+                       main thread and every thread started during the run (upload
+                       workers, where hashing, redaction and network waits happen)
+- ``profile.txt``:     the same, as text sorted by cumulative time
+- ``tracemalloc.txt``: top allocation sites (only with ``GATE_PROFILE_TRACEMALLOC=<N>``)
+- ``summary.json``:    wall and CPU time, peak RSS, and tracemalloc peak
+
+With ``GATE_PROFILE_UPLOAD`` also set, the files are uploaded to the transcript bucket
+under ``<prefix>/diagnostics/<run>/``. Profiling never changes the gate's outcome:
+failures to write or upload artifacts are logged and ignored.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from gate.config import (
+    DIAGNOSTICS_PREFIX,
+    PROFILE_DIR_NAME,
+    ProfilingConfig,
+    TranscriptUploadConfig,
+)
+
+if TYPE_CHECKING:
+    from gate.transcript_upload import S3Uploader
+
+logger = logging.getLogger("gate")
+
+PSTATS_LINES = 60
+
+
+@contextmanager
+def profile_run(config: ProfilingConfig, state_dir: str) -> Iterator[str]:
+    """Profile the enclosed block; yields the directory the artifacts are written to."""
+    run_name = f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{os.getpid()}"
+    run_dir = os.path.join(state_dir, PROFILE_DIR_NAME, run_name)
+    if config.tracemalloc_top:
+        tracemalloc.start()
+    profiler = _ThreadProfilers()
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    profiler.enable()
+    try:
+        yield run_dir
+    finally:
+        stats = profiler.disable()
+        summary = {
+            "wall_seconds": round(time.perf_counter() - wall_started, 6),
+            "cpu_seconds": round(time.process_time() - cpu_started, 6),
+            "peak_rss_bytes": _peak_rss(),
+        }
+        snapshot = None
+        if config.tracemalloc_top:
+            snapshot = tracemalloc.take_snapshot()
+            summary["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        try:
+            _write_artifacts(run_dir, stats, summary, snapshot, config.tracemalloc_top)
+        except OSError:
+            logger.exception("Could not write profiling artifacts to %s", run_dir)
+        else:
+            logger.info(
+                "Profile written to %s (wall %.2fs, cpu %.2fs, peak RSS %.1f MiB)",
+                run_dir,
+                summary["wall_seconds"],
+                summary["cpu_seconds"],
+                summary["peak_rss_bytes"] / (1024 * 1024),
+            )
+            if config.upload:
+                _upload_artifacts(run_dir)
+
+
+class _ThreadProfilers:
+    """One cProfile profiler per thread: the caller's, and one for each thread it starts.
+
+    ``cProfile`` only sees the thread that enabled it, so a hook installed with
+    :func:`threading.setprofile` starts a profiler in every new thread as it begins
+    running; :meth:`disable` merges them all.
+    """
+
+    def __init__(self) -> None:
+        self._profilers = [cProfile.Profile()]
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        threading.setprofile(self._start_thread)
+        self._profilers[0].enable()
+
+    def disable(self) -> pstats.Stats:
+        self._profilers[0].disable()
+        threading.setprofile(None)
+        with self._lock:
+            profilers = list(self._profilers)
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+    def _start_thread(self, frame: object, event: str, arg: object) -> None:
+        # Called once per new thread, as its first profile event; the thread's own
+        # profiler replaces this hook
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._profilers.append(profiler)
+        profiler.enable()
+
+
+def _peak_rss() -> int:
+    """Peak resident set size of this process in bytes (ru_maxrss is KiB on Linux)."""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _write_artifacts(
+    run_dir: str,
+    stats: pstats.Stats,
+    summary: dict,
+    snapshot: tracemalloc.Snapshot | None,
+    top: int,
+) -> None:
+    os.makedirs(run_dir, exist_ok=True)
+    stats.dump_stats(os.path.join(run_dir, "gate.prof"))
+    text = io.StringIO()
+    stats.stream = text  # type: ignore[attr-defined]
+    stats.sort_stats("cumulative").print_stats(PSTATS_LINES)
+    with open(os.path.join(run_dir, "profile.txt"), "w") as f:
+        f.write(text.getvalue())
+    if snapshot is not None:
+        with open(os.path.join(run_dir, "tracemalloc.txt"), "w") as f:
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+    with open(os.path.join(run_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def _upload_artifacts(run_dir: str, uploader: S3Uploader | None = None) -> None:
+    """Upload every file in ``run_dir`` under the diagnostics prefix. Failures are logged."""
+    config = TranscriptUploadConfig.from_env()
+    if config is None:
+        logger.info("Profile upload skipped: AWS_S3_BUCKET_NAME not configured")
+        return
+    run_name = os.path.basename(run_dir)
+    prefix = f"{config.prefix}/{DIAGNOSTICS_PREFIX}" if config.prefix else DIAGNOSTICS_PREFIX
+    try:
+        if uploader is None:
+            from gate.transcript_upload import create_s3_client
+
+            uploader = create_s3_client(config)
+        for name in sorted(os.listdir(run_dir)):
+            with open(os.path.join(run_dir, name), "rb") as f:
+                uploader.put_object(
+                    Bucket=config.bucket_name,
+                    Key=f"{prefix}/{run_name}/{name}",
+                    Body=f.read(),
+                    ContentType="application/octet-stream",
+                )
+        logger.info("Profile uploaded to s3://%s/%s/%s/", config.bucket_name, prefix, run_name)
+    except Exception:
+        logger.exception("Profile upload failed (non-fatal)")
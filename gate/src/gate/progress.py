@@ -0,0 +1,116 @@
+"""Aggregated upload progress, in place of one log line per file.
+
+With thousands of transcripts, a log line per upload costs measurable time and buries
+the lines that matter in the Argo logs. Upload workers instead report each finished
+object to an :class:`UploadProgress`, which logs one line at most every
+``TRANSCRIPT_PROGRESS_INTERVAL`` seconds, plus a last one when the run ends::
+
+    Upload progress: files=1200 failed=0 bytes=734003200 rate=48.2 MiB/s redacted=3
+
+(``redacted`` counts the secrets masked so far, with ``TRANSCRIPT_REDACTION``; it is
+left out while there are none.)
+
+With ``TRANSCRIPT_UPLOAD_LOG`` set to a path, every object is also appended there as
+one JSON line (``key``, ``bytes``, ``seconds`` and, for failures, ``error``), so the
+per-file detail is still available without being in the pod log.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import IO, TYPE_CHECKING
+
+from gate.compaction import UploadedFile
+from gate.config import MIB
+
+if TYPE_CHECKING:
+    from gate.transcript_upload import UploadEntry
+
+logger = logging.getLogger("gate")
+
+
+class UploadProgress:
+    """Thread-safe counters of finished uploads, logged periodically.
+
+    Args:
+        interval: Minimum seconds between progress lines.
+        detail_path: File to append one JSON line per upload to ("" = none).
+    """
+
+    def __init__(self, interval: float, detail_path: str = "") -> None:
+        self.interval = interval
+        self.files = 0
+        self.failed = 0
+        self.bytes = 0
+        self.redacted = 0
+        self._started = time.monotonic()
+        self._logged = self._started
+        self._lock = threading.Lock()
+        self._detail: IO[str] | None = None
+        if detail_path:
+            try:
+                self._detail = open(detail_path, "a")
+            except OSError as exc:
+                logger.warning("Cannot open upload log %s: %s", detail_path, exc)
+
+    def record(self, entry: UploadEntry, result: UploadedFile | Exception, seconds: float) -> None:
+        """Count one finished upload task (``result`` is its error if it failed)."""
+        failed = isinstance(result, Exception)
+        size = 0 if failed else (entry.end if entry.end is not None else result.size) - entry.start
+        now = time.monotonic()
+        with self._lock:
+            self.files += 1
+            self.failed += failed
+            self.bytes += size
+            if self._detail is not None:
+                detail = {"key": entry.key, "bytes": size, "seconds": round(seconds, 3)}
+                if failed:
+                    detail["error"] = str(result) or type(result).__name__
+                self._write_detail(self._detail, detail)
+            if now - self._logged < self.interval:
+                return
+            self._logged = now
+        self._log(now)
+
+    def add_redacted(self, count: int) -> None:
+        """Count ``count`` secrets masked in an upload, for the next progress line."""
+        with self._lock:
+            self.redacted += count
+
+    def _write_detail(self, f: IO[str], detail: dict[str, object]) -> None:
+        """Append one detail line; on a write error (e.g. a full disk) stop writing them."""
+        try:
+            f.write(json.dumps(detail) + "\n")
+        except OSError as exc:
+            logger.warning("Upload log %s is unwritable, disabling it: %s", f.name, exc)
+            try:
+                f.close()
+            except OSError:
+                pass
+            self._detail = None
+
+    def close(self) -> None:
+        """Log the final totals (if anything was uploaded) and close the detail file."""
+        with self._lock:
+            if self._detail is not None:
+                try:
+                    self._detail.close()
+                except OSError as exc:
+                    logger.warning("Cannot close upload log %s: %s", self._detail.name, exc)
+                self._detail = None
+        if self.files:
+            self._log(time.monotonic())
+
+    def _log(self, now: float) -> None:
+        elapsed = max(now - self._started, 1e-9)
+        logger.info(
+            "Upload progress: files=%d failed=%d bytes=%d rate=%.1f MiB/s%s",
+            self.files,
+            self.failed,
+            self.bytes,
+            self.bytes / MIB / elapsed,
+            f" redacted={self.redacted}" if self.redacted else "",
+        )
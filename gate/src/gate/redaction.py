@@ -0,0 +1,224 @@
+"""Streaming secret redaction for transcripts before they leave the pod.
+
+Tool output captured in transcripts can contain credentials. When redaction is enabled,
+every part of every transcript passes through :meth:`Redactor.redact` on its way to S3.
+All patterns are compiled into one alternation of named groups and each match is
+replaced with ``[REDACTED:<pattern name>]``.
+
+``re`` cannot skip ahead through an alternation, so running it over every byte manages
+only a few MB/s. Each default pattern therefore also names literal *triggers*, at least
+one of which every match contains. The triggers compile into a single prefilter that
+starts with a character class (which ``re`` does scan quickly), and only the lines the
+prefilter hits are run through the full alternation. Transcripts are JSONL, so a
+secret never spans lines.
+
+Multipart parts are line-aligned (see :func:`gate.streaming.iter_parts`), so a secret
+is only split across two parts if no newline falls between the minimum and the full
+part size.
+
+``re`` holds the GIL while it scans, so upload threads alone only overlap redaction
+with network I/O. With ``workers`` > 0 parts are scanned in a shared process pool,
+which lets redaction of different files run on several cores at the cost of copying
+each part to and from the worker.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger("gate")
+
+# Bump when the pattern set changes: journaled multipart uploads produced with another
+# version are restarted rather than resumed with differently-redacted parts.
+REDACTION_VERSION = 1
+
+DEFAULT_PATTERNS: dict[str, bytes] = {
+    "aws_access_key_id": rb"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b",
+    "github_token": rb"\bgh[pousr]_[A-Za-z0-9]{36,255}\b",
+    "github_pat": rb"\bgithub_pat_[A-Za-z0-9_]{22,255}\b",
+    "anthropic_api_key": rb"\bsk-ant-[A-Za-z0-9_-]{20,}",
+    "slack_token": rb"\bxox[abposr]-[A-Za-z0-9-]{10,}",
+    "linear_api_key": rb"\blin_api_[A-Za-z0-9]{32,}",
+    "jwt": rb"\beyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}",
+    "bearer_token": rb"(?i:\bbearer\s+)[A-Za-z0-9._~+/-]{20,}=*",
+    # Inside JSON strings the key's line breaks appear as the two characters "\n"
+    "private_key": (
+        rb"-----BEGIN [A-Z ]*PRIVATE KEY-----[A-Za-z0-9+/=\\\s]{0,16384}?"
+        rb"-----END [A-Z ]*PRIVATE KEY-----"
+    ),
+}
+
+DEFAULT_TRIGGERS: dict[str, tuple[bytes, ...]] = {
+    "aws_access_key_id": (b"AKIA", b"ASIA"),
+    "github_token": (b"ghp_", b"gho_", b"ghu_", b"ghs_", b"ghr_"),
+    "github_pat": (b"github_pat_",),
+    "anthropic_api_key": (b"sk-ant-",),
+    "slack_token": (b"xox",),
+    "linear_api_key": (b"lin_api_",),
+    "jwt": (b"eyJ",),
+    # Mixed-case spellings other than these are not caught
+    "bearer_token": (b"earer", b"EARER"),
+    "private_key": (b"-----BEGIN",),
+}
+
+
+def compile_patterns(patterns: dict[str, bytes]) -> re.Pattern[bytes]:
+    """Combine ``patterns`` into one alternation; each becomes a named group."""
+    for name in patterns:
+        if not name.isidentifier():
+            raise ValueError(f"invalid redaction pattern name: {name!r}")
+    return re.compile(b"|".join(b"(?P<%s>%s)" % (n.encode(), p) for n, p in patterns.items()))
+
+
+def compile_prefilter(
+    patterns: dict[str, bytes], triggers: dict[str, tuple[bytes, ...]]
+) -> re.Pattern[bytes] | None:
+    """Build the trigger prefilter, or None if some pattern has no triggers.
+
+    The first bytes of all triggers become one leading character class followed by an
+    alternation of the remainders. That over-matches (a first byte of one trigger with
+    the rest of another), which only costs a few extra candidate lines.
+    """
+    literals = [t for name in patterns for t in triggers.get(name, ())]
+    if not literals or any(not triggers.get(name) for name in patterns):
+        return None
+    first = b"".join(re.escape(bytes([b])) for b in sorted({t[0] for t in literals}))
+    rest = b"|".join(re.escape(t[1:]) for t in sorted(set(literals)))
+    return re.compile(b"[%s](?:%s)" % (first, rest))
+
+
+def redact_bytes(
+    pattern: re.Pattern[bytes],
+    data: bytes | bytearray | memoryview,
+    prefilter: re.Pattern[bytes] | None = None,
+) -> tuple[bytes | bytearray | memoryview, Counter[str]]:
+    """Return ``data`` with every match replaced, and the match count per pattern name.
+
+    With a ``prefilter`` only lines it matches are scanned; ``data`` itself is returned
+    when there are none.
+    """
+    counts: Counter[str] = Counter()
+
+    def _replace(match: re.Match[bytes]) -> bytes:
+        name = match.lastgroup or "secret"
+        counts[name] += 1
+        return b"[REDACTED:%s]" % name.encode()
+
+    if prefilter is None:
+        return pattern.sub(_replace, data), counts
+    raw = data if isinstance(data, bytes) else bytes(data)
+    pieces: list[bytes] = []
+    pos = 0
+    hit = prefilter.search(raw)
+    while hit is not None:
+        start = raw.rfind(b"\n", pos, hit.start()) + 1 or pos
+        end = raw.find(b"\n", hit.end())
+        end = len(raw) if end < 0 else end + 1
+        pieces.append(raw[pos:start])
+        pieces.append(pattern.sub(_replace, raw[start:end]))
+        pos = end
+        hit = prefilter.search(raw, pos)
+    if not pieces:
+        return data, counts
+    pieces.append(raw[pos:])
+    return b"".join(pieces), counts
+
+
+_CompiledPatterns = tuple[re.Pattern[bytes], re.Pattern[bytes] | None]
+_worker_patterns: _CompiledPatterns | None = None
+
+
+def _compile(
+    patterns: dict[str, bytes], triggers: dict[str, tuple[bytes, ...]]
+) -> _CompiledPatterns:
+    return compile_patterns(patterns), compile_prefilter(patterns, triggers)
+
+
+def _init_worker(patterns: dict[str, bytes], triggers: dict[str, tuple[bytes, ...]]) -> None:
+    global _worker_patterns
+    _worker_patterns = _compile(patterns, triggers)
+
+
+def _redact_in_worker(data: bytes) -> tuple[bytes | bytearray | memoryview, Counter[str]]:
+    pattern, prefilter = _worker_patterns or _compile(DEFAULT_PATTERNS, DEFAULT_TRIGGERS)
+    return redact_bytes(pattern, data, prefilter)
+
+
+class Redactor:
+    """Thread-safe redaction stage with throughput and match accounting."""
+
+    def __init__(
+        self,
+        patterns: dict[str, bytes] | None = None,
+        workers: int = 0,
+        triggers: dict[str, tuple[bytes, ...]] | None = None,
+    ) -> None:
+        self.patterns = dict(DEFAULT_PATTERNS if patterns is None else patterns)
+        if triggers is None:
+            triggers = DEFAULT_TRIGGERS if patterns is None else {}
+        self._pattern, self._prefilter = _compile(self.patterns, triggers)
+        self._executor: ProcessPoolExecutor | None = None
+        if workers > 0:
+            # Imported here: multiprocessing is a noticeable share of gate start-up time
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.patterns, triggers),
+            )
+        self._lock = threading.Lock()
+        self.matches: Counter[str] = Counter()
+        self.bytes_scanned = 0
+        self.seconds = 0.0
+
+    @property
+    def signature(self) -> str:
+        """Identifies the output this redactor produces (pattern set and version)."""
+        digest = hashlib.sha256(repr(sorted(self.patterns.items())).encode()).hexdigest()
+        return f"redact-v{REDACTION_VERSION}-{digest[:12]}"
+
+    def redact(
+        self, data: bytes | bytearray | memoryview
+    ) -> tuple[bytes | bytearray | memoryview, Counter[str]]:
+        started = time.perf_counter()
+        if self._executor is not None:
+            redacted, counts = self._executor.submit(_redact_in_worker, bytes(data)).result()
+        else:
+            redacted, counts = redact_bytes(self._pattern, data, self._prefilter)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.matches.update(counts)
+            self.bytes_scanned += len(data)
+            self.seconds += elapsed
+        return redacted, counts
+
+    @property
+    def throughput(self) -> float:
+        """Aggregate scan throughput in MB/s (summed over threads, so a lower bound)."""
+        return self.bytes_scanned / self.seconds / 1e6 if self.seconds else 0.0
+
+    def log_summary(self) -> None:
+        total = sum(self.matches.values())
+        by_pattern = ", ".join(f"{name}={n}" for name, n in sorted(self.matches.items()))
+        logger.info(
+            "Redaction: %d match(es) in %.1f MB at %.1f MB/s%s",
+            total,
+            self.bytes_scanned / 1e6,
+            self.throughput,
+            f" ({by_pattern})" if by_pattern else "",
+        )
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
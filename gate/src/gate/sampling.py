@@ -0,0 +1,171 @@
+"""Deterministic sampling of transcript uploads, with a summary of every file.
+
+Storing every subagent transcript of every cycle costs more than its debugging value.
+With a sample rate below 100%, files are kept or skipped by a hash of their session
+id, so the decision is the same for all of a session's files of one kind, in every
+cycle and on every pod:
+
+- main transcripts are kept at ``sample_main_percent`` (default: all of them);
+- subagent transcripts at ``sample_subagent_percent``;
+- with ``sample_keep_errors``, every file of a session whose main transcript ended in
+  an error (an API error, an error result, or a failed tool call as its last event)
+  is kept regardless.
+
+Each run then uploads one small JSONL summary, ``<prefix>/summaries/<run>.jsonl``, with
+a record for every file it considered -- sampled or not -- so fleet statistics stay
+complete. Records of skipped files also carry line, tool-call and error counts and the
+first and last event timestamps, computed locally.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING, Any
+
+from gate.config import TranscriptUploadConfig
+from gate.event_index import LineObserver
+
+if TYPE_CHECKING:
+    from gate.transcript_upload import UploadEntry
+
+SUMMARIES_PREFIX = "summaries"
+# Bytes read from the end of a main transcript to find its last event
+_TAIL_BYTES = 64 * 1024
+_READ_CHUNK = 1024 * 1024
+
+
+def sample_point(session_id: str) -> float:
+    """Stable position of ``session_id`` in [0, 100), uniform over session ids."""
+    digest = hashlib.sha256(session_id.encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64 * 100
+
+
+def is_sampled(session_id: str, percent: float) -> bool:
+    return sample_point(session_id) < percent
+
+
+def ended_in_error(file_path: str) -> bool:
+    """True if the last complete event of the transcript at ``file_path`` is an error."""
+    try:
+        with open(file_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(max(size - _TAIL_BYTES, 0))
+            tail = f.read()
+    except OSError:
+        return False
+    for line in reversed(tail.splitlines()):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        return isinstance(event, dict) and _is_error(event)
+    return False
+
+
+def _is_error(event: dict[str, Any]) -> bool:
+    if event.get("isApiErrorMessage") or event.get("is_error") is True:
+        return True
+    if event.get("type") == "error" or str(event.get("subtype", "")).startswith("error"):
+        return True
+    message = event.get("message")
+    content = message.get("content") if isinstance(message, dict) else None
+    return isinstance(content, list) and any(
+        isinstance(item, dict) and item.get("type") == "tool_result" and item.get("is_error")
+        for item in content
+    )
+
+
+def iter_sampled(
+    transcript_dir: str, uploads: Iterable[UploadEntry], config: TranscriptUploadConfig
+) -> Iterator[tuple[UploadEntry, bool]]:
+    """Yield each of ``uploads`` with whether the sampling policy keeps it, as they come."""
+    errored: dict[str, bool] = {}
+    for entry in uploads:
+        main = is_main(transcript_dir, entry)
+        percent = config.sample_main_percent if main else config.sample_subagent_percent
+        keep = is_sampled(entry.session_id, percent)
+        if not keep and config.sample_keep_errors:
+            if entry.session_id not in errored:
+                main_path = os.path.join(transcript_dir, f"{entry.session_id}.jsonl")
+                errored[entry.session_id] = ended_in_error(main_path)
+            keep = errored[entry.session_id]
+        yield entry, keep
+
+
+def is_main(transcript_dir: str, entry: UploadEntry) -> bool:
+    """True for a session's main transcript (as opposed to one of its subagents')."""
+    return os.path.normpath(os.path.dirname(entry.file_path)) == os.path.normpath(transcript_dir)
+
+
+class _FileSummary(LineObserver):
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines = 0
+        self.tool_uses = 0
+        self.errors = 0
+        self.first_timestamp: str | None = None
+        self.last_timestamp: str | None = None
+
+    def _add(self, line: bytes, length: int) -> None:
+        self.lines += 1
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        timestamp = event.get("timestamp")
+        if isinstance(timestamp, str):
+            self.first_timestamp = self.first_timestamp or timestamp
+            self.last_timestamp = timestamp
+        message = event.get("message")
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, list):
+            for item in content:
+                if isinstance(item, dict):
+                    self.tool_uses += item.get("type") == "tool_use"
+                    self.errors += item.get("type") == "tool_result" and bool(item.get("is_error"))
+
+
+def summarize(transcript_dir: str, entry: UploadEntry, sampled: bool) -> dict[str, Any]:
+    """Summary record of one file; skipped files are scanned for their counts."""
+    record: dict[str, Any] = {
+        "key": entry.key,
+        "session_id": entry.session_id,
+        "role": "main" if is_main(transcript_dir, entry) else "subagent",
+        "size": os.path.getsize(entry.file_path),
+        "sampled": sampled,
+    }
+    if sampled:
+        return record
+    summary = _FileSummary()
+    with open(entry.file_path, "rb") as f:
+        while chunk := f.read(_READ_CHUNK):
+            summary.feed(chunk)
+    summary.finish()
+    record.update(
+        lines=summary.lines,
+        tool_uses=summary.tool_uses,
+        errors=summary.errors,
+        first_timestamp=summary.first_timestamp,
+        last_timestamp=summary.last_timestamp,
+    )
+    return record
+
+
+def summary_key(prefix: str, depth: int | None) -> str:
+    run = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    name = f"{run}-depth-{depth:05d}" if depth is not None else f"{run}-{os.getpid()}"
+    return (
+        f"{prefix}/{SUMMARIES_PREFIX}/{name}.jsonl"
+        if prefix
+        else f"{SUMMARIES_PREFIX}/{name}.jsonl"
+    )
+
+
+def build_summary(records: list[dict[str, Any]]) -> bytes:
+    return b"".join(json.dumps(r, separators=(",", ":")).encode() + b"\n" for r in records)
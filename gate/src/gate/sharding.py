@@ -0,0 +1,134 @@
+"""Line-aligned sharding of large transcripts.
+
+A transcript larger than ``shard_size`` is uploaded as several independent objects
+instead of one, so both the upload and downstream reads can run in parallel:
+
+  <stem>.jsonl -> <stem>.shards/part-00000.jsonl, part-00001.jsonl, ...
+                  <stem>.shards/index.json
+
+Shard boundaries always fall just after a newline, so every shard is itself valid
+JSONL. They are planned up front by seeking to each nominal boundary and reading
+forward to the next newline; the shard contents are only read once, while uploading.
+
+The index lists, per shard, its key, source byte range, line range, uploaded size and
+first/last event timestamp. It is written only after every shard has been uploaded.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+INDEX_VERSION = 1
+SHARDS_SUFFIX = ".shards"
+INDEX_FILENAME = "index.json"
+
+_SCAN_CHUNK = 64 * 1024
+# Bytes of each part carried into the next scan, so a timestamp split across parts is seen
+_TAIL = 64
+_FIRST_TIMESTAMP = re.compile(rb'"timestamp":\s*"([^"]*)"')
+# Greedy prefix: backtracks from the end, so only the tail of the data is examined
+_LAST_TIMESTAMP = re.compile(rb'(?s).*"timestamp":\s*"([^"]*)"')
+
+
+def shard_prefix(key: str) -> str:
+    """Key prefix under which the shards of ``key`` (a ``.jsonl`` key) are stored."""
+    stem = key[: -len(".jsonl")] if key.endswith(".jsonl") else key
+    return f"{stem}{SHARDS_SUFFIX}"
+
+
+def shard_key(key: str, index: int) -> str:
+    return f"{shard_prefix(key)}/part-{index:05d}.jsonl"
+
+
+def index_key(key: str) -> str:
+    return f"{shard_prefix(key)}/{INDEX_FILENAME}"
+
+
+def plan_shards(file_path: str, size: int, shard_size: int) -> list[tuple[int, int]]:
+    """Split the first ``size`` bytes of ``file_path`` into line-aligned byte ranges.
+
+    Each range is at least ``shard_size`` long (except the last) and ends just past a
+    newline. A line longer than ``shard_size`` extends its shard rather than being split.
+    """
+    bounds = [0]
+    with open(file_path, "rb") as f:
+        pos = shard_size
+        while pos < size:
+            newline = _next_newline(f, pos, size)
+            if newline < 0 or newline + 1 >= size:
+                break
+            bounds.append(newline + 1)
+            pos = newline + 1 + shard_size
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _next_newline(f: BinaryIO, pos: int, size: int) -> int:
+    """Offset of the first newline at or after ``pos`` (before ``size``), or -1."""
+    f.seek(pos)
+    while pos < size:
+        chunk = f.read(min(_SCAN_CHUNK, size - pos))
+        if not chunk:
+            break
+        i = chunk.find(b"\n")
+        if i >= 0:
+            return pos + i
+        pos += len(chunk)
+    return -1
+
+
+@dataclass(slots=True)
+class ShardStats:
+    """Per-shard facts gathered from the uploaded bytes as they stream past."""
+
+    key: str
+    start: int
+    end: int
+    lines: int = 0
+    size: int = 0
+    first_timestamp: str | None = None
+    last_timestamp: str | None = None
+    _tail: bytes = field(default=b"", repr=False)
+
+    def feed(self, data: bytes | bytearray | memoryview) -> None:
+        """Account for the next part of the shard's (uploaded) content."""
+        window = self._tail + data
+        self.lines += window.count(b"\n", len(self._tail))
+        self.size += len(data)
+        if self.first_timestamp is None:
+            match = _FIRST_TIMESTAMP.search(window)
+            if match:
+                self.first_timestamp = match.group(1).decode(errors="replace")
+        match = _LAST_TIMESTAMP.match(window)
+        if match:
+            self.last_timestamp = match.group(1).decode(errors="replace")
+        self._tail = window[-_TAIL:]
+
+
+def build_index(key: str, shards: list[ShardStats]) -> bytes:
+    """Serialize the shard index of ``key``; line ranges are half-open and 0-based."""
+    entries = []
+    line = 0
+    for shard in shards:
+        entries.append(
+            {
+                "key": shard.key,
+                "byte_range": [shard.start, shard.end],
+                "line_range": [line, line + shard.lines],
+                "size": shard.size,
+                "first_timestamp": shard.first_timestamp,
+                "last_timestamp": shard.last_timestamp,
+            }
+        )
+        line += shard.lines
+    index = {
+        "version": INDEX_VERSION,
+        "source_key": key,
+        "size": shards[-1].end if shards else 0,
+        "lines": line,
+        "shards": entries,
+    }
+    return json.dumps(index, indent=1).encode()
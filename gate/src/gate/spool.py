@@ -0,0 +1,189 @@
+"""Durable spool of transcript uploads that failed (or were deferred) in a gate run.
+
+A failed upload is otherwise only retried if a later cycle happens to upload the same
+file again -- and not at all after the workflow's last cycle, or once the file has left
+the transcript directory. Instead, each such file is snapshotted into
+``<state_dir>/spool/`` on the work volume:
+
+  <digest>.jsonl   a copy of the file's content when it was spooled
+  <digest>.json    {"key", "session_id", "source", "size", "spooled_at", "attempts",
+                    "destinations", ...}
+
+Failed delta objects (see :mod:`gate.deltas`) are spooled too, with ``reason`` "delta"
+and a snapshot of just the delta's byte range; they are sent as they are, never
+sharded.
+
+``destinations`` names the fan-out destinations (see :mod:`gate.fanout`) that still
+need the object when only some of them failed; it is empty when every destination does
+(an ordinary failure, or a record written before the field existed).
+
+The next gate run drains the spool before its regular uploads, including runs whose
+upload policy defers new uploads (see :mod:`gate.upload_policy`). An entry whose key is
+also part of that run's uploads is superseded by the newer file and dropped rather
+than sent (if that upload fails too, it is simply spooled again), so nothing is
+uploaded twice. An entry is removed only after its upload succeeds.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+
+logger = logging.getLogger("gate")
+
+SPOOL_DIR_NAME = "spool"
+_COPY_CHUNK = 1024 * 1024
+
+
+def has_spooled(state_dir: str) -> bool:
+    """Whether the spool under ``state_dir`` holds anything, without reading it."""
+    try:
+        return bool(os.listdir(os.path.join(state_dir, SPOOL_DIR_NAME)))
+    except OSError:
+        return False
+
+
+@dataclass(slots=True)
+class SpoolEntry:
+    """A spooled upload: the object key and the snapshot of the file to send."""
+
+    key: str
+    session_id: str
+    source: str
+    size: int
+    spooled_at: float
+    reason: str = "failed"
+    attempts: int = 0
+    # Destinations still missing the object (empty: all of them)
+    destinations: list[str] = field(default_factory=list)
+
+
+class UploadSpool:
+    """Directory of spooled uploads, one record and one content snapshot per key."""
+
+    def __init__(self, spool_dir: str) -> None:
+        self.spool_dir = spool_dir
+
+    def _path(self, key: str, suffix: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        return os.path.join(self.spool_dir, f"{digest}{suffix}")
+
+    def data_path(self, entry: SpoolEntry) -> str:
+        return self._path(entry.key, ".jsonl")
+
+    def add(
+        self,
+        key: str,
+        session_id: str,
+        file_path: str,
+        reason: str = "failed",
+        destinations: Iterable[str] = (),
+        start: int = 0,
+        end: int | None = None,
+    ) -> None:
+        """Snapshot ``file_path`` as the pending upload of ``key`` (replacing an older one).
+
+        ``destinations`` limits the upload to those fan-out destinations (default: all);
+        ``start`` and ``end`` limit the snapshot to that byte range (default: the file).
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        data_path = self._path(key, ".jsonl")
+        previous = self._read(self._path(key, ".json"))
+        if start == 0 and end is None:
+            shutil.copyfile(file_path, f"{data_path}.tmp")
+        else:
+            _copy_range(file_path, f"{data_path}.tmp", start, end)
+        os.replace(f"{data_path}.tmp", data_path)
+        entry = SpoolEntry(
+            key=key,
+            session_id=session_id,
+            source=file_path,
+            size=os.path.getsize(data_path),
+            spooled_at=time.time(),
+            reason=reason,
+            attempts=previous.attempts if previous is not None else 0,
+            destinations=sorted(destinations),
+        )
+        self._write(entry)
+        if entry.destinations:
+            logger.info(
+                "Spooled %s upload of %s to %s for the next run",
+                reason,
+                key,
+                ", ".join(entry.destinations),
+            )
+        else:
+            logger.info("Spooled %s upload of %s for the next run", reason, key)
+
+    def entries(self) -> list[SpoolEntry]:
+        if not os.path.isdir(self.spool_dir):
+            return []
+        entries = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            if name.endswith(".json"):
+                entry = self._read(os.path.join(self.spool_dir, name))
+                if entry is not None:
+                    entries.append(entry)
+        return entries
+
+    def failed(self, entry: SpoolEntry, destinations: Iterable[str] | None = None) -> None:
+        """Count a failed attempt; ``destinations`` replaces the ones still missing it."""
+        entry.attempts += 1
+        if destinations is not None:
+            entry.destinations = sorted(destinations)
+        self._write(entry)
+
+    def remove(self, entry: SpoolEntry) -> None:
+        for suffix in (".json", ".jsonl"):
+            try:
+                os.remove(self._path(entry.key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def _read(self, path: str) -> SpoolEntry | None:
+        try:
+            with open(path) as f:
+                entry = SpoolEntry(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as exc:
+            logger.warning("Discarding unreadable spool record %s: %s", path, exc)
+            _remove(path)
+            return None
+        if not os.path.exists(self.data_path(entry)):
+            logger.warning("Discarding spool record without data: %s", entry.key)
+            _remove(path)
+            return None
+        return entry
+
+    def _write(self, entry: SpoolEntry) -> None:
+        """Write the record atomically (tmp file + rename)."""
+        path = self._path(entry.key, ".json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(asdict(entry), f)
+        os.replace(f"{path}.tmp", path)
+
+
+def _copy_range(src: str, dst: str, start: int, end: int | None) -> None:
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fsrc.seek(start)
+        remaining = (os.path.getsize(src) if end is None else end) - start
+        while remaining > 0:
+            chunk = fsrc.read(min(remaining, _COPY_CHUNK))
+            if not chunk:
+                break
+            fdst.write(chunk)
+            remaining -= len(chunk)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,209 @@
+"""Single-pass read pipeline: pooled buffers, in-flight checksums, zero-copy bodies.
+
+Every transcript byte is read from disk exactly once, via ``readinto`` into one of a
+fixed set of reusable buffers. The same buffer is checksummed and then handed to S3
+as a read-only file-like view, so uploads allocate no per-file or per-part ``bytes``
+(redaction, when enabled, is the one stage that produces a new copy of each part).
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import queue
+import threading
+import zlib
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import BinaryIO
+
+from gate.config import CHECKSUM_ALGORITHMS
+
+
+class BufferPool:
+    """A bounded set of reusable ``bytearray`` buffers shared by upload workers.
+
+    Buffers are allocated lazily, at most ``count`` of them; once all are in use,
+    :meth:`buffer` blocks until one is returned. Memory is therefore capped at
+    ``count * buffer_size`` however many files are uploaded.
+    """
+
+    def __init__(self, buffer_size: int, count: int) -> None:
+        self.buffer_size = buffer_size
+        self.count = count
+        self._free: queue.SimpleQueue[bytearray] = queue.SimpleQueue()
+        self._allocated = 0
+        self._lock = threading.Lock()
+
+    @property
+    def allocated(self) -> int:
+        return self._allocated
+
+    def acquire(self) -> bytearray:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._allocated < self.count:
+                self._allocated += 1
+                return bytearray(self.buffer_size)
+        return self._free.get()
+
+    def release(self, buf: bytearray) -> None:
+        self._free.put(buf)
+
+    @contextmanager
+    def buffer(self) -> Iterator[bytearray]:
+        buf = self.acquire()
+        try:
+            yield buf
+        finally:
+            self.release(buf)
+
+
+def fill(f: BinaryIO, view: memoryview) -> int:
+    """``readinto`` until ``view`` is full or EOF; return the number of bytes read."""
+    total = 0
+    while total < len(view):
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+
+def iter_parts(
+    f: BinaryIO,
+    buf: bytearray,
+    start: int = 0,
+    line_aligned: bool = False,
+    min_part: int = 0,
+    end: int | None = None,
+) -> Iterator[tuple[memoryview, int]]:
+    """Read ``f`` from ``start`` (up to ``end``, if given) into ``buf`` one part at a time.
+
+    Yields ``(view, end)`` where ``view`` is the part's bytes (valid only until the next
+    iteration) and ``end`` the source offset just past it. With ``line_aligned`` each part
+    except the last ends at a newline, provided one falls at or after ``min_part`` bytes
+    (and never before half the buffer). The unsent tail is moved to the front of the
+    buffer rather than read again; it cannot overlap itself because it is at most half
+    the buffer long.
+    """
+    view = memoryview(buf)
+    floor = max(min_part, len(view) // 2)
+    f.seek(start)
+    offset = start
+    carry = 0
+    while True:
+        limit = len(view) if end is None else min(len(view), end - offset)
+        n = carry + fill(f, view[carry:limit])
+        if n == 0:
+            return
+        eof = n < len(view)
+        cut = n
+        if line_aligned and not eof:
+            newline = buf.rfind(b"\n", max(floor - 1, 0), n)
+            if newline >= 0:
+                cut = newline + 1
+        offset += cut
+        yield view[:cut], offset
+        carry = n - cut
+        if carry:
+            buf[:carry] = view[cut:n]
+        elif eof:
+            return
+
+
+class BufferBody(io.RawIOBase):
+    """Read-only, seekable file-like view over a buffer, usable as an S3 ``Body``.
+
+    botocore accepts file-like bodies (but not memoryviews); wrapping the pooled
+    buffer avoids copying it into a ``bytes`` object. Seeking lets botocore rewind
+    the body for retries. ``on_read`` is called with the size of every read before
+    it is served, which is where bandwidth shaping hooks in (see :mod:`gate.throttle`).
+    """
+
+    def __init__(self, view: memoryview, on_read: Callable[[int], None] | None = None) -> None:
+        super().__init__()
+        self._view = view
+        self._pos = 0
+        self._on_read = on_read
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def copy(self) -> BufferBody:
+        """A new body over the same bytes (rewound), e.g. to send them to another bucket."""
+        return BufferBody(self._view, self._on_read)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"negative seek position: {pos}")
+        self._pos = pos
+        return pos
+
+    def readinto(self, b) -> int:  # type: ignore[override]
+        chunk = self._view[self._pos : self._pos + len(b)]
+        n = len(chunk)
+        if n and self._on_read is not None:
+            self._on_read(n)
+        b[:n] = chunk
+        self._pos += n
+        return n
+
+
+class Checksum:
+    """Incremental S3 additional checksum (``CRC32`` or ``SHA256``)."""
+
+    def __init__(self, algorithm: str) -> None:
+        if algorithm not in CHECKSUM_ALGORITHMS:
+            raise ValueError(f"unsupported checksum algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self._crc = 0
+        self._sha = hashlib.sha256() if algorithm == "SHA256" else None
+
+    def update(self, data: bytes | bytearray | memoryview) -> None:
+        if self._sha is not None:
+            self._sha.update(data)
+        else:
+            self._crc = zlib.crc32(data, self._crc)
+
+    def b64digest(self) -> str:
+        if self._sha is not None:
+            digest = self._sha.digest()
+        else:
+            digest = self._crc.to_bytes(4, "big")
+        return base64.b64encode(digest).decode("ascii")
+
+    @property
+    def param(self) -> str:
+        """Name of the S3 request/response field carrying this checksum."""
+        return f"Checksum{self.algorithm}"
+
+
+def checksum_kwargs(algorithm: str, data: bytes | bytearray | memoryview) -> dict[str, str]:
+    """Return the ``Checksum<ALG>`` request kwarg for ``data`` (empty if disabled)."""
+    if not algorithm:
+        return {}
+    checksum = Checksum(algorithm)
+    checksum.update(data)
+    return {checksum.param: checksum.b64digest()}
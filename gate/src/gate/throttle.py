@@ -0,0 +1,109 @@
+"""Bandwidth shaping for transcript uploads.
+
+A single :class:`TokenBucket` is shared by every upload thread and charged as request
+bodies are read by the HTTP layer, so the gate's aggregate send rate stays under the
+configured cap and neighbours on the node (the MCP daemon, other workflows' agents)
+do not see latency spikes while transcripts upload.
+
+The bucket runs a deficit: a read is admitted whenever the balance is non-negative and
+may drive it negative, which later readers repay by waiting. Reads larger than the
+burst allowance therefore still pass, and the long-run rate overshoots the cap by at
+most one read.
+
+Each file draws from the bucket through a :class:`BandwidthStream`, which can carry a
+per-file minimum share: while a stream is below that rate it may send even when the
+shared bucket is empty. Those bytes are still charged to the bucket, so other streams
+slow down to compensate.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+
+DEFAULT_BURST_SECONDS = 0.1
+
+
+class TokenBucket:
+    """Thread-safe deficit token bucket measured in bytes.
+
+    Args:
+        rate: Sustained rate in bytes per second.
+        burst: Maximum balance that can accumulate while idle, in bytes. Defaults to
+            ``DEFAULT_BURST_SECONDS`` worth of ``rate``.
+        min_share: Per-stream guaranteed rate in bytes per second (0 disables it).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 0,
+        min_share: float = 0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.burst = float(burst) if burst > 0 else self.rate * DEFAULT_BURST_SECONDS
+        self.min_share = float(min_share)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def stream(self) -> BandwidthStream:
+        """Return a per-file handle that charges this bucket."""
+        return BandwidthStream(self)
+
+    def consume(self, n: int, stream: BandwidthStream | None = None) -> None:
+        """Block until ``n`` bytes may be sent."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                shared = self._tokens >= 0
+                wait = 0.0 if shared else -self._tokens / self.rate
+                if stream is not None and self.min_share > 0:
+                    # Always advance the stream's allowance so its accounting stays current
+                    wait = min(wait, stream._wait(now))
+                if wait <= 0:
+                    self._tokens -= n
+                    if stream is not None:
+                        stream._charge(n, shared)
+                    return
+            self._sleep(wait)
+
+
+class BandwidthStream:
+    """One file's view of a shared :class:`TokenBucket`; callable as a read hook."""
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        self._bucket = bucket
+        # The minimum-share allowance refills at bucket.min_share, capped at one second
+        self._allowance = bucket.min_share
+        self._updated = bucket._clock()
+
+    def _wait(self, now: float) -> float:
+        """Seconds until this stream's minimum-share allowance is non-negative."""
+        rate = self._bucket.min_share
+        self._allowance = min(rate, self._allowance + (now - self._updated) * rate)
+        self._updated = now
+        return -self._allowance / rate if self._allowance < 0 else 0.0
+
+    def _charge(self, n: int, shared: bool) -> None:
+        if self._bucket.min_share <= 0:
+            return
+        # Bytes admitted by the shared bucket use up the allowance but never push it into
+        # debt; only bytes sent on the guarantee itself have to be earned back.
+        self._allowance = max(self._allowance - n, 0.0) if shared else self._allowance - n
+
+    def __call__(self, n: int) -> None:
+        self._bucket.consume(n, self)
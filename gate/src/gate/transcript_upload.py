@@ -6,89 +6,501 @@ Directory structure:
   <transcript_dir>/<sessionId>.jsonl             -> s3://<bucket>/<prefix>/<sessionId>.jsonl
   <transcript_dir>/<sessionId>/subagents/*.jsonl -> s3://<bucket>/<prefix>/<sessionId>/<filename>.jsonl
 
-The "<prefix>/" segment is omitted when no prefix is configured.
+The "<prefix>/" segment is omitted when no prefix is configured. That is the "legacy"
+key template; the default "partitioned" one inserts date, workflow and role partitions
+(``date=2026-01-31/workflow=<name>/role=main/<sessionId>.jsonl``) so query engines can
+prune them and one workflow or day is a cheap prefix listing. Each cycle overwrites the
+same object per transcript. With key sharding, a hashed sub-prefix follows the
+partition segments (see :mod:`gate.key_sharding`).
+
+The directory scan feeds a bounded queue that upload workers drain as it goes, so
+uploads start with the first file found and the scan no longer queues every file up
+front; only the small per-file entries are kept (for the sampling summary, deltas and
+compaction). With a non-empty spool, and for the asyncio engine, the scan is
+materialized first.
+Files larger than ``config.part_size`` are sent as multipart uploads; when a state
+directory is given, their progress is journaled there so a retried run resumes them
+(see :mod:`gate.multipart`). Every byte is read once into a pooled buffer that is
+checksummed and uploaded in place (see :mod:`gate.streaming`). With redaction enabled,
+parts are line-aligned and scrubbed of secrets on the way (see :mod:`gate.redaction`).
+Files larger than ``config.shard_size`` (when set) are split into line-aligned shard
+objects plus an index, uploaded in parallel (see :mod:`gate.sharding`). Each object
+can also get an event offset index sidecar for ranged reads (see :mod:`gate.event_index`)
+and a keyword index sidecar for search (see :mod:`gate.keyword_index`).
+With deltas enabled, the lines appended since the previous cycle are also uploaded as a
+per-depth delta object (see :mod:`gate.deltas`). Extra destinations configured with
+``AWS_S3_EXTRA_DESTINATIONS`` receive every object from the same read (see :mod:`gate.fanout`).
+Slow single-request uploads can be hedged with a duplicate request (see :mod:`gate.hedging`).
+With several candidate endpoints, the fastest is picked by probing and failed over from
+if it keeps failing (see :mod:`gate.endpoints`).
+With a state directory, files that fail to upload are spooled there and sent first by
+the next run (see :mod:`gate.spool`). A sampling policy can skip part of the sessions,
+leaving a summary record of every file instead (see :mod:`gate.sampling`). Packing moves
+large string values out into blobs uploaded once each (see :mod:`gate.packing`). Small
+objects can be zstd-compressed with a trained dictionary (see :mod:`gate.dictionaries`).
+Finished uploads are logged as periodic aggregated progress lines rather than one line
+per file, with optional per-file detail in a JSONL file (see :mod:`gate.progress`).
 """
 
 from __future__ import annotations
 
+import itertools
 import logging
 import os
+import queue
+import string
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
-from typing import Protocol
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import TYPE_CHECKING, Any, BinaryIO, Protocol
+
+from gate.compaction import UploadedFile, compact_session
+from gate.config import DEFAULT_KEY_TEMPLATE, S3_MIN_PART_SIZE, TranscriptUploadConfig
+from gate.deltas import OffsetTracker, delta_key
+from gate.dictionaries import DictCompressor, load_compressor, publish
+from gate.endpoints import FailoverUploader, rank_endpoints
+from gate.event_index import EventIndexer, LineObserver, event_index_key
+from gate.fanout import DestinationError, FanOutUploader, Target
+from gate.hedging import Hedger
+from gate.key_sharding import key_shard
+from gate.keyword_index import KeywordIndexer, keyword_index_key
+from gate.multipart import JOURNAL_DIR_NAME, UploadJournal, upload_multipart
+from gate.packing import Packer, load_known_blobs, save_known_blobs
+from gate.progress import UploadProgress
+from gate.redaction import Redactor
+from gate.sampling import build_summary, iter_sampled, summarize, summary_key
+from gate.sharding import ShardStats, build_index, index_key, plan_shards, shard_key
+from gate.spool import SPOOL_DIR_NAME, SpoolEntry, UploadSpool
+from gate.streaming import BufferBody, BufferPool, checksum_kwargs, fill
+from gate.throttle import TokenBucket
 
-from gate.config import TranscriptUploadConfig
+if TYPE_CHECKING:
+    from gate.async_upload import AsyncS3Uploader
 
 logger = logging.getLogger("gate")
 
+# Called with each part of an object as uploaded, and as it was before packing (see
+# UploadContext.transform_with_text)
+Observer = Callable[[bytes | memoryview, bytes | memoryview], None]
+
 TRANSCRIPT_UPLOAD_CONCURRENCY = 5
+# Upload tasks waiting per worker before the directory scan blocks
+UPLOAD_QUEUE_DEPTH = 2
+# Extra passes over the spool at the end of a workflow's last cycle, and the first delay
+FINAL_FLUSH_ATTEMPTS = 3
+FINAL_FLUSH_BACKOFF = 2.0
 ASSUME_ROLE_SESSION_NAME = "gate-transcript-upload"
+# Key template fields that name the session; segments before them are partitions
+_SESSION_FIELDS = {"session", "name", "path"}
 
 
 class S3Uploader(Protocol):
-    """Abstraction over S3 put_object for testability."""
+    """Abstraction over the S3 object/multipart upload calls, for testability."""
+
+    def put_object(
+        self, *, Bucket: str, Key: str, Body: BinaryIO | bytes, ContentType: str, **kwargs: Any
+    ) -> Any: ...
+
+    def create_multipart_upload(
+        self, *, Bucket: str, Key: str, ContentType: str, **kwargs: Any
+    ) -> dict[str, Any]: ...
+
+    def upload_part(
+        self,
+        *,
+        Bucket: str,
+        Key: str,
+        UploadId: str,
+        PartNumber: int,
+        Body: BinaryIO | bytes,
+        **kwargs: Any,
+    ) -> dict[str, Any]: ...
 
-    def put_object(self, *, Bucket: str, Key: str, Body: bytes, ContentType: str) -> None: ...
+    def complete_multipart_upload(
+        self, *, Bucket: str, Key: str, UploadId: str, MultipartUpload: dict[str, Any]
+    ) -> dict[str, Any]: ...
+
+    def abort_multipart_upload(self, *, Bucket: str, Key: str, UploadId: str) -> dict[str, Any]: ...
 
 
 @dataclass(frozen=True, slots=True)
 class UploadEntry:
-    """A single file to upload: local path -> S3 key."""
+    """A single object to upload: local path (or a byte range of it) -> S3 key."""
 
     key: str
     file_path: str
+    session_id: str = ""
+    start: int = 0
+    # End of the byte range to upload; None uploads to EOF
+    end: int | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class UploadContext:
+    """Per-run state shared by all upload workers."""
+
+    uploader: S3Uploader
+    bucket_name: str
+    part_size: int
+    pool: BufferPool
+    journal: UploadJournal | None = None
+    checksum_algorithm: str = ""
+    throttle: TokenBucket | None = None
+    redactor: Redactor | None = None
+    # Line-aligned multipart parts are never cut shorter than this (S3's minimum)
+    min_part_size: int = S3_MIN_PART_SIZE
+    # Upload an event offset index beside each object (see gate.event_index)
+    event_index: bool = False
+    # Upload a keyword index beside each object (see gate.keyword_index)
+    keyword_index: bool = False
+    # Sends single-request uploads, hedging slow ones (see gate.hedging)
+    hedger: Hedger | None = None
+    # Moves large string values out into blobs (see gate.packing)
+    packer: Packer | None = None
+    # Compresses small single-request objects (see gate.dictionaries)
+    compressor: DictCompressor | None = None
+    # Counts finished uploads for the periodic progress lines (see gate.progress)
+    progress: UploadProgress | None = None
+
+    @property
+    def line_aligned(self) -> bool:
+        """True if parts must end on line boundaries (so no secret or value is split)."""
+        return self.redactor is not None or self.packer is not None
+
+    @property
+    def transform_signature(self) -> str:
+        return "+".join(t.signature for t in (self.redactor, self.packer) if t is not None)
+
+    def transform(
+        self, view: memoryview, entry: UploadEntry, line_start: bool = True
+    ) -> memoryview:
+        """Apply redaction, then packing (if enabled) to one part of ``entry``'s content.
+
+        ``line_start`` is False for a part that begins in the middle of a line.
+        """
+        return self.transform_with_text(view, entry, line_start)[0]
+
+    def transform_with_text(
+        self, view: memoryview, entry: UploadEntry, line_start: bool = True
+    ) -> tuple[memoryview, memoryview]:
+        """Like :meth:`transform`, also returning the part as it was before packing.
+
+        The second value is redacted but keeps every value inline, for indexers that
+        need the values themselves rather than blob references.
+        """
+        if self.redactor is not None:
+            redacted, counts = self.redactor.redact(view)
+            if counts:
+                # Once per part or shard: the totals go to the progress line instead
+                logger.debug("Redacted %d secret(s) in %s", sum(counts.values()), entry.key)
+                if self.progress is not None:
+                    self.progress.add_redacted(sum(counts.values()))
+            view = memoryview(redacted)
+        if self.packer is None:
+            return view, view
+        return memoryview(self.packer.pack(view, entry.session_id, line_start)), view
+
+    def encode(self, data: bytes | memoryview) -> tuple[bytes | memoryview, dict[str, Any]]:
+        """Compress a single-request body if it is small enough; returns it and put kwargs."""
+        if self.compressor is None or len(data) > self.compressor.max_size:
+            return data, {}
+        return self.compressor.compress(data), self.compressor.put_kwargs
+
+    def body(self, view: memoryview, stream: Callable[[int], None] | None) -> BufferBody:
+        """Wrap ``view`` as a request body charged to ``stream`` (if throttled)."""
+        return BufferBody(view, on_read=stream)
+
+    def new_stream(self) -> Callable[[int], None] | None:
+        """Return a per-file bandwidth stream, or None when uploads are not throttled."""
+        return self.throttle.stream() if self.throttle is not None else None
+
+    def put(self, key: str, body: bytes, content_type: str) -> None:
+        """Upload a generated object (index, sidecar, summary), throttled like transcripts."""
+        self.uploader.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=self.body(memoryview(body), self.new_stream()),
+            ContentType=content_type,
+            **checksum_kwargs(self.checksum_algorithm, body),
+        )
 
 
-def _find_transcript_files(transcript_dir: str) -> list[str]:
-    """Return paths to .jsonl files in the transcript directory."""
+def _iter_transcript_files(transcript_dir: str) -> Iterator[str]:
+    """Yield paths to .jsonl files in the transcript directory as the scan finds them."""
     if not os.path.isdir(transcript_dir):
-        return []
-    return [
-        os.path.join(transcript_dir, f)
-        for f in os.listdir(transcript_dir)
-        if f.endswith(".jsonl") and f != ".jsonl"
-    ]
+        return
+    with os.scandir(transcript_dir) as it:
+        for dir_entry in it:
+            if dir_entry.name.endswith(".jsonl") and dir_entry.name != ".jsonl":
+                yield dir_entry.path
 
 
-def _collect_uploads(
-    transcript_dir: str, transcript_files: list[str], prefix: str = ""
-) -> list[UploadEntry]:
-    """Build the full list of uploads: main transcripts + subagent transcripts.
+def _iter_uploads(
+    transcript_dir: str,
+    transcript_files: Iterable[str],
+    prefix: str = "",
+    key_template: str = DEFAULT_KEY_TEMPLATE,
+    partitions: dict[str, str] | None = None,
+    key_shards: int = 0,
+) -> Iterator[UploadEntry]:
+    """Yield the uploads of ``transcript_files``: each main transcript, then its subagents'.
 
-    If ``prefix`` is non-empty it is prepended to every S3 key (with a ``/`` separator).
+    Keys are ``key_template`` rendered with ``partitions`` (see :func:`_partitions`) and
+    the file's session, name and role. If ``prefix`` is non-empty it is prepended to
+    every S3 key (with a ``/`` separator). With ``key_shards``, the session's hashed
+    sub-prefix goes after the template's partition segments, just before the first
+    segment naming the session, so partitions can still be listed by prefix.
     """
+    fields = partitions if partitions is not None else _partitions(None, None)
+    partition_template, session_template = _split_key_template(key_template)
 
-    def _key(suffix: str) -> str:
-        return f"{prefix}/{suffix}" if prefix else suffix
+    def _key(session_id: str, name: str | None = None) -> str:
+        values = {
+            **fields,
+            "role": "main" if name is None else "subagent",
+            "session": session_id,
+            "name": session_id if name is None else name,
+            "path": session_id if name is None else f"{session_id}/{name}",
+        }
+        segments = [
+            prefix,
+            partition_template.format(**values),
+            key_shard(session_id, key_shards) if key_shards > 1 else "",
+            session_template.format(**values),
+        ]
+        return "/".join(segment for segment in segments if segment)
 
-    uploads: list[UploadEntry] = []
     for transcript_file in transcript_files:
         filename = os.path.basename(transcript_file)
         session_id = os.path.splitext(filename)[0]
 
-        uploads.append(UploadEntry(key=_key(f"{session_id}.jsonl"), file_path=transcript_file))
+        yield UploadEntry(
+            key=_key(session_id),
+            file_path=transcript_file,
+            session_id=session_id,
+        )
 
         subagent_dir = os.path.join(transcript_dir, session_id, "subagents")
         if os.path.isdir(subagent_dir):
             for sub_file in os.listdir(subagent_dir):
                 if sub_file.endswith(".jsonl"):
-                    uploads.append(
-                        UploadEntry(
-                            key=_key(f"{session_id}/{sub_file}"),
-                            file_path=os.path.join(subagent_dir, sub_file),
-                        )
+                    yield UploadEntry(
+                        key=_key(session_id, sub_file[: -len(".jsonl")]),
+                        file_path=os.path.join(subagent_dir, sub_file),
+                        session_id=session_id,
                     )
-    return uploads
 
 
-def _upload_single(uploader: S3Uploader, bucket_name: str, entry: UploadEntry) -> None:
-    """Upload a single file to S3."""
-    logger.info("Uploading transcript: %s", entry.key)
-    with open(entry.file_path, "rb") as f:
-        body = f.read()
-    uploader.put_object(
-        Bucket=bucket_name, Key=entry.key, Body=body, ContentType="application/jsonl"
+def _split_key_template(key_template: str) -> tuple[str, str]:
+    """Split ``key_template`` before its first segment naming the session.
+
+    Returns the leading partition segments ("" if none) and the rest.
+    """
+    segments = key_template.split("/")
+    for i, segment in enumerate(segments):
+        fields = {name for _, name, _, _ in string.Formatter().parse(segment) if name}
+        if fields & _SESSION_FIELDS:
+            return "/".join(segments[:i]), "/".join(segments[i:])
+    return "", key_template
+
+
+def _partitions(config: TranscriptUploadConfig | None, depth: int | None) -> dict[str, str]:
+    """Partition values for key templates: the workflow's date, name and this depth.
+
+    The date is the workflow's creation date (UTC) when known, else this run's.
+    """
+    now = time.gmtime()
+    if config is not None and config.workflow_created:
+        try:
+            now = time.strptime(config.workflow_created[:10], "%Y-%m-%d")
+        except ValueError:
+            logger.warning("Ignoring invalid workflow creation time %r", config.workflow_created)
+
+    def _value(raw: str) -> str:
+        return raw.replace("/", "_") or "unknown"
+
+    return {
+        "date": time.strftime("%Y-%m-%d", now),
+        "year": time.strftime("%Y", now),
+        "month": time.strftime("%m", now),
+        "day": time.strftime("%d", now),
+        "workflow": _value(config.workflow_name if config is not None else ""),
+        "workflow_uid": _value(config.workflow_uid if config is not None else ""),
+        "depth": f"{depth:05d}" if depth is not None else "unknown",
+    }
+
+
+def _upload_single(
+    ctx: UploadContext,
+    entry: UploadEntry,
+    observe: Observer | None = None,
+) -> UploadedFile:
+    """Upload a single file (or byte range) to S3, multipart when it exceeds ``ctx.part_size``.
+
+    ``observe`` is called with the uploaded bytes, part by part, and the same bytes
+    before packing (see :data:`Observer`). Returns the file's stat
+    snapshot from when it was opened for reading.
+    """
+    logger.debug("Uploading transcript: %s", entry.key)
+    with open(entry.file_path, "rb", buffering=0) as f:
+        st = os.fstat(f.fileno())
+        uploaded = UploadedFile(entry.key, entry.file_path, st.st_size, st.st_mtime_ns)
+        end = st.st_size if entry.end is None else entry.end
+        if end - entry.start > ctx.part_size:
+            upload_multipart(ctx, entry, f, observe)
+            return uploaded
+        buf: bytearray | None = ctx.pool.acquire()
+        try:
+            view = memoryview(buf)[: end - entry.start]
+            f.seek(entry.start)
+            data, text = ctx.transform_with_text(view[: fill(f, view)], entry)
+            if observe is not None:
+                observe(data, text)
+            data, encoding = ctx.encode(data)
+            checksum = checksum_kwargs(ctx.checksum_algorithm, data)
+
+            def put(uploader: S3Uploader) -> Any:
+                return uploader.put_object(
+                    Bucket=ctx.bucket_name,
+                    Key=entry.key,
+                    Body=ctx.body(memoryview(data), ctx.new_stream()),
+                    ContentType="application/jsonl",
+                    **encoding,
+                    **checksum,
+                )
+
+            if ctx.hedger is None:
+                put(ctx.uploader)
+            else:
+                # A losing duplicate may still be reading the buffer; the hedger releases it
+                release, buf = partial(ctx.pool.release, buf), None
+                ctx.hedger.send(put, len(data), release)
+        finally:
+            if buf is not None:
+                ctx.pool.release(buf)
+    return uploaded
+
+
+def _run_uploads(
+    ctx: UploadContext,
+    tasks: Iterable[tuple[UploadEntry, ShardStats | None]],
+    config: TranscriptUploadConfig,
+    workers: int,
+    async_uploader: AsyncS3Uploader | None,
+) -> list[tuple[UploadEntry, UploadedFile | Exception]]:
+    """Run every upload task on the configured engine; returns each entry's result or error.
+
+    The threaded engine consumes ``tasks`` as they are produced (see :func:`_run_threaded`);
+    the asyncio engine takes them all at once.
+    """
+    if config.async_uploads and isinstance(ctx.uploader, FanOutUploader):
+        logger.warning("TRANSCRIPT_UPLOAD_ASYNC does not fan out; using the threaded engine")
+    elif config.async_uploads:
+        from gate.async_upload import aiobotocore_available, run_async_uploads
+
+        if async_uploader is not None or aiobotocore_available():
+            return run_async_uploads(ctx, list(tasks), config, workers, async_uploader)
+        logger.warning("TRANSCRIPT_UPLOAD_ASYNC needs aiobotocore; using the threaded engine")
+    return _run_threaded(ctx, tasks, workers)
+
+
+def _run_threaded(
+    ctx: UploadContext,
+    tasks: Iterable[tuple[UploadEntry, ShardStats | None]],
+    workers: int,
+) -> list[tuple[UploadEntry, UploadedFile | Exception]]:
+    """Upload ``tasks`` on up to ``workers`` threads, fed through a bounded queue.
+
+    Each task is handed over as soon as ``tasks`` yields it, so uploads overlap the
+    directory scan producing them; once ``UPLOAD_QUEUE_DEPTH`` tasks per worker are
+    waiting, the producer blocks until a worker takes one. Workers start with the first
+    tasks, so a run with fewer tasks than ``workers`` starts fewer threads.
+    """
+    pending: queue.Queue[tuple[UploadEntry, ShardStats | None] | None] = queue.Queue(
+        workers * UPLOAD_QUEUE_DEPTH
     )
+    results: list[tuple[UploadEntry, UploadedFile | Exception]] = []
+    threads: list[threading.Thread] = []
+
+    def work() -> None:
+        while (task := pending.get()) is not None:
+            entry, shard = task
+            started = time.monotonic()
+            result: UploadedFile | Exception
+            try:
+                result = _upload_task(ctx, entry, shard)
+            except Exception as exc:
+                result = exc
+            results.append((entry, result))
+            _record_progress(ctx, entry, result, time.monotonic() - started)
+
+    try:
+        for task in tasks:
+            if len(threads) < workers:
+                thread = threading.Thread(target=work, name=f"gate-upload-{len(threads)}")
+                thread.start()
+                threads.append(thread)
+            pending.put(task)
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+    return results
+
+
+def _record_progress(
+    ctx: UploadContext, entry: UploadEntry, result: UploadedFile | Exception, seconds: float
+) -> None:
+    """Report a finished task to ``ctx.progress``; never raises into an upload worker."""
+    if ctx.progress is None:
+        return
+    try:
+        ctx.progress.record(entry, result, seconds)
+    except Exception:
+        logger.exception("Recording upload progress failed for %s", entry.key)
+
+
+def _new_indexers(ctx: UploadContext) -> list[tuple[Callable[[str], str], LineObserver]]:
+    """The configured sidecar indexers, each with the function giving its sidecar's key."""
+    indexers: list[tuple[Callable[[str], str], LineObserver]] = []
+    if ctx.event_index:
+        indexers.append((event_index_key, EventIndexer()))
+    if ctx.keyword_index:
+        indexers.append((keyword_index_key, KeywordIndexer()))
+    return indexers
+
+
+def _sidecars(
+    key: str, indexers: list[tuple[Callable[[str], str], LineObserver]]
+) -> list[tuple[str, bytes]]:
+    """Finish each indexer fed with ``key``'s content; returns (sidecar key, body) pairs."""
+    sidecars = []
+    for sidecar_key, indexer in indexers:
+        indexer.finish()
+        sidecars.append((sidecar_key(key), indexer.to_json(key)))
+    return sidecars
+
+
+def _upload_task(
+    ctx: UploadContext, entry: UploadEntry, shard: ShardStats | None = None
+) -> UploadedFile:
+    """Upload one object plus its index sidecars, feeding the shard stats if it is a shard."""
+    indexers = _new_indexers(ctx)
+
+    def observe(data: bytes | memoryview, text: bytes | memoryview) -> None:
+        if shard is not None:
+            shard.feed(data)
+        for _, indexer in indexers:
+            indexer.feed(text if indexer.reads_values else data)
+
+    uploaded = _upload_single(ctx, entry, observe if shard is not None or indexers else None)
+    for key, body in _sidecars(entry.key, indexers):
+        ctx.put(key, body, "application/json")
+    return uploaded
 
 
 def _assume_role_credentials(config: TranscriptUploadConfig) -> dict[str, str]:
@@ -96,8 +508,8 @@ def _assume_role_credentials(config: TranscriptUploadConfig) -> dict[str, str]:
     import boto3
 
     sts_kwargs: dict[str, str] = {"region_name": config.region}
-    if config.endpoint_url:
-        sts_kwargs["endpoint_url"] = config.endpoint_url
+    if config.sts_endpoint_url:
+        sts_kwargs["endpoint_url"] = config.sts_endpoint_url
     sts = boto3.client("sts", **sts_kwargs)
     logger.info("Assuming role for transcript upload: %s", config.assume_role_arn)
     response = sts.assume_role(
@@ -112,7 +524,14 @@ def _assume_role_credentials(config: TranscriptUploadConfig) -> dict[str, str]:
     }
 
 
-def _create_s3_client(config: TranscriptUploadConfig) -> S3Uploader:
+def _with_credentials(config: TranscriptUploadConfig) -> TranscriptUploadConfig:
+    """Return ``config`` holding its AssumeRole credentials, assuming the role if needed."""
+    if not config.assume_role_arn or config.credentials is not None:
+        return config
+    return replace(config, credentials=_assume_role_credentials(config))
+
+
+def create_s3_client(config: TranscriptUploadConfig) -> S3Uploader:
     """Build a boto3 S3 client, optionally using STS AssumeRole credentials."""
     import boto3
 
@@ -120,14 +539,455 @@ def _create_s3_client(config: TranscriptUploadConfig) -> S3Uploader:
     if config.endpoint_url:
         client_kwargs["endpoint_url"] = config.endpoint_url
     if config.assume_role_arn:
-        client_kwargs.update(_assume_role_credentials(config))
+        client_kwargs.update(_with_credentials(config).credentials or {})
     return boto3.client("s3", **client_kwargs)
 
 
+def prepare_uploader(
+    config: TranscriptUploadConfig, workers: int = TRANSCRIPT_UPLOAD_CONCURRENCY
+) -> tuple[TranscriptUploadConfig, S3Uploader]:
+    """Build the uploader for ``config``: the S3 client, plus fan-out to extra destinations.
+
+    The role is assumed once here: the returned config (as adjusted by
+    :func:`_create_uploader`) carries the credentials, so endpoint, failover and hedge
+    clients built from it reuse them.
+    """
+    config, uploader = _create_uploader(_with_credentials(config))
+    if config.destinations:
+        uploader = _create_fanout(config, uploader, workers)
+    return config, uploader
+
+
+def _create_uploader(
+    config: TranscriptUploadConfig,
+) -> tuple[TranscriptUploadConfig, S3Uploader]:
+    """Build the S3 client; with several ``endpoint_urls``, the fastest one wins.
+
+    Returns the config with ``endpoint_url`` set to the chosen endpoint (so other clients
+    built from it, e.g. for hedging, use it too) and the client.
+    """
+    if len(config.endpoint_urls) < 2:
+        return config, create_s3_client(config)
+    ranked = rank_endpoints(config.endpoint_urls)
+    chosen = replace(config, endpoint_url=ranked[0])
+
+    def _client(url: str) -> S3Uploader:
+        return create_s3_client(replace(config, endpoint_url=url))
+
+    return chosen, FailoverUploader(ranked, _client)
+
+
+def _create_fanout(
+    config: TranscriptUploadConfig, primary: S3Uploader, workers: int
+) -> FanOutUploader:
+    """Wrap ``primary`` so every call is also sent to ``config.destinations``."""
+    targets = [Target(f"s3://{config.bucket_name}", config.bucket_name, primary)]
+    for i, destination in enumerate(config.destinations, start=1):
+        client = create_s3_client(
+            replace(
+                config,
+                bucket_name=destination.bucket_name,
+                region=destination.region,
+                endpoint_url=destination.endpoint_url,
+                assume_role_arn=destination.assume_role_arn,
+                credentials=None,
+            )
+        )
+        name = f"s3://{destination.bucket_name}"
+        if any(t.name == name for t in targets):
+            name = f"{name}#{i}"
+        targets.append(Target(name, destination.bucket_name, client))
+    logger.info(
+        "Uploading transcripts to %d destination(s): %s",
+        len(targets),
+        ", ".join(t.name for t in targets),
+    )
+    return FanOutUploader(targets, workers * len(config.destinations))
+
+
+def _entry_tasks(
+    entry: UploadEntry, shard_size: int
+) -> tuple[list[tuple[UploadEntry, ShardStats | None]], list[ShardStats]]:
+    """The upload tasks of one file, and its shards in order if it is sharded."""
+    size = os.path.getsize(entry.file_path) if shard_size > 0 else 0
+    if size <= shard_size:
+        return [(entry, None)], []
+    shards = [
+        ShardStats(shard_key(entry.key, i), start, end)
+        for i, (start, end) in enumerate(plan_shards(entry.file_path, size, shard_size))
+    ]
+    logger.info("Sharding %s into %d shard(s)", entry.key, len(shards))
+    tasks: list[tuple[UploadEntry, ShardStats | None]] = [
+        (UploadEntry(shard.key, entry.file_path, entry.session_id, shard.start, shard.end), shard)
+        for shard in shards
+    ]
+    return tasks, shards
+
+
+def _upload_shard_index(ctx: UploadContext, entry: UploadEntry, shards: list[ShardStats]) -> None:
+    ctx.put(index_key(entry.key), build_index(entry.key, shards), "application/json")
+
+
+def _upload_deltas(
+    ctx: UploadContext,
+    transcript_dir: str,
+    uploads: list[UploadEntry],
+    tracker: OffsetTracker,
+    depth: int,
+    workers: int,
+    spool: UploadSpool | None,
+) -> tuple[list[tuple[UploadEntry, Exception]], bool]:
+    """Upload each file's newly appended lines as its delta object for ``depth``.
+
+    A delta that fails is spooled (its byte range only) and sent by the next run or the
+    final flush. Offsets advance for deltas that were uploaded or spooled, so the lines
+    are not sent again in the next delta. Returns the failed ones and whether all of
+    them were spooled.
+    """
+    tasks: list[tuple[UploadEntry, UploadEntry]] = []
+    for entry in uploads:
+        span = tracker.plan(_offset_id(transcript_dir, entry), entry.file_path)
+        if span is not None:
+            delta = UploadEntry(
+                delta_key(entry.key, depth), entry.file_path, entry.session_id, *span
+            )
+            tasks.append((entry, delta))
+
+    failures: list[tuple[UploadEntry, Exception]] = []
+    spooled = True
+    sent = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_upload_single, ctx, delta): (entry, delta) for entry, delta in tasks
+        }
+        for future in as_completed(futures):
+            entry, delta = futures[future]
+            try:
+                future.result()
+            except Exception as exc:
+                failures.append((entry, exc))
+                if not _spool_delta(spool, delta, exc):
+                    spooled = False
+                    continue
+            else:
+                sent += delta.end - delta.start
+            tracker.advance(_offset_id(transcript_dir, entry), entry.file_path, delta.end)
+    logger.info(
+        "Uploaded %d delta object(s) for depth %d (%d bytes)",
+        len(tasks) - len(failures),
+        depth,
+        sent,
+    )
+    return failures, spooled
+
+
+def _spool_delta(spool: UploadSpool | None, delta: UploadEntry, exc: Exception) -> bool:
+    """Spool a failed delta's byte range (for the destinations it missed); True if done."""
+    if spool is None:
+        return False
+    missing: dict[str, set[str] | None] = {}
+    _note_missing(missing, delta.key, exc)
+    try:
+        spool.add(
+            delta.key,
+            delta.session_id,
+            delta.file_path,
+            reason="delta",
+            destinations=missing[delta.key] or (),
+            start=delta.start,
+            end=delta.end,
+        )
+    except OSError:
+        logger.exception("Could not spool failed delta upload of %s", delta.key)
+        return False
+    return True
+
+
+def _offset_id(transcript_dir: str, entry: UploadEntry) -> str:
+    """The file's identity for delta offsets: its path below the transcript directory.
+
+    Unlike the object key, it does not change from cycle to cycle when the key template
+    has date or depth partitions.
+    """
+    return os.path.relpath(entry.file_path, transcript_dir)
+
+
+def _upload_summary(
+    ctx: UploadContext,
+    transcript_dir: str,
+    considered: list[UploadEntry],
+    kept: set[UploadEntry],
+    config: TranscriptUploadConfig,
+    depth: int | None,
+) -> None:
+    """Upload one summary record per transcript file, whether sampled or not."""
+    body = build_summary([summarize(transcript_dir, e, e in kept) for e in considered])
+    ctx.put(summary_key(config.prefix, depth), body, "application/jsonl")
+
+
+def _pending_spool(spool: UploadSpool | None, uploads: list[UploadEntry]) -> list[SpoolEntry]:
+    """Spooled uploads to drain; entries superseded by this run's uploads are dropped."""
+    if spool is None:
+        return []
+    keys = {entry.key for entry in uploads}
+    pending = []
+    for entry in spool.entries():
+        if entry.key in keys:
+            logger.info("Spooled upload of %s superseded by this run", entry.key)
+            spool.remove(entry)
+        else:
+            pending.append(entry)
+    return pending
+
+
+def _drain_spool(
+    ctx: UploadContext,
+    spool: UploadSpool,
+    entries: list[SpoolEntry],
+    config: TranscriptUploadConfig,
+    workers: int,
+    async_uploader: AsyncS3Uploader | None,
+) -> tuple[int, Exception | None]:
+    """Upload spooled snapshots; returns how many were sent and the first error.
+
+    Snapshots larger than ``config.shard_size`` are sharded again, shards and index, so
+    a file spooled after one of its shards failed ends up in the same layout as if the
+    first attempt had succeeded; spooled deltas are sent whole. Snapshots spooled for
+    some fan-out destinations only are sent to just those.
+    """
+    if not entries:
+        return 0, None
+    logger.info("Draining %d spooled upload(s)", len(entries))
+    groups: dict[tuple[str, ...], list[SpoolEntry]] = {}
+    for e in entries:
+        groups.setdefault(tuple(e.destinations), []).append(e)
+    drained = 0
+    first_error: Exception | None = None
+    for destinations, group in groups.items():
+        subset = None
+        if destinations and isinstance(ctx.uploader, FanOutUploader):
+            subset = ctx.uploader.only(destinations)
+            if subset is None:
+                for e in group:
+                    logger.warning(
+                        "Dropping spooled upload of %s: destinations no longer configured: %s",
+                        e.key,
+                        ", ".join(destinations),
+                    )
+                    spool.remove(e)
+                continue
+        try:
+            sent, error = _drain_entries(
+                ctx if subset is None else replace(ctx, uploader=subset),
+                spool,
+                group,
+                config,
+                workers,
+                async_uploader,
+            )
+        finally:
+            if subset is not None:
+                subset.log_summary()
+                subset.close()
+        drained += sent
+        first_error = first_error or error
+    return drained, first_error
+
+
+def _drain_entries(
+    ctx: UploadContext,
+    spool: UploadSpool,
+    entries: list[SpoolEntry],
+    config: TranscriptUploadConfig,
+    workers: int,
+    async_uploader: AsyncS3Uploader | None,
+) -> tuple[int, Exception | None]:
+    """Upload spooled snapshots that go to the same destinations (see :func:`_drain_spool`)."""
+    by_key = {entry.key: entry for entry in entries}
+    tasks: list[tuple[UploadEntry, ShardStats | None]] = []
+    sharded: list[tuple[UploadEntry, list[ShardStats]]] = []
+    # Shard keys -> the spooled key they belong to
+    sources: dict[str, str] = {}
+    for e in entries:
+        entry = UploadEntry(e.key, spool.data_path(e), e.session_id)
+        if e.reason == "delta":
+            # Deltas are never sharded
+            tasks.append((entry, None))
+            continue
+        entry_tasks, shards = _entry_tasks(entry, config.shard_size)
+        tasks.extend(entry_tasks)
+        if shards:
+            sharded.append((entry, shards))
+            sources.update((shard.key, entry.key) for shard in shards)
+    # Spooled key -> destinations still missing it (None: all those it was sent to)
+    failed: dict[str, set[str] | None] = {}
+    first_error: Exception | None = None
+    for task, result in _run_uploads(ctx, tasks, config, workers, async_uploader):
+        if isinstance(result, Exception):
+            _note_missing(failed, sources.get(task.key, task.key), result)
+            first_error = first_error or result
+    for entry, shards in sharded:
+        if entry.key in failed:
+            continue
+        try:
+            _upload_shard_index(ctx, entry, shards)
+        except Exception as exc:
+            _note_missing(failed, entry.key, exc)
+            first_error = first_error or exc
+    for key, e in by_key.items():
+        if key in failed:
+            spool.failed(e, failed[key])
+        else:
+            spool.remove(e)
+    return len(by_key) - len(failed), first_error
+
+
+def _note_missing(missing: dict[str, set[str] | None], key: str, exc: Exception) -> None:
+    """Record the destinations ``key`` is missing after ``exc`` (None: all of them).
+
+    Only a :class:`DestinationError` names the destinations that failed; any other error
+    means the object reached none of them.
+    """
+    names = set(exc.failures) if isinstance(exc, DestinationError) else None
+    previous = missing.get(key, set())
+    missing[key] = None if names is None or previous is None else previous | names
+
+
+def _spool_failures(
+    spool: UploadSpool | None,
+    entries: list[UploadEntry],
+    missing: dict[str, set[str] | None],
+) -> bool:
+    """Spool each failed upload (for the destinations in ``missing``, if named).
+
+    Returns True if every one of them was spooled.
+    """
+    if spool is None:
+        return not entries
+    spooled = True
+    for entry in entries:
+        try:
+            spool.add(
+                entry.key, entry.session_id, entry.file_path, destinations=missing[entry.key] or ()
+            )
+        except OSError:
+            logger.exception("Could not spool failed upload of %s", entry.key)
+            spooled = False
+    return spooled
+
+
+def _final_flush(
+    ctx: UploadContext,
+    spool: UploadSpool,
+    config: TranscriptUploadConfig,
+    workers: int,
+    async_uploader: AsyncS3Uploader | None,
+) -> Exception | None:
+    """Retry everything still spooled, with backoff; returns an error if any remains."""
+    error: Exception | None = None
+    for attempt in range(FINAL_FLUSH_ATTEMPTS):
+        entries = spool.entries()
+        if not entries:
+            return None
+        time.sleep(FINAL_FLUSH_BACKOFF * 2**attempt)
+        logger.info(
+            "Final flush of %d spooled upload(s) (attempt %d/%d)",
+            len(entries),
+            attempt + 1,
+            FINAL_FLUSH_ATTEMPTS,
+        )
+        _, error = _drain_spool(ctx, spool, entries, config, workers, async_uploader)
+    if spool.entries():
+        logger.error("Uploads still spooled after the final flush: %d", len(spool.entries()))
+        return error
+    return None
+
+
+def _compact(
+    transcript_dir: str,
+    uploaded: dict[str, list[UploadedFile]],
+    failed_sessions: set[str],
+    mode: str,
+    state_dir: str | None,
+) -> None:
+    """Compact every session whose files were all uploaded. Failures are logged, not raised."""
+    compacted = 0
+    for session_id, files in uploaded.items():
+        if session_id in failed_sessions:
+            continue
+        try:
+            compacted += compact_session(transcript_dir, session_id, files, mode, state_dir)
+        except OSError:
+            logger.exception("Transcript compaction failed for session %s", session_id)
+    logger.info("Compacted %d uploaded session(s) (mode=%s)", compacted, mode)
+
+
+def _create_packer(
+    config: TranscriptUploadConfig,
+    uploader: S3Uploader,
+    state_dir: str | None,
+    throttle: TokenBucket | None,
+) -> Packer | None:
+    if not config.packing:
+        return None
+    known = load_known_blobs(state_dir, config.bucket_name) if state_dir is not None else ()
+    return Packer(
+        uploader,
+        config.bucket_name,
+        config.prefix,
+        config.packing,
+        config.packing_min_size,
+        config.checksum_algorithm,
+        known,
+        config.key_shards,
+        throttle,
+    )
+
+
+def _create_compressor(
+    config: TranscriptUploadConfig,
+    uploader: S3Uploader,
+    state_dir: str | None,
+    throttle: TokenBucket | None,
+) -> DictCompressor | None:
+    if not config.zstd_dictionary:
+        return None
+    compressor = load_compressor(config.zstd_dictionary, config.zstd_level, config.zstd_max_size)
+    if compressor is None:
+        return None
+    try:
+        publish(compressor, uploader, config.bucket_name, config.prefix, state_dir, throttle)
+    except Exception:
+        # Objects compressed with a dictionary nobody can fetch would be unreadable
+        logger.warning("Could not store zstd dictionary; uploading uncompressed", exc_info=True)
+        return None
+    return compressor
+
+
+def _create_throttle(config: TranscriptUploadConfig, workers: int) -> TokenBucket | None:
+    """Build the shared bandwidth bucket, or None when no cap is configured."""
+    if config.bandwidth_limit <= 0:
+        return None
+    # Guarantees beyond an equal split of the cap could not all be honoured at once
+    min_share = min(config.bandwidth_min_share, config.bandwidth_limit / workers)
+    logger.info(
+        "Transcript upload bandwidth capped at %.1f MiB/s",
+        config.bandwidth_limit / (1024 * 1024),
+    )
+    return TokenBucket(config.bandwidth_limit, config.bandwidth_burst, min_share)
+
+
 def upload_transcripts(
     transcript_dir: str,
     config: TranscriptUploadConfig,
     uploader: S3Uploader | None = None,
+    *,
+    state_dir: str | None = None,
+    async_uploader: AsyncS3Uploader | None = None,
+    depth: int | None = None,
+    final: bool = False,
+    transcript_files: Iterable[str] | None = None,
+    spool_only: bool = False,
 ) -> int:
     """Upload all transcripts to S3.
 
@@ -136,40 +996,202 @@ def upload_transcripts(
         config: AWS bucket/region configuration.
         uploader: Injectable S3 client for testing. If None, creates a real boto3 client
             (optionally using STS AssumeRole when ``config.assume_role_arn`` is set).
+        state_dir: Gate state directory for the multipart checkpoint journal and the
+            compaction archive. If None, multipart uploads are not resumable across runs.
+        async_uploader: Injectable async S3 client for the asyncio engine, used when
+            ``config.async_uploads`` is set (see :mod:`gate.async_upload`).
+        depth: Workflow depth of this cycle. With ``config.deltas`` and a ``state_dir``,
+            the lines appended since the previous cycle are uploaded as per-depth delta
+            objects (see :mod:`gate.deltas`).
+        final: True on the workflow's last cycle: uploads still spooled after the run
+            are retried a few more times, as there will be no next run to drain them.
+        transcript_files: The main transcripts, if the directory was already scanned
+            (see :mod:`gate.upload_setup`); scanned here when None.
+        spool_only: Only drain the spool, on a cycle whose upload policy defers new
+            uploads (see :mod:`gate.upload_policy`); no file is scanned or sent, and the
+            delta offsets are left alone.
 
     Returns:
-        Number of files uploaded.
+        Number of files uploaded (including drained spooled ones).
     """
-    if uploader is None:
-        uploader = _create_s3_client(config)
+    # Files stream from the directory scan straight into the upload queue; only their
+    # entries are kept, for the sampling summary, deltas and compaction afterwards
+    considered: list[UploadEntry] = []
+    uploads: list[UploadEntry] = []
 
-    transcript_files = _find_transcript_files(transcript_dir)
-    logger.info(
-        "Found %d transcript file(s): %s",
-        len(transcript_files),
-        ", ".join(os.path.basename(f) for f in transcript_files),
-    )
+    if spool_only:
+        transcript_files = ()
+
+    def scan() -> Iterator[UploadEntry]:
+        entries = _iter_uploads(
+            transcript_dir,
+            _iter_transcript_files(transcript_dir)
+            if transcript_files is None
+            else transcript_files,
+            config.prefix,
+            config.key_template,
+            _partitions(config, depth),
+            config.key_shards,
+        )
+        sampled = (
+            iter_sampled(transcript_dir, entries, config)
+            if config.sampling
+            else ((entry, True) for entry in entries)
+        )
+        for entry, keep in sampled:
+            considered.append(entry)
+            if keep:
+                uploads.append(entry)
+                yield entry
 
-    if not transcript_files:
+    selected = scan()
+    spool = UploadSpool(os.path.join(state_dir, SPOOL_DIR_NAME)) if state_dir else None
+    spooled: list[SpoolEntry] = []
+    if spool is not None and spool.entries():
+        # Which spooled uploads this run supersedes is only known once the scan is done
+        selected = iter(list(selected))
+        spooled = _pending_spool(spool, uploads)
+    first = next(selected, None)
+    if not considered and not spooled:
         logger.info("No transcript files found. Skipping upload.")
         return 0
+    if first is not None:
+        selected = itertools.chain([first], selected)
 
-    uploads = _collect_uploads(transcript_dir, transcript_files, config.prefix)
+    workers = TRANSCRIPT_UPLOAD_CONCURRENCY
+    if uploader is None:
+        # Only now: importing boto3 and building the client dominate an upload's start-up
+        config, uploader = prepare_uploader(config, workers)
 
-    with ThreadPoolExecutor(
-        max_workers=min(TRANSCRIPT_UPLOAD_CONCURRENCY, len(uploads))
-    ) as executor:
-        futures = {
-            executor.submit(_upload_single, uploader, config.bucket_name, entry): entry
-            for entry in uploads
-        }
-        for future in as_completed(futures):
-            future.result()
+    journal = None
+    if state_dir is not None:
+        journal = UploadJournal(os.path.join(state_dir, JOURNAL_DIR_NAME))
+        journal.abort_stale(uploader, config.bucket_name)
+
+    redactor = Redactor(workers=config.redaction_workers) if config.redaction else None
+    hedger = None
+    if config.hedging and isinstance(uploader, FanOutUploader):
+        logger.warning("TRANSCRIPT_UPLOAD_HEDGE does not apply to fanned-out uploads")
+    elif config.hedging:
+        hedger = Hedger(
+            uploader,
+            partial(create_s3_client, config),
+            workers,
+            config.hedge_percentile,
+            config.hedge_budget,
+        )
+    # Shared by transcripts and everything generated beside them (indexes, blobs, ...)
+    throttle = _create_throttle(config, workers)
+    ctx = UploadContext(
+        uploader=uploader,
+        bucket_name=config.bucket_name,
+        part_size=config.part_size,
+        pool=BufferPool(config.part_size, workers),
+        journal=journal,
+        checksum_algorithm=config.checksum_algorithm,
+        throttle=throttle,
+        redactor=redactor,
+        event_index=config.event_index,
+        keyword_index=config.keyword_index,
+        hedger=hedger,
+        packer=_create_packer(config, uploader, state_dir, throttle),
+        compressor=_create_compressor(config, uploader, state_dir, throttle),
+        progress=UploadProgress(config.progress_interval, config.upload_log),
+    )
+
+    sharded: list[tuple[UploadEntry, list[ShardStats]]] = []
+    # Shard keys -> the file they belong to, which is what gets spooled on failure
+    sources: dict[str, UploadEntry] = {}
+
+    def plan() -> Iterator[tuple[UploadEntry, ShardStats | None]]:
+        for entry in selected:
+            tasks, shards = _entry_tasks(entry, config.shard_size)
+            if shards:
+                sharded.append((entry, shards))
+                sources.update((shard.key, entry) for shard in shards)
+            yield from tasks
+
+    uploaded: dict[str, list[UploadedFile]] = {}
+    failed_sessions: set[str] = set()
+    failed: dict[str, UploadEntry] = {}
+    # Failed key -> destinations still missing it (None: all of them)
+    missing: dict[str, set[str] | None] = {}
+    first_error: Exception | None = None
+    drained = 0
+    try:
+        if spool is not None:
+            drained, first_error = _drain_spool(
+                ctx, spool, spooled, config, workers, async_uploader
+            )
+        for entry, result in _run_uploads(ctx, plan(), config, workers, async_uploader):
+            if isinstance(result, Exception):
+                source = sources.get(entry.key, entry)
+                failed[source.key] = source
+                _note_missing(missing, source.key, result)
+                failed_sessions.add(entry.session_id)
+                first_error = first_error or result
+            else:
+                uploaded.setdefault(entry.session_id, []).append(result)
+        logger.info("Found %d transcript file(s)", len(considered))
+        if config.sampling:
+            logger.info("Sampling kept %d of %d transcript file(s)", len(uploads), len(considered))
+        for entry, shards in sharded:
+            if entry.session_id in failed_sessions:
+                continue
+            try:
+                _upload_shard_index(ctx, entry, shards)
+            except Exception as exc:
+                failed[entry.key] = entry
+                _note_missing(missing, entry.key, exc)
+                failed_sessions.add(entry.session_id)
+                first_error = first_error or exc
+        if config.sampling and not spool_only:
+            try:
+                _upload_summary(ctx, transcript_dir, considered, set(uploads), config, depth)
+            except Exception as exc:
+                first_error = first_error or exc
+        all_spooled = _spool_failures(spool, list(failed.values()), missing)
+        if config.deltas and depth is not None and state_dir is not None and not spool_only:
+            tracker = OffsetTracker(state_dir)
+            delta_failures, deltas_spooled = _upload_deltas(
+                ctx, transcript_dir, uploads, tracker, depth, workers, spool
+            )
+            for entry, exc in delta_failures:
+                failed_sessions.add(entry.session_id)
+                first_error = first_error or exc
+            all_spooled = all_spooled and deltas_spooled
+            tracker.save({_offset_id(transcript_dir, entry) for entry in uploads})
+        if final and spool is not None and spool.entries():
+            error = _final_flush(ctx, spool, config, workers, async_uploader)
+            # Everything that failed has been delivered after all
+            first_error = first_error if error is not None or not all_spooled else None
+    finally:
+        if ctx.progress is not None:
+            ctx.progress.close()
+        if redactor is not None:
+            redactor.log_summary()
+            redactor.close()
+        if hedger is not None:
+            hedger.close()
+        if ctx.compressor is not None:
+            ctx.compressor.log_summary()
+        if ctx.packer is not None:
+            ctx.packer.log_summary()
+            if state_dir is not None:
+                save_known_blobs(state_dir, config.bucket_name, ctx.packer.uploaded)
+        if isinstance(uploader, FanOutUploader):
+            uploader.log_summary()
+            uploader.close()
+
+    if config.compaction:
+        _compact(transcript_dir, uploaded, failed_sessions, config.compaction, state_dir)
+    if first_error is not None:
+        raise first_error
 
     logger.info(
         "Uploaded %d transcript file(s) to s3://%s/%s",
-        len(uploads),
+        len(uploads) + drained,
         config.bucket_name,
         f"{config.prefix}/" if config.prefix else "",
     )
-    return len(uploads)
+    return len(uploads) + drained
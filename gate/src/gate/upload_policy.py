@@ -0,0 +1,119 @@
+"""When a gate cycle uploads transcripts.
+
+By default every cycle uploads, which in long loops re-sends growing transcripts and
+adds upload latency to every intermediate cycle. ``TRANSCRIPT_UPLOAD_POLICY`` picks
+another schedule:
+
+- ``always``: every cycle (the default);
+- ``every``:  every ``upload_every``-th cycle (depths N-1, 2N-1, ...);
+- ``final``:  only the workflow's last cycle (decision STOP, including the depth limit);
+- ``bytes``:  once the transcripts have grown by ``upload_min_bytes`` since the last
+  upload, tracked per file in ``<state_dir>/upload_policy.json``.
+
+Whatever the policy, the final cycle always uploads (and flushes the spool), so
+everything skipped along the way is delivered before the workflow ends. A deferred
+cycle still drains the spool (uploads that failed earlier), sending no new files.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+
+from gate.config import TranscriptUploadConfig
+
+logger = logging.getLogger("gate")
+
+POLICY_STATE_FILENAME = "upload_policy.json"
+
+
+def should_upload(
+    config: TranscriptUploadConfig,
+    transcript_dir: str,
+    state_dir: str,
+    depth: int,
+    final: bool,
+) -> tuple[bool, str]:
+    """Return (upload?, reason) for this cycle under ``config.upload_policy``."""
+    if final:
+        return True, "final cycle"
+    policy = config.upload_policy
+    if policy == "every":
+        due = (depth + 1) % config.upload_every == 0
+        return due, f"every {config.upload_every} cycle(s), depth {depth}"
+    if policy == "final":
+        return False, "final cycle only"
+    if policy == "bytes":
+        grown = new_bytes(transcript_dir, state_dir)
+        due = grown >= config.upload_min_bytes
+        return due, f"{grown} new byte(s), threshold {config.upload_min_bytes}"
+    return True, "every cycle"
+
+
+def due_regardless(config: TranscriptUploadConfig, depth: int) -> bool:
+    """True if this cycle uploads whether or not it is the final one.
+
+    Decided from the config and depth alone, without touching the file system, so it
+    can run before the gate's decision (see :mod:`gate.upload_setup`).
+    """
+    if config.upload_policy == "every":
+        return (depth + 1) % config.upload_every == 0
+    return config.upload_policy not in ("final", "bytes")
+
+
+def file_sizes(transcript_dir: str) -> dict[str, int]:
+    """Sizes of the transcripts a cycle would upload (main and subagent .jsonl files)."""
+    sizes: dict[str, int] = {}
+    try:
+        names = os.listdir(transcript_dir)
+    except OSError:
+        return sizes
+    for name in names:
+        if not name.endswith(".jsonl") or name == ".jsonl":
+            continue
+        path = os.path.join(transcript_dir, name)
+        sizes[path] = _size(path)
+        subagent_dir = os.path.join(transcript_dir, name[: -len(".jsonl")], "subagents")
+        if os.path.isdir(subagent_dir):
+            for sub in os.listdir(subagent_dir):
+                if sub.endswith(".jsonl"):
+                    sub_path = os.path.join(subagent_dir, sub)
+                    sizes[sub_path] = _size(sub_path)
+    return sizes
+
+
+def new_bytes(transcript_dir: str, state_dir: str) -> int:
+    """Bytes the transcripts have grown by since :func:`record_upload` last ran."""
+    recorded = _read_state(os.path.join(state_dir, POLICY_STATE_FILENAME))
+    return sum(
+        max(size - recorded.get(path, 0), 0) for path, size in file_sizes(transcript_dir).items()
+    )
+
+
+def record_upload(transcript_dir: str, state_dir: str) -> None:
+    """Remember the transcript sizes just uploaded (atomically, tmp file + rename)."""
+    path = os.path.join(state_dir, POLICY_STATE_FILENAME)
+    os.makedirs(state_dir, exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"files": file_sizes(transcript_dir)}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _read_state(path: str) -> dict[str, int]:
+    try:
+        with open(path) as f:
+            files = json.load(f)["files"]
+        return files if isinstance(files, dict) else {}
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError, TypeError, KeyError) as exc:
+        logger.warning("Discarding unreadable upload policy state %s: %s", path, exc)
+        return {}
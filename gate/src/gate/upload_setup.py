@@ -0,0 +1,124 @@
+"""Upload set-up overlapped with the gate decision.
+
+A gate run used to be strictly sequential: decide, write the decision, then import
+boto3 and build the S3 client (with an STS AssumeRole round trip and endpoint probes),
+then scan the transcript directory on EFS, then upload. Only the first two steps are on
+the workflow's critical path, and the set-up is independent I/O, so on cycles that will
+upload whatever the decision is, :func:`start` runs it in the background instead::
+
+    main thread:   parse -> decide -> write output -> wait for set-up -> upload
+    background:    scan ----> client (import boto3, STS, probes)
+
+The client phase follows the scan so that a run with nothing to send (no transcripts
+and an empty spool) still never imports boto3. The decision output is written without
+waiting on either phase; failures surface when the upload asks for the results, and
+are handled like any other upload failure. Phase timings are logged once the upload
+has them, together with how long it still had to wait::
+
+    Upload set-up: scan=12 ms client=840 ms waited=35 ms
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+from gate.config import TranscriptUploadConfig
+
+if TYPE_CHECKING:
+    from gate.transcript_upload import S3Uploader
+
+logger = logging.getLogger("gate")
+
+T = TypeVar("T")
+
+
+class Phase(Generic[T]):
+    """One background step: runs ``fn`` on a daemon thread, keeping its result or error."""
+
+    def __init__(self, name: str, fn: Callable[[], T]) -> None:
+        self.name = name
+        self.seconds = 0.0
+        self._fn = fn
+        self._result: T | None = None
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name=f"gate-setup-{name}", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        started = time.monotonic()
+        try:
+            self._result = self._fn()
+        except BaseException as exc:
+            self._error = exc
+        finally:
+            self.seconds = time.monotonic() - started
+
+    def result(self) -> T:
+        """Wait for the step; returns its result or raises its error."""
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result  # type: ignore[return-value]
+
+
+class UploadSetup:
+    """The S3 client and the transcript scan, prepared while the gate decides.
+
+    Args:
+        config: Upload configuration.
+        transcript_dir: Directory the transcripts are scanned from.
+        state_dir: Gate state directory, whose spool may hold uploads even when the
+            transcript directory is empty.
+    """
+
+    def __init__(self, config: TranscriptUploadConfig, transcript_dir: str, state_dir: str) -> None:
+        self.config = config
+        self._transcript_dir = transcript_dir
+        self._state_dir = state_dir
+        self._scan = Phase("scan", self._list_files)
+        self._client = Phase("client", self._create_client)
+
+    def transcript_files(self) -> list[str]:
+        return self._scan.result()
+
+    def uploader(self) -> tuple[TranscriptUploadConfig, S3Uploader | None]:
+        """The config as adjusted by client set-up, and the client (None: nothing to send)."""
+        waited = time.monotonic()
+        try:
+            return self._client.result()
+        finally:
+            logger.info(
+                "Upload set-up: scan=%.0f ms client=%.0f ms waited=%.0f ms",
+                self._scan.seconds * 1000,
+                self._client.seconds * 1000,
+                (time.monotonic() - waited) * 1000,
+            )
+
+    def _list_files(self) -> list[str]:
+        from gate.transcript_upload import _iter_transcript_files
+
+        return list(_iter_transcript_files(self._transcript_dir))
+
+    def _create_client(self) -> tuple[TranscriptUploadConfig, S3Uploader | None]:
+        from gate.spool import has_spooled
+
+        if not self._scan.result() and not has_spooled(self._state_dir):
+            return self.config, None
+        from gate.transcript_upload import prepare_uploader
+
+        return prepare_uploader(self.config)
+
+
+def start(
+    config: TranscriptUploadConfig, transcript_dir: str, state_dir: str, depth: int
+) -> UploadSetup | None:
+    """Start the set-up if this cycle uploads whatever the decision is, else None."""
+    from gate.upload_policy import due_regardless
+
+    if not due_regardless(config, depth):
+        return None
+    return UploadSetup(config, transcript_dir, state_dir)
@@ -9,7 +9,11 @@ from pathlib import Path
 import pytest
 
 from gate import logic
-from gate.config import GateConfig
+from gate.config import KEY_TEMPLATES, GateConfig
+
+# Flat "<session>.jsonl" keys, which keep the keys tests expect short (the default
+# template adds date, workflow and role partitions)
+LEGACY_KEYS = KEY_TEMPLATES["legacy"]
 
 # ── Fixtures ──────────────────────────────────────────────
 
@@ -130,3 +134,87 @@ def single_log(caplog, predicate, label="matching") -> logging.LogRecord:
 def decision_message(caplog) -> str:
     """Extract the single decision log message from captured records."""
     return single_log(caplog, lambda r: "decision=" in r.message, "decision").message
+
+
+class FakeS3:
+    """In-memory S3 double covering put_object and the multipart calls.
+
+    Bodies are read at call time (they may be file-like views over reused buffers).
+    ``fail_on`` maps a method name to an exception raised by its next call. Like S3,
+    completing an upload fails if a part other than the last is below ``min_part_size``.
+    """
+
+    def __init__(self, min_part_size: int = 0) -> None:
+        self.min_part_size = min_part_size
+        self.objects: dict[str, bytes] = {}
+        self.put_kwargs: dict[str, dict] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.aborted: list[str] = []
+        self.calls: list[str] = []
+        self.create_kwargs: dict = {}
+        self.part_kwargs: dict[tuple[str, int], dict] = {}
+        self.completed_parts: list[dict] = []
+        self.fail_on: dict[str, Exception] = {}
+        self._next_id = 0
+
+    def _record(self, method: str) -> None:
+        self.calls.append(method)
+        exc = self.fail_on.pop(method, None)
+        if exc is not None:
+            raise exc
+
+    @staticmethod
+    def _read(body) -> bytes:
+        return bytes(body) if isinstance(body, (bytes, bytearray)) else body.read()
+
+    def put_object(self, *, Bucket, Key, Body, ContentType, **kwargs):
+        self._record("put_object")
+        self.objects[Key] = self._read(Body)
+        self.put_kwargs[Key] = {"Bucket": Bucket, "ContentType": ContentType, **kwargs}
+        return {"ETag": f'"{Key}"'}
+
+    def create_multipart_upload(self, *, Bucket, Key, ContentType, **kwargs):
+        self._record("create_multipart_upload")
+        self.create_kwargs = kwargs
+        self._next_id += 1
+        upload_id = f"upload-{self._next_id}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, *, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._record("upload_part")
+        if UploadId not in self.uploads:
+            raise no_such_upload()
+        self.uploads[UploadId][PartNumber] = self._read(Body)
+        self.part_kwargs[(UploadId, PartNumber)] = kwargs
+        return {"ETag": f'"{UploadId}-{PartNumber}"'}
+
+    def complete_multipart_upload(self, *, Bucket, Key, UploadId, MultipartUpload):
+        self._record("complete_multipart_upload")
+        parts = self.uploads.pop(UploadId)
+        self.completed_parts = MultipartUpload["Parts"]
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        if any(len(parts[n]) < self.min_part_size for n in numbers[:-1]):
+            raise entity_too_small()
+        self.objects[Key] = b"".join(parts[n] for n in numbers)
+        return {"ETag": f'"{Key}"'}
+
+    def abort_multipart_upload(self, *, Bucket, Key, UploadId):
+        self._record("abort_multipart_upload")
+        self.uploads.pop(UploadId, None)
+        self.aborted.append(UploadId)
+        return {}
+
+
+def entity_too_small() -> Exception:
+    """Build an exception shaped like botocore's ClientError(EntityTooSmall)."""
+    exc = Exception("EntityTooSmall")
+    exc.response = {"Error": {"Code": "EntityTooSmall"}}  # type: ignore[attr-defined]
+    return exc
+
+
+def no_such_upload() -> Exception:
+    """Build an exception shaped like botocore's ClientError(NoSuchUpload)."""
+    exc = Exception("NoSuchUpload")
+    exc.response = {"Error": {"Code": "NoSuchUpload"}}  # type: ignore[attr-defined]
+    return exc
@@ -0,0 +1,135 @@
+"""Tests for gate.async_upload -- the asyncio upload engine."""
+
+import asyncio
+import logging
+import threading
+
+import pytest
+
+from gate.async_upload import upload_entries
+from gate.config import TranscriptUploadConfig
+from gate.streaming import BufferPool
+from gate.transcript_upload import UploadContext, UploadEntry, upload_transcripts
+from tests.conftest import LEGACY_KEYS, FakeS3
+
+
+class FakeAsyncS3:
+    """Async put_object double that records objects and peak concurrency."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.in_flight = 0
+        self.peak = 0
+        self.fail_keys: set[str] = set()
+
+    async def put_object(self, *, Bucket, Key, Body, ContentType, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            if Key in self.fail_keys:
+                raise RuntimeError(f"failed {Key}")
+            self.objects[Key] = Body
+        finally:
+            self.in_flight -= 1
+        return {"ETag": f'"{Key}"'}
+
+
+def _entries(tmp_path, count):
+    entries = []
+    for i in range(count):
+        path = tmp_path / f"s{i}.jsonl"
+        path.write_bytes(b'{"n": %d}\n' % i)
+        entries.append((UploadEntry(key=path.name, file_path=str(path)), None))
+    return entries
+
+
+def _ctx(s3=None, part_size=64):
+    return UploadContext(
+        uploader=s3 or FakeS3(),
+        bucket_name="bucket",
+        part_size=part_size,
+        pool=BufferPool(part_size, 2),
+    )
+
+
+class TestUploadEntries:
+    def test_bounds_requests_in_flight(self, tmp_path):
+        s3 = FakeAsyncS3()
+        results = asyncio.run(upload_entries(_ctx(), _entries(tmp_path, 50), s3, 8, 2))
+        assert len(s3.objects) == 50
+        assert s3.peak == 8
+        assert all(not isinstance(result, Exception) for _, result in results)
+
+    def test_large_files_use_threaded_multipart(self, tmp_path):
+        path = tmp_path / "big.jsonl"
+        path.write_bytes(b"x" * 100)
+        sync_s3 = FakeS3()
+        async_s3 = FakeAsyncS3()
+        tasks = [(UploadEntry(key="big.jsonl", file_path=str(path)), None)]
+
+        asyncio.run(upload_entries(_ctx(sync_s3), tasks, async_s3, 8, 2))
+        assert sync_s3.objects == {"big.jsonl": b"x" * 100}
+        assert async_s3.objects == {}
+
+    def test_failures_are_returned_per_entry(self, tmp_path):
+        s3 = FakeAsyncS3()
+        s3.fail_keys.add("s1.jsonl")
+        results = dict(asyncio.run(upload_entries(_ctx(), _entries(tmp_path, 3), s3, 8, 2)))
+        failed = [entry.key for entry, result in results.items() if isinstance(result, Exception)]
+        assert failed == ["s1.jsonl"]
+        assert set(s3.objects) == {"s0.jsonl", "s2.jsonl"}
+
+    def test_reads_and_transforms_off_the_event_loop(self, tmp_path, monkeypatch):
+        threads: list[threading.Thread] = []
+        transform = UploadContext.transform_with_text
+
+        def spy(self, view, entry, line_start=True):
+            threads.append(threading.current_thread())
+            return transform(self, view, entry, line_start)
+
+        monkeypatch.setattr(UploadContext, "transform_with_text", spy)
+        s3 = FakeAsyncS3()
+        asyncio.run(upload_entries(_ctx(), _entries(tmp_path, 3), s3, 8, 2))
+
+        assert len(s3.objects) == 3
+        assert len(threads) == 3
+        assert threading.main_thread() not in threads
+
+
+class TestUploadTranscriptsAsync:
+    def test_async_engine_uploads_all_files(self, tmp_path):
+        config = TranscriptUploadConfig(
+            bucket_name="b", region="r", async_uploads=True, key_template=LEGACY_KEYS
+        )
+        _entries(tmp_path, 20)
+        s3 = FakeAsyncS3()
+
+        assert upload_transcripts(str(tmp_path), config, FakeS3(), async_uploader=s3) == 20
+        assert len(s3.objects) == 20
+
+    def test_async_errors_propagate(self, tmp_path):
+        config = TranscriptUploadConfig(
+            bucket_name="b", region="r", async_uploads=True, key_template=LEGACY_KEYS
+        )
+        _entries(tmp_path, 2)
+        s3 = FakeAsyncS3()
+        s3.fail_keys.add("s0.jsonl")
+
+        with pytest.raises(RuntimeError, match="failed s0.jsonl"):
+            upload_transcripts(str(tmp_path), config, FakeS3(), async_uploader=s3)
+
+    def test_falls_back_to_threads_without_aiobotocore(self, tmp_path, monkeypatch, caplog):
+        import gate.async_upload
+
+        monkeypatch.setattr(gate.async_upload, "aiobotocore_available", lambda: False)
+        config = TranscriptUploadConfig(
+            bucket_name="b", region="r", async_uploads=True, key_template=LEGACY_KEYS
+        )
+        _entries(tmp_path, 2)
+        s3 = FakeS3()
+
+        with caplog.at_level(logging.WARNING, logger="gate"):
+            assert upload_transcripts(str(tmp_path), config, s3) == 2
+        assert len(s3.objects) == 2
+        assert "needs aiobotocore" in caplog.text
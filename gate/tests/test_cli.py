@@ -3,6 +3,7 @@
 import json
 import logging
 import sys
+import time
 from pathlib import Path
 
 import pytest
@@ -361,6 +362,13 @@ class TestRun:
         run()
         assert not fallback_called, "_write_fallback_output must not be called on success"
 
+    def test_profiling_writes_artifacts_into_state_dir(self, run_env, work_env, monkeypatch):
+        monkeypatch.setenv("GATE_PROFILE", "1")
+        run()
+        assert Path(run_env).read_text() == "true\n"
+        [run_dir] = (work_env / ".gate" / "profiles").iterdir()
+        assert (run_dir / "gate.prof").exists()
+
     def test_happy_path_returns_normally(self, run_env):
         """run() returns without raising when main() succeeds."""
         run()  # should not raise
@@ -395,6 +403,62 @@ class TestTranscriptUploadIntegration:
         mock_upload.assert_called_once()
         assert "Transcript upload complete: 1 file(s)" in caplog.text
 
+    @pytest.mark.parametrize(("depth", "final"), [(0, False), (4, True)])
+    def test_upload_flushes_spool_on_last_cycle(self, work_env, monkeypatch, depth, final):
+        """The workflow's last cycle (STOP) asks the upload to flush its spool."""
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "test-bucket")
+        from unittest.mock import MagicMock
+
+        import gate.transcript_upload as tu
+
+        mock_upload = MagicMock(return_value=0)
+        monkeypatch.setattr(tu, "upload_transcripts", mock_upload)
+
+        run_gate(monkeypatch, work_env, depth=depth, max_depth=5)
+        assert mock_upload.call_args.kwargs["final"] is final
+        assert mock_upload.call_args.kwargs["depth"] == depth
+
+    @pytest.mark.parametrize(("depth", "uploaded"), [(0, False), (1, True), (4, True)])
+    def test_upload_policy_defers_intermediate_cycles(
+        self, work_env, monkeypatch, caplog, depth, uploaded
+    ):
+        """Only every 2nd cycle uploads; the last cycle (STOP at depth 4) always does."""
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "test-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_POLICY", "every")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_EVERY", "2")
+        from unittest.mock import MagicMock
+
+        import gate.transcript_upload as tu
+
+        mock_upload = MagicMock(return_value=0)
+        monkeypatch.setattr(tu, "upload_transcripts", mock_upload)
+
+        with caplog.at_level(logging.INFO, logger="gate"):
+            run_gate(monkeypatch, work_env, depth=depth, max_depth=5)
+        assert mock_upload.called is uploaded
+        assert ("Transcript upload deferred: policy=every" in caplog.text) is not uploaded
+
+    @pytest.mark.parametrize("spooled", [False, True])
+    def test_deferred_cycle_drains_the_spool(self, work_env, monkeypatch, spooled):
+        """A deferred cycle sends no new files but still drains what earlier ones spooled."""
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "test-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_POLICY", "final")
+        if spooled:
+            spool = work_env / ".gate" / "spool"
+            spool.mkdir(parents=True)
+            (spool / "0123.json").write_text("{}")
+        from unittest.mock import MagicMock
+
+        import gate.transcript_upload as tu
+
+        mock_upload = MagicMock(return_value=1)
+        monkeypatch.setattr(tu, "upload_transcripts", mock_upload)
+
+        run_gate(monkeypatch, work_env, depth=0, max_depth=5)
+        assert mock_upload.called is spooled
+        if spooled:
+            assert mock_upload.call_args.kwargs["spool_only"] is True
+
     def test_upload_failure_does_not_affect_routing(self, work_env, monkeypatch, caplog):
         """Transcript upload failure is logged but does not change the routing output."""
         monkeypatch.setenv("AWS_S3_BUCKET_NAME", "test-bucket")
@@ -408,3 +472,64 @@ class TestTranscriptUploadIntegration:
             out = run_gate(monkeypatch, work_env, depth=0, max_depth=5)
         assert out.strip() == "true"
         assert "Transcript upload failed (non-fatal)" in caplog.text
+
+    def test_decision_written_while_upload_setup_runs(self, work_env, monkeypatch):
+        """The client is built in the background; the output never waits for it."""
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "test-bucket")
+        transcripts = work_env / ".transcripts"
+        transcripts.mkdir()
+        (transcripts / "abc.jsonl").write_text("x")
+        import threading
+        from unittest.mock import MagicMock
+
+        import gate.transcript_upload as tu
+        from tests.conftest import FakeS3
+
+        output = work_env / "output.txt"
+        seen_output: list[bool] = []
+        s3 = FakeS3()
+
+        def slow_client(config):
+            deadline = time.monotonic() + 5
+            while not output.exists() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            seen_output.append(output.exists())
+            assert threading.current_thread() is not threading.main_thread()
+            return config, s3
+
+        mock_upload = MagicMock(return_value=1)
+        monkeypatch.setattr(tu, "prepare_uploader", slow_client)
+        monkeypatch.setattr(tu, "upload_transcripts", mock_upload)
+
+        assert run_gate(monkeypatch, work_env, depth=0, max_depth=5).strip() == "true"
+        assert seen_output == [True]
+        assert mock_upload.call_args.args[2] is s3
+        assert mock_upload.call_args.kwargs["transcript_files"] == [str(transcripts / "abc.jsonl")]
+
+    def test_setup_overlaps_the_decision(self, work_env, monkeypatch):
+        """End-to-end time is the longer of decision and set-up, not their sum."""
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "test-bucket")
+        (work_env / ".transcripts").mkdir()
+        (work_env / ".transcripts" / "abc.jsonl").write_text("x")
+        from unittest.mock import MagicMock
+
+        import gate.transcript_upload as tu
+        from gate import logic
+
+        decide = logic.should_continue
+
+        def slow_decision(*args):
+            time.sleep(0.3)
+            return decide(*args)
+
+        def slow_client(config):
+            time.sleep(0.3)
+            return config, MagicMock()
+
+        monkeypatch.setattr(logic, "should_continue", slow_decision)
+        monkeypatch.setattr(tu, "prepare_uploader", slow_client)
+        monkeypatch.setattr(tu, "upload_transcripts", MagicMock(return_value=1))
+
+        started = time.monotonic()
+        run_gate(monkeypatch, work_env, depth=0, max_depth=5)
+        assert time.monotonic() - started < 0.55
@@ -0,0 +1,136 @@
+"""Tests for gate.compaction -- post-upload compaction of the transcript directory."""
+
+import json
+import os
+
+import pytest
+
+from gate.compaction import ARCHIVE_DIR_NAME, STUB_SUFFIX, UploadedFile, compact_session
+from gate.config import TranscriptUploadConfig
+from gate.transcript_upload import _iter_transcript_files, upload_transcripts
+from tests.conftest import LEGACY_KEYS, FakeS3
+
+
+@pytest.fixture
+def transcript_dir(tmp_path):
+    tdir = tmp_path / ".transcripts"
+    sub_dir = tdir / "abc123" / "subagents"
+    sub_dir.mkdir(parents=True)
+    (tdir / "abc123.jsonl").write_text("main")
+    (sub_dir / "sub1.jsonl").write_text("sub1")
+    return tdir
+
+
+def _snapshot(*paths) -> list[UploadedFile]:
+    files = []
+    for path in paths:
+        st = os.stat(path)
+        files.append(UploadedFile(os.path.basename(path), str(path), st.st_size, st.st_mtime_ns))
+    return files
+
+
+def _fields(f: UploadedFile) -> tuple[str, int, int]:
+    return f.file_path, f.size, f.mtime_ns
+
+
+def _session_files(tdir):
+    return _snapshot(tdir / "abc123.jsonl", tdir / "abc123" / "subagents" / "sub1.jsonl")
+
+
+class TestCompactSession:
+    def test_move_relocates_session_into_archive(self, tmp_path, transcript_dir):
+        state_dir = tmp_path / ".gate"
+        files = _session_files(transcript_dir)
+        assert compact_session(str(transcript_dir), "abc123", files, "move", str(state_dir))
+
+        archive = state_dir / ARCHIVE_DIR_NAME
+        assert (archive / "abc123.jsonl").read_text() == "main"
+        assert (archive / "abc123" / "subagents" / "sub1.jsonl").read_text() == "sub1"
+        assert list(transcript_dir.iterdir()) == []
+
+    def test_move_without_state_dir_is_skipped(self, transcript_dir):
+        files = _session_files(transcript_dir)
+        assert not compact_session(str(transcript_dir), "abc123", files, "move")
+        assert (transcript_dir / "abc123.jsonl").exists()
+
+    def test_delete_removes_uploaded_files(self, transcript_dir):
+        files = _session_files(transcript_dir)
+        assert compact_session(str(transcript_dir), "abc123", files, "delete")
+        assert list(transcript_dir.iterdir()) == []
+
+    def test_delete_handles_file_uploaded_as_several_shards(self, transcript_dir):
+        files = _session_files(transcript_dir)
+        files.append(UploadedFile("abc123.shards/part-00001.jsonl", *_fields(files[0])))
+        assert compact_session(str(transcript_dir), "abc123", files, "delete")
+        assert list(transcript_dir.iterdir()) == []
+
+    def test_delete_keeps_non_transcript_files(self, transcript_dir):
+        (transcript_dir / "abc123" / "subagents" / "notes.txt").write_text("keep")
+        files = _session_files(transcript_dir)
+        assert compact_session(str(transcript_dir), "abc123", files, "delete")
+        assert (transcript_dir / "abc123" / "subagents" / "notes.txt").exists()
+
+    def test_stub_records_archived_keys_outside_scan(self, transcript_dir):
+        files = _session_files(transcript_dir)
+        assert compact_session(str(transcript_dir), "abc123", files, "stub")
+
+        stub = json.loads((transcript_dir / f"abc123{STUB_SUFFIX}").read_text())
+        assert stub == {
+            "files": [{"key": "abc123.jsonl", "size": 4}, {"key": "sub1.jsonl", "size": 4}]
+        }
+        assert list(_iter_transcript_files(str(transcript_dir))) == []
+
+    def test_file_modified_after_upload_is_kept(self, transcript_dir):
+        files = _session_files(transcript_dir)
+        (transcript_dir / "abc123.jsonl").write_text("main plus more")
+        assert not compact_session(str(transcript_dir), "abc123", files, "delete")
+        assert (transcript_dir / "abc123.jsonl").exists()
+
+    def test_subagent_added_after_upload_blocks_compaction(self, transcript_dir):
+        files = _session_files(transcript_dir)
+        (transcript_dir / "abc123" / "subagents" / "sub2.jsonl").write_text("late")
+        assert not compact_session(str(transcript_dir), "abc123", files, "delete")
+
+    def test_rejects_unknown_mode(self, transcript_dir):
+        with pytest.raises(ValueError, match="unknown compaction mode"):
+            compact_session(str(transcript_dir), "abc123", [], "shred")
+
+
+class TestUploadWithCompaction:
+    def test_compacts_after_successful_upload(self, tmp_path, transcript_dir):
+        config = TranscriptUploadConfig(
+            bucket_name="b", region="r", compaction="move", key_template=LEGACY_KEYS
+        )
+        state_dir = str(tmp_path / ".gate")
+        s3 = FakeS3()
+
+        assert upload_transcripts(str(transcript_dir), config, s3, state_dir=state_dir) == 2
+        assert list(_iter_transcript_files(str(transcript_dir))) == []
+        # The next run has nothing left to scan or re-send
+        assert upload_transcripts(str(transcript_dir), config, s3, state_dir=state_dir) == 0
+        assert s3.calls.count("put_object") == 2
+
+    def test_failed_session_is_not_compacted(self, transcript_dir):
+        (transcript_dir / "other.jsonl").write_text("other")
+        config = TranscriptUploadConfig(
+            bucket_name="b", region="r", compaction="delete", key_template=LEGACY_KEYS
+        )
+        s3 = FakeS3()
+        original = s3.put_object
+
+        def failing_put(**kwargs):
+            if kwargs["Key"] == "abc123/sub1.jsonl":
+                raise RuntimeError("Access Denied")
+            return original(**kwargs)
+
+        s3.put_object = failing_put
+        with pytest.raises(RuntimeError, match="Access Denied"):
+            upload_transcripts(str(transcript_dir), config, s3)
+
+        assert (transcript_dir / "abc123.jsonl").exists()
+        assert not (transcript_dir / "other.jsonl").exists()
+
+    def test_compaction_off_by_default(self, transcript_dir):
+        config = TranscriptUploadConfig(bucket_name="b", region="r", key_template=LEGACY_KEYS)
+        upload_transcripts(str(transcript_dir), config, FakeS3())
+        assert (transcript_dir / "abc123.jsonl").exists()
@@ -3,9 +3,17 @@
 import pytest
 
 from gate.config import (
+    DEFAULT_KEY_TEMPLATE,
+    DEFAULT_PART_SIZE,
     EXPORT_CONFIG_FILENAME,
+    KEY_TEMPLATES,
+    MIB,
+    S3_MIN_PART_SIZE,
+    STATE_DIR_NAME,
     TRANSCRIPT_DIR_NAME,
+    Destination,
     GateConfig,
+    ProfilingConfig,
     TranscriptUploadConfig,
 )
 
@@ -32,6 +40,11 @@ class TestGateConfig:
         assert cfg.export_config == f"/test/{EXPORT_CONFIG_FILENAME}"
         assert cfg.transcript_dir == f"/test/{TRANSCRIPT_DIR_NAME}"
 
+    def test_state_dir_is_sibling_of_transcript_dir(self, monkeypatch):
+        monkeypatch.setenv("WORK_DIR", "/test")
+        cfg = GateConfig.from_env()
+        assert cfg.state_dir == f"/test/{STATE_DIR_NAME}"
+
     def test_frozen(self):
         """GateConfig is immutable."""
         cfg = GateConfig(export_config="/a", transcript_dir="/b")
@@ -140,7 +153,329 @@ class TestTranscriptUploadConfig:
         assert cfg is not None
         assert cfg.assume_role_arn is None
 
+    def test_from_env_part_size_defaults(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.delenv("TRANSCRIPT_UPLOAD_PART_SIZE_MB", raising=False)
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.part_size == DEFAULT_PART_SIZE
+
+    def test_from_env_reads_part_size_mb(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_PART_SIZE_MB", "64")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.part_size == 64 * MIB
+
+    def test_from_env_part_size_clamped_to_s3_minimum(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_PART_SIZE_MB", "1")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.part_size == S3_MIN_PART_SIZE
+
+    def test_from_env_invalid_part_size_falls_back(self, monkeypatch, caplog):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_PART_SIZE_MB", "lots")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.part_size == DEFAULT_PART_SIZE
+        assert "TRANSCRIPT_UPLOAD_PART_SIZE_MB" in caplog.text
+
+    @pytest.mark.parametrize(
+        "raw, expected",
+        [
+            pytest.param(None, "CRC32", id="default"),
+            pytest.param("sha256", "SHA256", id="sha256-lowercase"),
+            pytest.param("SHA-256", "SHA256", id="sha256-dashed"),
+            pytest.param("crc32", "CRC32", id="crc32"),
+            pytest.param("none", "", id="disabled"),
+            pytest.param("md5", "CRC32", id="invalid-falls-back"),
+        ],
+    )
+    def test_from_env_checksum_algorithm(self, monkeypatch, raw, expected):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        if raw is None:
+            monkeypatch.delenv("TRANSCRIPT_UPLOAD_CHECKSUM", raising=False)
+        else:
+            monkeypatch.setenv("TRANSCRIPT_UPLOAD_CHECKSUM", raw)
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.checksum_algorithm == expected
+
+    def test_from_env_bandwidth_defaults_to_unlimited(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.delenv("TRANSCRIPT_UPLOAD_BANDWIDTH_MIB", raising=False)
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.bandwidth_limit == 0
+
+    def test_from_env_reads_bandwidth_settings(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_BANDWIDTH_MIB", "12.5")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_BURST_MIB", "2")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_MIN_SHARE_MIB", "0.5")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.bandwidth_limit == int(12.5 * MIB)
+        assert cfg.bandwidth_burst == 2 * MIB
+        assert cfg.bandwidth_min_share == MIB // 2
+
+    @pytest.mark.parametrize(
+        "raw, expected",
+        [
+            pytest.param(None, "", id="default-off"),
+            pytest.param("off", "", id="off"),
+            pytest.param("MOVE", "move", id="move"),
+            pytest.param("delete", "delete", id="delete"),
+            pytest.param("stub", "stub", id="stub"),
+            pytest.param("shred", "", id="invalid-disables"),
+        ],
+    )
+    def test_from_env_compaction(self, monkeypatch, raw, expected):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        if raw is None:
+            monkeypatch.delenv("TRANSCRIPT_COMPACTION", raising=False)
+        else:
+            monkeypatch.setenv("TRANSCRIPT_COMPACTION", raw)
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.compaction == expected
+
+    def test_from_env_async_engine(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_ASYNC", "yes")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_ASYNC_CONCURRENCY", "64")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.async_uploads, cfg.async_concurrency) == (True, 64)
+
+    def test_from_env_shard_size(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_SHARD_SIZE_MB", "256")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.shard_size == 256 * 1024 * 1024
+
+    def test_from_env_event_index(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_EVENT_INDEX", "1")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.event_index
+
+    def test_from_env_hedging(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_HEDGE", "1")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_HEDGE_PERCENTILE", "99")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_HEDGE_BUDGET", "5")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.hedging, cfg.hedge_percentile, cfg.hedge_budget) == (True, 99.0, 0.5)
+
+    def test_from_env_extra_destinations(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("AWS_REGION", "us-east-1")
+        monkeypatch.setenv(
+            "AWS_S3_EXTRA_DESTINATIONS",
+            '[{"bucket": "audit"}, {"bucket": "dr", "region": "eu-west-1", '
+            '"endpoint_url": "http://minio:9000"}]',
+        )
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.destinations == (
+            Destination("audit", "us-east-1"),
+            Destination("dr", "eu-west-1", endpoint_url="http://minio:9000"),
+        )
+
+    def test_from_env_invalid_extra_destinations_ignored(self, monkeypatch, caplog):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("AWS_S3_EXTRA_DESTINATIONS", '[{"region": "x"}]')
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.destinations == ()
+        assert "Ignoring invalid AWS_S3_EXTRA_DESTINATIONS" in caplog.text
+
+    def test_from_env_keyword_index(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_KEYWORD_INDEX", "on")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.keyword_index
+
+    def test_from_env_sampling(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_SAMPLE_SUBAGENT_PERCENT", "5")
+        monkeypatch.setenv("TRANSCRIPT_SAMPLE_MAIN_PERCENT", "250")
+        monkeypatch.setenv("TRANSCRIPT_SAMPLE_KEEP_ERRORS", "off")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.sample_main_percent, cfg.sample_subagent_percent) == (100.0, 5.0)
+        assert cfg.sampling and not cfg.sample_keep_errors
+
+    def test_from_env_sampling_defaults_off(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert not cfg.sampling and cfg.sample_keep_errors
+
+    def test_from_env_deltas(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_DELTAS", "yes")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.deltas
+
+    def test_from_env_redaction_defaults_off(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.delenv("TRANSCRIPT_REDACTION", raising=False)
+        monkeypatch.delenv("TRANSCRIPT_REDACTION_WORKERS", raising=False)
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.redaction, cfg.redaction_workers) == (False, 0)
+
+    def test_from_env_reads_redaction_settings(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_REDACTION", "true")
+        monkeypatch.setenv("TRANSCRIPT_REDACTION_WORKERS", "2")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.redaction, cfg.redaction_workers) == (True, 2)
+
+    def test_from_env_packing_defaults_off(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.delenv("TRANSCRIPT_PACKING", raising=False)
+        monkeypatch.delenv("TRANSCRIPT_PACKING_MIN_KB", raising=False)
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.packing, cfg.packing_min_size) == ("", 4096)
+
+    def test_from_env_reads_packing_settings(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_PACKING", "Global")
+        monkeypatch.setenv("TRANSCRIPT_PACKING_MIN_KB", "16")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.packing, cfg.packing_min_size) == ("global", 16 * 1024)
+
+    def test_from_env_reads_zstd_settings(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_ZSTD_DICTIONARY", "/etc/gate/t.zdict")
+        monkeypatch.setenv("TRANSCRIPT_ZSTD_LEVEL", "99")
+        monkeypatch.setenv("TRANSCRIPT_ZSTD_MAX_KB", "64")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.zstd_dictionary, cfg.zstd_level, cfg.zstd_max_size) == (
+            "/etc/gate/t.zdict",
+            22,
+            64 * 1024,
+        )
+
+    def test_from_env_upload_policy_defaults_always(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.delenv("TRANSCRIPT_UPLOAD_POLICY", raising=False)
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.upload_policy, cfg.upload_every, cfg.upload_min_bytes) == (
+            "always",
+            1,
+            16 * MIB,
+        )
+
+    def test_from_env_reads_upload_policy(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_POLICY", "Bytes")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_EVERY", "0")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_MIN_MB", "0.5")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.upload_policy, cfg.upload_every, cfg.upload_min_bytes) == (
+            "bytes",
+            1,
+            MIB // 2,
+        )
+
+    def test_from_env_progress_defaults(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.delenv("TRANSCRIPT_PROGRESS_INTERVAL", raising=False)
+        monkeypatch.delenv("TRANSCRIPT_UPLOAD_LOG", raising=False)
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.progress_interval, cfg.upload_log) == (10.0, "")
+
+    def test_from_env_reads_progress_settings(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_PROGRESS_INTERVAL", "-5")
+        monkeypatch.setenv("TRANSCRIPT_UPLOAD_LOG", " /tmp/uploads.jsonl ")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.progress_interval, cfg.upload_log) == (0, "/tmp/uploads.jsonl")
+
+    def test_from_env_endpoint_candidates(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+        monkeypatch.setenv("AWS_ENDPOINT_URLS", "https://a.example, https://b.example")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.endpoint_urls == ("https://a.example", "https://b.example")
+        assert cfg.endpoint_url == "https://a.example"
+        assert cfg.sts_endpoint_url is None
+
+    def test_from_env_sts_endpoint(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("AWS_ENDPOINT_URL", "http://localhost:4566")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.sts_endpoint_url == "http://localhost:4566"
+        monkeypatch.setenv("AWS_STS_ENDPOINT_URL", "https://sts.example")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.sts_endpoint_url == "https://sts.example"
+
+    def test_from_env_key_shards(self, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_KEY_SHARDS", "64")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert cfg.key_shards == 64
+
+    def test_default_key_template_is_partitioned_without_depth(self):
+        assert DEFAULT_KEY_TEMPLATE == KEY_TEMPLATES["partitioned"]
+        assert "{depth}" not in DEFAULT_KEY_TEMPLATE
+
+    @pytest.mark.parametrize(
+        ("raw", "expected"),
+        [
+            ("", DEFAULT_KEY_TEMPLATE),
+            ("Legacy", "{path}.jsonl"),
+            ("/y={year}/{workflow_uid}/{path}.jsonl/", "y={year}/{workflow_uid}/{path}.jsonl"),
+            ("{date}/{bogus}/{path}.jsonl", DEFAULT_KEY_TEMPLATE),
+            ("{date}/{session}.jsonl", DEFAULT_KEY_TEMPLATE),
+            ("{path}.json", DEFAULT_KEY_TEMPLATE),
+            ("{path.jsonl", DEFAULT_KEY_TEMPLATE),
+        ],
+    )
+    def test_from_env_key_template(self, monkeypatch, raw, expected):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "my-bucket")
+        monkeypatch.setenv("TRANSCRIPT_KEY_TEMPLATE", raw)
+        monkeypatch.setenv("WORKFLOW_NAME", "wf-1")
+        cfg = TranscriptUploadConfig.from_env()
+        assert cfg is not None
+        assert (cfg.key_template, cfg.workflow_name) == (expected, "wf-1")
+
     def test_frozen(self):
         cfg = TranscriptUploadConfig(bucket_name="b", region="r")
         with pytest.raises(AttributeError):
             cfg.bucket_name = "changed"
+
+
+class TestProfilingConfig:
+    def test_from_env_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("GATE_PROFILE", raising=False)
+        assert ProfilingConfig.from_env() is None
+
+    def test_from_env_reads_settings(self, monkeypatch):
+        monkeypatch.setenv("GATE_PROFILE", "1")
+        monkeypatch.setenv("GATE_PROFILE_TRACEMALLOC", "25")
+        monkeypatch.setenv("GATE_PROFILE_UPLOAD", "true")
+        assert ProfilingConfig.from_env() == ProfilingConfig(tracemalloc_top=25, upload=True)
@@ -0,0 +1,84 @@
+"""Tests for gate.deltas -- per-cycle delta ranges and the offset state."""
+
+import json
+
+import pytest
+
+from gate.deltas import OFFSETS_FILENAME, OffsetTracker, delta_key, last_line_end
+
+
+class TestDeltaKey:
+    def test_keyed_by_depth_beside_transcript(self):
+        assert delta_key("env/abc.jsonl", 3) == "env/abc.deltas/depth-00003.jsonl"
+        assert delta_key("env/abc/agent-1.jsonl", 0) == "env/abc/agent-1.deltas/depth-00000.jsonl"
+
+
+class TestLastLineEnd:
+    @pytest.mark.parametrize(
+        ("data", "start", "expected"),
+        [
+            (b"a\nbb\ncc", 0, 5),
+            (b"a\nbb\n", 0, 5),
+            (b"a\nbb\ncc", 5, 5),
+            (b"abc", 0, 0),
+        ],
+    )
+    def test_stops_after_last_complete_line(self, tmp_path, data, start, expected):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(data)
+        assert last_line_end(str(path), start, len(data)) == expected
+
+    def test_scans_back_across_chunks(self, tmp_path):
+        data = b"a\n" + b"x" * 200_000
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(data)
+        assert last_line_end(str(path), 0, len(data)) == 2
+
+
+class TestOffsetTracker:
+    def test_first_cycle_covers_complete_lines(self, tmp_path):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"a\nb\nc")
+        assert OffsetTracker(str(tmp_path / "state")).plan("k", str(path)) == (0, 4)
+
+    def test_resumes_from_saved_offset(self, tmp_path):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"a\nb\n")
+        tracker = OffsetTracker(str(tmp_path / "state"))
+        tracker.advance("k", str(path), 4)
+        tracker.save({"k"})
+        path.write_bytes(b"a\nb\nc\n")
+
+        tracker = OffsetTracker(str(tmp_path / "state"))
+        assert tracker.plan("k", str(path)) == (4, 6)
+
+    def test_nothing_new_returns_none(self, tmp_path):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"a\n")
+        tracker = OffsetTracker(str(tmp_path))
+        tracker.advance("k", str(path), 2)
+        assert tracker.plan("k", str(path)) is None
+
+    @pytest.mark.parametrize("rewritten", [b"a\n", b"z\nb\nc\n"], ids=["shrunk", "replaced"])
+    def test_rewritten_file_restarts_from_zero(self, tmp_path, rewritten):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"a\nb\n")
+        tracker = OffsetTracker(str(tmp_path))
+        tracker.advance("k", str(path), 4)
+        path.write_bytes(rewritten)
+        assert tracker.plan("k", str(path)) == (0, len(rewritten))
+
+    def test_save_drops_files_no_longer_present(self, tmp_path):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"a\n")
+        tracker = OffsetTracker(str(tmp_path))
+        tracker.advance("gone", str(path), 2)
+        tracker.advance("k", str(path), 2)
+        tracker.save({"k"})
+        data = json.loads((tmp_path / OFFSETS_FILENAME).read_text())
+        assert list(data["files"]) == ["k"]
+
+    def test_unreadable_state_is_discarded(self, tmp_path, caplog):
+        (tmp_path / OFFSETS_FILENAME).write_text("{not json")
+        assert OffsetTracker(str(tmp_path)).offsets == {}
+        assert "Discarding unreadable delta offsets" in caplog.text
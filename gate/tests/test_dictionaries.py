@@ -0,0 +1,121 @@
+"""Tests for gate.dictionaries -- zstd dictionary training, compression and storage."""
+
+import json
+import logging
+
+import pytest
+
+from gate import dictionaries
+from gate.dictionaries import (
+    DictCompressor,
+    benchmark,
+    decompress,
+    dictionary_key,
+    load_compressor,
+    main,
+    publish,
+    train,
+    zstandard_available,
+)
+from tests.conftest import FakeS3
+
+needs_zstd = pytest.mark.skipif(not zstandard_available(), reason="zstandard not installed")
+
+
+def _transcript(i: int) -> bytes:
+    events = [
+        {
+            "type": "assistant",
+            "sessionId": f"session-{i}",
+            "message": {
+                "role": "assistant",
+                "content": [{"type": "tool_use", "name": "Bash", "input": {"command": f"ls {i}"}}],
+            },
+        },
+        {"type": "user", "message": {"role": "user", "content": f"result {i * 7}"}},
+    ]
+    return b"".join(json.dumps(e).encode() + b"\n" for e in events)
+
+
+@pytest.fixture(scope="module")
+def dict_data() -> bytes:
+    if not zstandard_available():
+        pytest.skip("zstandard not installed")
+    return train([_transcript(i) for i in range(300)], size=4096, dict_id=42)
+
+
+def test_dictionary_key_is_versioned_by_id():
+    assert dictionary_key("env", 42) == "env/dictionaries/zstd-42.dict"
+    assert dictionary_key("", 42) == "dictionaries/zstd-42.dict"
+
+
+def test_missing_zstandard_disables_compression(monkeypatch, caplog):
+    monkeypatch.setattr(dictionaries, "zstandard_available", lambda: False)
+    with caplog.at_level(logging.WARNING, logger="gate"):
+        assert load_compressor("/nonexistent", 3, 1024) is None
+    assert "needs zstandard" in caplog.text
+
+
+@needs_zstd
+class TestDictCompressor:
+    def test_round_trip_records_dictionary_id(self, dict_data):
+        compressor = DictCompressor(dict_data, level=3, max_size=1024)
+        data = _transcript(1000)
+
+        compressed = compressor.compress(data)
+
+        assert compressor.dict_id == 42
+        assert compressor.put_kwargs["Metadata"] == {"zstd-dictionary-id": "42"}
+        assert decompress(compressed, dict_data) == data
+        assert (compressor.files, compressor.bytes_in) == (1, len(data))
+
+    def test_beats_plain_compression_on_small_files(self, dict_data):
+        results = benchmark([_transcript(i) for i in range(1000, 1050)], dict_data, level=3)
+        assert results["dictionary"]["ratio"] > results["plain"]["ratio"]
+
+    def test_unreadable_dictionary_disables_compression(self, tmp_path, caplog):
+        with caplog.at_level(logging.WARNING, logger="gate"):
+            assert load_compressor(str(tmp_path / "missing.zdict"), 3, 1024) is None
+        assert "Cannot load zstd dictionary" in caplog.text
+
+
+@needs_zstd
+class TestPublish:
+    def test_stored_once_per_state_dir(self, tmp_path, dict_data):
+        compressor = DictCompressor(dict_data, level=3, max_size=1024)
+        s3 = FakeS3()
+
+        publish(compressor, s3, "b", "env", str(tmp_path))
+        publish(compressor, s3, "b", "env", str(tmp_path))
+
+        assert s3.calls == ["put_object"]
+        assert s3.objects == {"env/dictionaries/zstd-42.dict": dict_data}
+
+    def test_stored_again_for_another_bucket(self, tmp_path, dict_data):
+        compressor = DictCompressor(dict_data, level=3, max_size=1024)
+        s3 = FakeS3()
+
+        publish(compressor, s3, "b", "env", str(tmp_path))
+        publish(compressor, s3, "other", "env", str(tmp_path))
+
+        assert s3.calls == ["put_object", "put_object"]
+
+
+@needs_zstd
+class TestMain:
+    def test_train_then_bench(self, tmp_path, capsys):
+        samples = tmp_path / "samples"
+        samples.mkdir()
+        for i in range(300):
+            (samples / f"s{i}.jsonl").write_bytes(_transcript(i))
+        output = tmp_path / "t.zdict"
+
+        assert main(["train", "-o", str(output), "--size", "4096", str(samples)]) == 0
+        assert output.stat().st_size > 0
+        assert main(["bench", "--dictionary", str(output), str(samples)]) == 0
+        out = capsys.readouterr().out
+        assert "300 file(s)" in out
+        assert "dictionary: ratio" in out
+
+    def test_no_samples(self, tmp_path, capsys):
+        assert main(["train", "-o", str(tmp_path / "t.zdict"), str(tmp_path)]) == 1
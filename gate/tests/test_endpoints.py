@@ -0,0 +1,152 @@
+"""Tests for gate.endpoints -- endpoint probing and failover."""
+
+import http.server
+import logging
+import socket
+import threading
+
+import pytest
+
+from gate.endpoints import FailoverUploader, is_endpoint_failure, probe, rank_endpoints
+from gate.streaming import BufferBody
+from tests.conftest import FakeS3
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    status = 403
+
+    def do_HEAD(self):
+        self.send_response(self.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def _serve(status: int) -> str:
+        handler = type("Handler", (_Handler,), {"status": status})
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield _serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+class TestProbe:
+    def test_forbidden_answer_is_healthy(self, serve):
+        result = probe(serve(403))
+        assert result.healthy
+        assert result.status == 403
+
+    def test_server_error_is_unhealthy(self, serve):
+        assert not probe(serve(503)).healthy
+
+    def test_unreachable_is_unhealthy(self):
+        result = probe(_closed_port_url(), timeout=1.0)
+        assert (result.healthy, result.latency) == (False, None)
+        assert result.error
+
+    def test_ranks_healthy_first_and_logs_every_probe(self, serve, caplog):
+        down, failing, up = _closed_port_url(), serve(500), serve(400)
+        with caplog.at_level(logging.INFO, logger="gate"):
+            ranked = rank_endpoints((down, failing, up), timeout=1.0)
+        assert ranked == [up, down, failing]
+        assert caplog.text.count("Endpoint probe: url=") == 3
+        assert f"Selected S3 endpoint {up}" in caplog.text
+
+
+class _EndpointDown(Exception):
+    """Shaped like botocore's EndpointConnectionError."""
+
+
+_EndpointDown.__name__ = "EndpointConnectionError"
+
+
+class _ClientError(Exception):
+    def __init__(self, status: int, code: str) -> None:
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}}
+
+
+class TestIsEndpointFailure:
+    @pytest.mark.parametrize(
+        "exc",
+        [ConnectionResetError(), TimeoutError(), _EndpointDown(), _ClientError(503, "SlowDown")],
+    )
+    def test_endpoint_failures(self, exc):
+        assert is_endpoint_failure(exc)
+
+    @pytest.mark.parametrize("exc", [ValueError(), _ClientError(403, "AccessDenied")])
+    def test_request_failures(self, exc):
+        assert not is_endpoint_failure(exc)
+
+
+class TestFailoverUploader:
+    def _uploader(self, failover_after=2):
+        clients = {"a": FakeS3(), "b": FakeS3()}
+        return FailoverUploader(["a", "b"], clients.__getitem__, failover_after), clients
+
+    def test_fails_over_after_consecutive_failures_and_retries(self, caplog):
+        uploader, clients = self._uploader()
+        clients["a"].fail_on["put_object"] = _EndpointDown()
+        with pytest.raises(_EndpointDown):
+            uploader.put_object(Bucket="bk", Key="k1", Body=b"1", ContentType="t")
+        assert uploader.url == "a"
+
+        clients["a"].fail_on["put_object"] = _EndpointDown()
+        with caplog.at_level(logging.WARNING, logger="gate"):
+            uploader.put_object(Bucket="bk", Key="k2", Body=b"2", ContentType="t")
+
+        assert uploader.url == "b"
+        assert clients["b"].objects == {"k2": b"2"}
+        assert "failing over to b" in caplog.text
+
+    def test_single_failure_is_raised(self):
+        uploader, clients = self._uploader()
+        clients["a"].fail_on["put_object"] = _EndpointDown()
+        with pytest.raises(_EndpointDown):
+            uploader.put_object(Bucket="bk", Key="k", Body=b"1", ContentType="t")
+        assert uploader.url == "a"
+
+    def test_success_resets_failure_count(self):
+        uploader, clients = self._uploader()
+        for _ in range(3):
+            clients["a"].fail_on["put_object"] = _EndpointDown()
+            with pytest.raises(_EndpointDown):
+                uploader.put_object(Bucket="bk", Key="k", Body=b"1", ContentType="t")
+            uploader.put_object(Bucket="bk", Key="k", Body=b"1", ContentType="t")
+        assert uploader.failovers == 0
+
+    def test_request_errors_do_not_fail_over(self):
+        uploader, clients = self._uploader(failover_after=1)
+        clients["a"].fail_on["upload_part"] = _ClientError(404, "NoSuchUpload")
+        with pytest.raises(_ClientError):
+            uploader.upload_part(Bucket="bk", Key="k", UploadId="u", PartNumber=1, Body=b"")
+        assert uploader.url == "a"
+
+    def test_retried_body_is_rewound(self):
+        uploader, clients = self._uploader(failover_after=1)
+
+        def _partial_read(**kwargs):
+            kwargs["Body"].read(2)
+            raise _EndpointDown()
+
+        clients["a"].put_object = _partial_read
+        body = BufferBody(memoryview(b"abcdef"))
+        uploader.put_object(Bucket="bk", Key="k", Body=body, ContentType="t")
+        assert clients["b"].objects == {"k": b"abcdef"}
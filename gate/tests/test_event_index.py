@@ -0,0 +1,76 @@
+"""Tests for gate.event_index -- event offset index sidecars."""
+
+import json
+
+import pytest
+
+from gate.event_index import EventIndexer, LineObserver, event_index_key
+
+
+def _event(**fields) -> bytes:
+    return json.dumps(fields).encode() + b"\n"
+
+
+def _tool_use(name: str, ts: str) -> bytes:
+    content = [{"type": "tool_use", "name": name, "input": {}}]
+    return _event(type="assistant", timestamp=ts, message={"content": content})
+
+
+def _tool_error(ts: str) -> bytes:
+    content = [{"type": "tool_result", "is_error": True, "content": "exit 1"}]
+    return _event(type="user", timestamp=ts, message={"content": content})
+
+
+def _index(data: bytes, part: int = 7) -> dict:
+    indexer = EventIndexer()
+    for i in range(0, len(data), part):
+        indexer.feed(memoryview(data)[i : i + part])
+    indexer.finish()
+    return json.loads(indexer.to_json("abc.jsonl"))
+
+
+class TestEventIndexer:
+    def test_offsets_point_at_events(self):
+        events = [
+            _event(type="user", timestamp="2025-01-01T00:00:01Z"),
+            _tool_use("Bash", "2025-01-01T00:00:30Z"),
+            _tool_error("2025-01-01T00:01:10Z"),
+        ]
+        data = b"".join(events)
+        index = _index(data)
+
+        [[offset, length]] = index["tools"]["Bash"]
+        assert data[offset : offset + length] == events[1]
+        [[offset, length]] = index["errors"]
+        assert data[offset : offset + length] == events[2]
+        assert [len(v) for v in index["types"].values()] == [2, 1]
+        assert (index["lines"], index["size"]) == (3, len(data))
+
+    def test_minute_buckets_span_their_events(self):
+        events = [_event(type="user", timestamp=f"2025-01-01T00:0{m}:00Z") for m in (0, 0, 1)]
+        index = _index(b"".join(events))
+        first = len(events[0]) + len(events[1])
+        assert index["minutes"] == {
+            "2025-01-01T00:00": [0, first],
+            "2025-01-01T00:01": [first, first + len(events[2])],
+        }
+
+    def test_final_line_without_newline(self):
+        data = _event(type="user") + b'{"type": "assistant"}'
+        index = _index(data, part=100)
+        [[offset, length]] = index["types"]["assistant"]
+        assert offset + length == len(data)
+
+    def test_skips_invalid_lines(self):
+        index = _index(b"not json\n" + _event(type="user"))
+        assert index["lines"] == 2
+        assert index["types"]["user"] == [[9, len(_event(type="user"))]]
+
+
+def test_event_index_key():
+    assert event_index_key("env/abc.jsonl") == "env/abc.events.json"
+
+
+def test_line_observer_requires_add():
+    with pytest.raises(TypeError):
+        LineObserver()  # type: ignore[abstract]
@@ -0,0 +1,107 @@
+"""Tests for gate.fanout -- read-once uploads to several destinations."""
+
+import json
+import logging
+
+import pytest
+
+from gate.config import TranscriptUploadConfig
+from gate.fanout import DestinationError, FanOutUploader, Target
+from gate.streaming import BufferBody
+from gate.transcript_upload import upload_transcripts
+from tests.conftest import LEGACY_KEYS, FakeS3, no_such_upload
+
+
+class _BrokenS3(FakeS3):
+    """Every call of ``method`` fails."""
+
+    def __init__(self, method: str) -> None:
+        super().__init__()
+        self.method = method
+
+    def _record(self, method: str) -> None:
+        super()._record(method)
+        if method == self.method:
+            raise RuntimeError(f"{method} down")
+
+
+def _fanout(*clients: FakeS3, attempts: int = 3) -> FanOutUploader:
+    targets = [Target(f"s3://b{i}", f"b{i}", c) for i, c in enumerate(clients)]
+    return FanOutUploader(targets, workers=2, attempts=attempts, backoff=0)
+
+
+def _write(tmp_path, data: bytes):
+    (tmp_path / "abc.jsonl").write_bytes(data)
+    return TranscriptUploadConfig(
+        bucket_name="b0", region="r", part_size=8, key_template=LEGACY_KEYS
+    )
+
+
+class TestFanOutUploader:
+    def test_put_sends_same_body_to_every_bucket(self):
+        primary, replica = FakeS3(), FakeS3()
+        fanout = _fanout(primary, replica)
+        body = BufferBody(memoryview(b"hello"))
+        fanout.put_object(Bucket="b0", Key="k", Body=body, ContentType="application/jsonl")
+        assert primary.objects["k"] == replica.objects["k"] == b"hello"
+        assert (primary.put_kwargs["k"]["Bucket"], replica.put_kwargs["k"]["Bucket"]) == (
+            "b0",
+            "b1",
+        )
+
+    def test_multipart_upload_reaches_every_bucket(self, tmp_path):
+        data = b"0123456789" * 5
+        config = _write(tmp_path, data)
+        primary, replica = FakeS3(), FakeS3()
+
+        upload_transcripts(str(tmp_path), config, _fanout(primary, replica))
+        assert primary.objects["abc.jsonl"] == replica.objects["abc.jsonl"] == data
+        assert replica.calls.count("upload_part") == primary.calls.count("upload_part") == 7
+
+    def test_transient_error_is_retried_for_that_destination_only(self):
+        primary, replica = FakeS3(), FakeS3()
+        replica.fail_on["put_object"] = RuntimeError("throttled")
+        _fanout(primary, replica).put_object(
+            Bucket="b0", Key="k", Body=b"x", ContentType="application/jsonl"
+        )
+        assert primary.calls == ["put_object"]
+        assert replica.calls == ["put_object", "put_object"]
+        assert replica.objects["k"] == b"x"
+
+    def test_failing_destination_does_not_block_the_others(self, tmp_path, caplog):
+        config = _write(tmp_path, b"0123456789" * 5)
+        primary, replica = FakeS3(), _BrokenS3("upload_part")
+        fanout = _fanout(primary, replica, attempts=2)
+
+        with caplog.at_level(logging.WARNING, logger="gate"):
+            with pytest.raises(DestinationError, match="s3://b1") as excinfo:
+                upload_transcripts(str(tmp_path), config, fanout)
+        assert list(excinfo.value.failures) == ["s3://b1"]
+        assert primary.objects["abc.jsonl"] == b"0123456789" * 5
+        assert "abc.jsonl" not in replica.objects
+        # Dropped after the first part: no further parts are sent to it
+        assert replica.calls.count("upload_part") == 2
+        assert "Destination s3://b1: 1 object(s) failed" in caplog.text
+
+    def test_error_raised_when_every_destination_fails(self):
+        fanout = _fanout(_BrokenS3("put_object"), _BrokenS3("put_object"), attempts=1)
+        with pytest.raises(RuntimeError, match="put_object down"):
+            fanout.put_object(Bucket="b0", Key="k", Body=b"x", ContentType="application/jsonl")
+
+    def test_permanent_errors_are_not_retried(self):
+        primary, replica = FakeS3(), FakeS3()
+        fanout = _fanout(primary, replica)
+        upload_id = fanout.create_multipart_upload(
+            Bucket="b0", Key="k", ContentType="application/jsonl"
+        )["UploadId"]
+        replica.fail_on["upload_part"] = no_such_upload()
+        etag = fanout.upload_part(Bucket="b0", Key="k", UploadId=upload_id, PartNumber=1, Body=b"x")
+        assert list(json.loads(etag["ETag"])) == ["s3://b0"]
+        assert replica.calls.count("upload_part") == 1
+
+    def test_upload_id_from_before_fan_out_restarts_upload(self):
+        with pytest.raises(Exception) as excinfo:
+            _fanout(FakeS3(), FakeS3()).upload_part(
+                Bucket="b0", Key="k", UploadId="plain-id", PartNumber=1, Body=b"x"
+            )
+        assert excinfo.value.response["Error"]["Code"] == "NoSuchUpload"
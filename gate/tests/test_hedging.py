@@ -0,0 +1,146 @@
+"""Tests for gate.hedging -- duplicate requests for slow single-request uploads."""
+
+import threading
+import time
+
+import pytest
+
+import gate.hedging as hedging
+from gate.hedging import MIN_SAMPLES, Hedger, LatencyTracker
+from gate.streaming import BufferPool
+from gate.transcript_upload import UploadContext, UploadEntry, _upload_single
+from tests.conftest import FakeS3
+
+
+class _StalledS3(FakeS3):
+    """put_object blocks until ``release`` is set (then fails if ``error`` is given)."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        super().__init__()
+        self.release = threading.Event()
+        self.error = error
+
+    def put_object(self, **kwargs):
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return super().put_object(**kwargs)
+
+
+class _SlowS3(FakeS3):
+    def put_object(self, **kwargs):
+        time.sleep(0.05)
+        return super().put_object(**kwargs)
+
+
+@pytest.fixture(autouse=True)
+def short_delay(monkeypatch):
+    monkeypatch.setattr(hedging, "DEFAULT_HEDGE_DELAY", 0.01)
+
+
+def _hedger(primary, hedge, budget=0.1, sent=100) -> Hedger:
+    hedger = Hedger(primary, lambda: hedge, workers=1, percentile=95, budget=budget)
+    # Bytes already sent by earlier requests, which the budget is a fraction of
+    hedger._sent_bytes = sent
+    return hedger
+
+
+def _put(key="k", body=b"x"):
+    return lambda client: client.put_object(
+        Bucket="b", Key=key, Body=body, ContentType="application/jsonl"
+    )
+
+
+class TestLatencyTracker:
+    def test_default_delay_until_enough_samples(self):
+        tracker = LatencyTracker(95)
+        for _ in range(MIN_SAMPLES - 1):
+            tracker.record(100, 0.5)
+        assert tracker.delay(100) == hedging.DEFAULT_HEDGE_DELAY
+
+    def test_percentile_of_size_class(self):
+        tracker = LatencyTracker(90)
+        for i in range(100):
+            tracker.record(100, i / 100)
+        tracker.record(10 * 1024 * 1024, 9.0)
+        assert tracker.delay(200) == 0.9
+        assert tracker.delay(10 * 1024 * 1024) == hedging.DEFAULT_HEDGE_DELAY
+
+
+class TestHedger:
+    def test_fast_request_is_not_hedged(self):
+        primary, hedge = FakeS3(), FakeS3()
+        done = []
+        hedger = _hedger(primary, hedge)
+        hedger.send(_put(), 1, lambda: done.append(True))
+        hedger.close()
+        assert (primary.calls, hedge.calls, hedger.hedged) == (["put_object"], [], 0)
+        assert done == [True]
+
+    def test_slow_request_is_duplicated_and_first_finisher_wins(self):
+        primary, hedge = _StalledS3(), FakeS3()
+        done = []
+        hedger = _hedger(primary, hedge)
+        response = hedger.send(_put(), 1, lambda: done.append(True))
+        assert response == {"ETag": '"k"'}
+        assert hedge.objects == {"k": b"x"}
+        assert (hedger.hedged, hedger.wins) == (1, 1)
+        # The buffer is only handed back once the stalled request finishes too
+        assert done == []
+        primary.release.set()
+        hedger.close()
+        assert done == [True]
+
+    def test_budget_caps_hedged_bytes(self):
+        primary, hedge = _StalledS3(), FakeS3()
+        threading.Timer(0.05, primary.release.set).start()
+        hedger = _hedger(primary, hedge, budget=0.1, sent=0)
+        hedger.send(_put(), 1, lambda: None)
+        hedger.close()
+        assert (hedge.calls, hedger.hedged) == ([], 0)
+
+    def test_hedged_bytes_stay_below_budget_fraction(self):
+        primary, hedge = _SlowS3(), FakeS3()
+        hedger = _hedger(primary, hedge, budget=0.5, sent=0)
+        for i in range(6):
+            hedger.send(_put(key=f"k{i}"), 100, lambda: None)
+        hedger.close()
+        # Every request was slow, but only every other one fits the budget
+        assert (hedger.hedged, len(hedge.objects)) == (3, 3)
+
+    def test_failed_hedge_waits_for_original_request(self):
+        primary, hedge = _StalledS3(), _StalledS3(RuntimeError("hedge"))
+        hedge.release.set()
+        hedger = _hedger(primary, hedge)
+        threading.Timer(0.05, primary.release.set).start()
+        assert hedger.send(_put(), 1, lambda: None) == {"ETag": '"k"'}
+        hedger.close()
+        assert (hedger.hedged, hedger.wins) == (1, 0)
+
+    def test_fast_failure_is_raised_without_hedging(self):
+        primary, hedge = _StalledS3(RuntimeError("denied")), FakeS3()
+        primary.release.set()
+        hedger = _hedger(primary, hedge)
+        with pytest.raises(RuntimeError, match="denied"):
+            hedger.send(_put(), 1, lambda: None)
+        hedger.close()
+        assert hedge.calls == []
+
+
+class TestUploadSingleHedged:
+    def test_pool_buffer_returned_after_losing_request(self, tmp_path):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b'{"n": 1}\n')
+        primary, hedge = _StalledS3(), FakeS3()
+        pool = BufferPool(64, 1)
+        hedger = _hedger(primary, hedge)
+        ctx = UploadContext(
+            uploader=primary, bucket_name="b", part_size=64, pool=pool, hedger=hedger
+        )
+
+        _upload_single(ctx, UploadEntry("t.jsonl", str(path)))
+        assert hedge.objects["t.jsonl"] == b'{"n": 1}\n'
+        assert pool._free.empty()
+        primary.release.set()
+        hedger.close()
+        assert not pool._free.empty()
@@ -0,0 +1,40 @@
+"""Tests for gate.key_sharding -- hashed per-session key prefixes."""
+
+from collections import Counter
+
+import pytest
+
+from gate.key_sharding import key_shard, main, session_prefix
+
+
+class TestKeyShard:
+    @pytest.mark.parametrize(("shards", "width"), [(2, 1), (16, 1), (17, 2), (256, 2), (1000, 3)])
+    def test_fixed_width_hex(self, shards, width):
+        for i in range(50):
+            shard = key_shard(f"session-{i}", shards)
+            assert len(shard) == width
+            assert int(shard, 16) < shards
+
+    def test_deterministic(self):
+        assert key_shard("abc", 64) == key_shard("abc", 64)
+
+    def test_spreads_sessions_evenly(self):
+        counts = Counter(key_shard(f"session-{i}", 16) for i in range(16_000))
+        assert len(counts) == 16
+        assert max(counts.values()) < 1.2 * 1000
+
+
+class TestSessionPrefix:
+    def test_inserted_after_prefix(self):
+        shard = key_shard("abc", 16)
+        assert session_prefix("env", "abc", 16) == f"env/{shard}"
+        assert session_prefix("", "abc", 16) == shard
+
+    @pytest.mark.parametrize("shards", [0, 1])
+    def test_unsharded(self, shards):
+        assert session_prefix("env", "abc", shards) == "env"
+
+
+def test_main_prints_prefixes(capsys):
+    assert main(["--shards", "16", "--prefix", "/env/", "abc"]) == 0
+    assert capsys.readouterr().out == f"abc\tenv/{key_shard('abc', 16)}\n"
@@ -0,0 +1,108 @@
+"""Tests for gate.keyword_index -- keyword index sidecars and cross-session search."""
+
+import json
+
+import pytest
+
+from gate.keyword_index import (
+    KeywordIndexer,
+    command_term,
+    error_signature,
+    keyword_index_key,
+    main,
+    merge_indexes,
+    search,
+)
+
+
+def _event(*content) -> bytes:
+    return json.dumps({"type": "assistant", "message": {"content": list(content)}}).encode() + b"\n"
+
+
+def _tool(name: str, **tool_input) -> dict:
+    return {"type": "tool_use", "name": name, "input": tool_input}
+
+
+def _error(content) -> dict:
+    return {"type": "tool_result", "is_error": True, "content": content}
+
+
+def _index(data: bytes, key: str = "abc.jsonl", part: int = 5) -> dict:
+    indexer = KeywordIndexer()
+    for i in range(0, len(data), part):
+        indexer.feed(memoryview(data)[i : i + part])
+    indexer.finish()
+    return json.loads(indexer.to_json(key))
+
+
+class TestTerms:
+    def test_sidecar_key_replaces_extension(self):
+        assert keyword_index_key("env/abc/agent-1.jsonl") == "env/abc/agent-1.keywords.json"
+
+    @pytest.mark.parametrize(
+        ("command", "term"),
+        [
+            ("git commit -m 'x'", "git commit"),
+            ("/usr/bin/python -m pytest", "python"),
+            ("  ls", "ls"),
+            ("", ""),
+        ],
+    )
+    def test_command_term(self, command, term):
+        assert command_term(command) == term
+
+    def test_error_signature_masks_variable_parts(self):
+        a = error_signature("\nFileNotFoundError: 'a.txt' at line 12 (id deadbeef01)\ntrace")
+        b = error_signature("FileNotFoundError: 'b.txt' at line 7 (id 0123abcd99)")
+        assert a == b == "filenotfounderror: <str> at line <n> (id <hex>)"
+
+
+class TestKeywordIndexer:
+    def test_collects_tools_paths_commands_and_errors(self):
+        data = b"".join(
+            [
+                _event(_tool("Read", file_path="src/app.py"), _tool("Grep", path="src")),
+                _event(_tool("Bash", command="pytest -q"), _tool("Bash", command="pytest -x")),
+                _event(_error([{"type": "text", "text": "Exit code 1"}])),
+                b"not json\n",
+            ]
+        )
+        index = _index(data)
+        assert index["tools"] == {"Read": 1, "Grep": 1, "Bash": 1}
+        assert index["paths"] == {"src/app.py": 1, "src": 1}
+        assert index["commands"] == {"pytest": 1}
+        assert index["errors"] == {"exit code <n>": 1}
+        assert index["lines"] == 4
+
+
+class TestSearch:
+    def _merged(self):
+        return merge_indexes(
+            [
+                _index(_event(_tool("Edit", file_path="src/app.py")), key="s1.jsonl"),
+                _index(_event(_error("Permission denied: /etc/x")), key="s2.jsonl"),
+                _index(_event(_tool("Read", file_path="src/app.py")), key="s3/a.jsonl"),
+            ]
+        )
+
+    def test_merged_indexes_find_sessions_by_term(self):
+        merged = self._merged()
+        assert search(merged, "paths", "app.py") == {"s1.jsonl": 1, "s3/a.jsonl": 1}
+        assert search(merged, "errors", "PERMISSION DENIED") == {"s2.jsonl": 1}
+        assert search(merged, "tools", "Bash") == {}
+
+    def test_cli_intersects_queries(self, tmp_path, capsys):
+        paths = []
+        for i, index in enumerate(
+            [
+                _index(_event(_tool("Edit", file_path="src/app.py")), key="s1.jsonl"),
+                _index(_event(_tool("Read", file_path="src/app.py")), key="s2.jsonl"),
+            ]
+        ):
+            path = tmp_path / f"{i}.keywords.json"
+            path.write_text(json.dumps(index))
+            paths.append(str(path))
+
+        assert main(["--path", "app.py", "--tool", "Edit", *paths]) == 0
+        assert capsys.readouterr().out == "s1.jsonl\n"
+        assert main(["--tool", "Bash", *paths]) == 1
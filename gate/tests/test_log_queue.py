@@ -0,0 +1,64 @@
+"""Tests for gate.log_queue -- queue-backed logging flushed by a background thread."""
+
+import atexit
+import io
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+
+from gate import log_queue
+
+
+@pytest.fixture
+def target():
+    """A logger outside the hierarchy, which pytest fills with its capture handlers."""
+    return logging.Logger("gate-log-queue-test")
+
+
+def _stop(listener) -> None:
+    """Drain and stop ``listener`` now instead of at exit."""
+    listener.stop()
+    atexit.unregister(listener.stop)
+
+
+class TestConfigure:
+    def test_records_reach_the_stream_through_the_queue(self, target):
+        stream = io.StringIO()
+        listener = log_queue.configure(stream, logger=target)
+        assert listener is not None
+
+        [handler] = target.handlers
+        assert isinstance(handler, QueueHandler)
+        target.info("hello %s", "queue")
+        _stop(listener)
+
+        assert stream.getvalue().rstrip().endswith("INFO hello queue")
+
+    def test_level_filters_before_the_queue(self, target):
+        stream = io.StringIO()
+        listener = log_queue.configure(stream, logging.WARNING, logger=target)
+        target.info("dropped")
+        target.warning("kept")
+        _stop(listener)
+
+        assert "dropped" not in stream.getvalue()
+        assert "kept" in stream.getvalue()
+
+    def test_exceptions_are_formatted(self, target):
+        stream = io.StringIO()
+        listener = log_queue.configure(stream, logger=target)
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            target.exception("crashed")
+        _stop(listener)
+
+        assert "ValueError: bad" in stream.getvalue()
+
+    def test_leaves_existing_configuration_alone(self, target):
+        existing = logging.NullHandler()
+        target.addHandler(existing)
+
+        assert log_queue.configure(io.StringIO(), logger=target) is None
+        assert target.handlers == [existing]
@@ -0,0 +1,165 @@
+"""Tests for gate.packing -- blob externalization of large values and rehydration."""
+
+import hashlib
+import json
+
+import pytest
+
+from gate.key_sharding import key_shard
+from gate.packing import (
+    REFERENCE_PREFIX,
+    Packer,
+    blob_key,
+    load_known_blobs,
+    rehydrate_lines,
+    save_known_blobs,
+)
+from tests.conftest import FakeS3
+
+BIG = "x" * 64
+
+
+def _packer(s3, scope="session", known=()):
+    return Packer(s3, "b", "env", scope, 32, known=known)
+
+
+def _line(**fields) -> bytes:
+    return json.dumps(fields).encode() + b"\n"
+
+
+def _rehydrate(s3, data: bytes, scope="session", session_id="abc") -> bytes:
+    def fetch(digest: str) -> bytes:
+        return s3.objects[blob_key("env", scope, session_id, digest)]
+
+    return b"".join(rehydrate_lines(data.splitlines(keepends=True), fetch))
+
+
+class TestKeys:
+    def test_session_and_global_blob_keys(self):
+        assert blob_key("env", "session", "abc", "d1") == "env/abc.blobs/d1"
+        assert blob_key("env", "global", "abc", "d1") == "env/blobs/d1"
+        assert blob_key("", "session", "abc", "d1") == "abc.blobs/d1"
+
+    def test_session_blobs_follow_key_shards(self):
+        shard = key_shard("abc", 16)
+        assert blob_key("env", "session", "abc", "d1", 16) == f"env/{shard}/abc.blobs/d1"
+        assert blob_key("env", "global", "abc", "d1", 16) == "env/blobs/d1"
+
+
+class TestPacker:
+    def test_repeated_value_is_uploaded_once(self):
+        s3 = FakeS3()
+        data = _line(a=BIG, small="s") + _line(b=BIG)
+
+        packed = bytes(_packer(s3).pack(data, "abc"))
+
+        digest = hashlib.sha256(BIG.encode()).hexdigest()
+        assert packed.count(REFERENCE_PREFIX + digest.encode()) == 2
+        assert b'"small": "s"' in packed
+        assert s3.objects == {f"env/abc.blobs/{digest}": BIG.encode()}
+        assert [json.loads(line) for line in packed.splitlines()]
+        assert _rehydrate(s3, packed) == data
+
+    def test_escaped_strings_round_trip(self):
+        s3 = FakeS3()
+        data = _line(a='quote " and \\ and\nnewline' * 4, b="é" * 40)
+
+        packed = bytes(_packer(s3).pack(data, "abc"))
+
+        assert len(packed) < len(data)
+        assert _rehydrate(s3, packed) == data
+
+    def test_small_content_is_returned_unchanged(self):
+        s3 = FakeS3()
+        data = _line(a="short")
+        assert _packer(s3).pack(data, "abc") is data
+        assert s3.objects == {}
+
+    def test_partial_lines_pass_through(self):
+        s3 = FakeS3()
+        head, tail = f'"{BIG}"}}\n'.encode(), f'{{"a": "{BIG}'.encode()
+        middle = _line(b=BIG)
+
+        packed = bytes(_packer(s3).pack(head + middle + tail, "abc", line_start=False))
+
+        assert packed.startswith(head)
+        assert packed.endswith(tail)
+        assert BIG.encode() not in packed[len(head) : -len(tail)]
+
+    def test_literal_resembling_a_reference_is_externalized(self):
+        s3 = FakeS3()
+        data = _line(a="\u0000blob:" + "0" * 64)
+        assert REFERENCE_PREFIX in data
+
+        packed = bytes(_packer(s3).pack(data, "abc"))
+
+        assert packed != data
+        assert _rehydrate(s3, packed) == data
+
+    def test_short_lines_resembling_a_reference_round_trip(self):
+        s3 = FakeS3()
+        line = _line(x="\u0000blob:" + "0" * 64)
+        data = line * 2 + _line(y="plain")
+        packer = Packer(s3, "b", "env", "session", 4096)
+
+        packed = bytes(packer.pack(data, "abc"))
+
+        assert packed.count(REFERENCE_PREFIX) == 2
+        assert packed.endswith(_line(y="plain"))
+        assert _rehydrate(s3, packed) == data
+
+    def test_known_blobs_are_not_uploaded_again(self):
+        s3 = FakeS3()
+        digest = hashlib.sha256(BIG.encode()).hexdigest()
+        packer = _packer(s3, scope="global", known={f"env/blobs/{digest}"})
+
+        packer.pack(_line(a=BIG), "abc")
+
+        assert s3.objects == {}
+        assert packer.blobs_sent == 0
+
+    def test_failed_blob_upload_propagates(self):
+        s3 = FakeS3()
+        s3.fail_on["put_object"] = RuntimeError("boom")
+        packer = _packer(s3)
+
+        with pytest.raises(RuntimeError, match="boom"):
+            packer.pack(_line(a=BIG), "abc")
+        assert packer.uploaded == set()
+
+    def test_unknown_scope_rejected(self):
+        with pytest.raises(ValueError, match="scope"):
+            _packer(FakeS3(), scope="bucket")
+
+
+class TestKnownBlobs:
+    def test_round_trip(self, tmp_path):
+        save_known_blobs(str(tmp_path), "b", {"env/blobs/d1"})
+        assert load_known_blobs(str(tmp_path), "b") == {"env/blobs/d1"}
+
+    def test_other_bucket_starts_empty(self, tmp_path):
+        save_known_blobs(str(tmp_path), "b", {"env/blobs/d1"})
+        assert load_known_blobs(str(tmp_path), "other") == set()
+
+    def test_unreadable_list_is_discarded(self, tmp_path):
+        (tmp_path / "blobs.json").write_text("{not json")
+        assert load_known_blobs(str(tmp_path), "b") == set()
+
+
+class TestRehydrate:
+    def test_fetches_each_blob_once(self):
+        digest = "a" * 64
+        ref = b'"' + REFERENCE_PREFIX + digest.encode() + b'"'
+        fetched = []
+
+        def fetch(d):
+            fetched.append(d)
+            return b"value"
+
+        lines = [b'{"a": ' + ref + b"}\n", b'{"plain": 1}\n', b'{"b": ' + ref + b"}\n"]
+        assert list(rehydrate_lines(lines, fetch)) == [
+            b'{"a": "value"}\n',
+            b'{"plain": 1}\n',
+            b'{"b": "value"}\n',
+        ]
+        assert fetched == [digest]
@@ -0,0 +1,88 @@
+"""Tests for gate.profiling -- opt-in profiling of the gate run."""
+
+import json
+import logging
+import os
+import pstats
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gate.config import ProfilingConfig
+from gate.profiling import _upload_artifacts, profile_run
+from tests.conftest import FakeS3
+
+
+def _worker_hash(data: bytes) -> int:
+    return zlib.crc32(data)
+
+
+class TestProfileRun:
+    def test_writes_profile_and_summary(self, tmp_path):
+        with profile_run(ProfilingConfig(), str(tmp_path)) as run_dir:
+            sum(range(1000))
+
+        assert sorted(os.listdir(run_dir)) == ["gate.prof", "profile.txt", "summary.json"]
+        assert os.path.dirname(run_dir) == str(tmp_path / "profiles")
+        with open(os.path.join(run_dir, "summary.json")) as f:
+            summary = json.load(f)
+        assert summary["wall_seconds"] >= 0
+        assert summary["peak_rss_bytes"] > 0
+
+    def test_worker_threads_are_profiled(self, tmp_path):
+        with profile_run(ProfilingConfig(), str(tmp_path)) as run_dir:
+            with ThreadPoolExecutor(2) as pool:
+                list(pool.map(_worker_hash, [b"a" * 1024, b"b" * 1024]))
+
+        stats = pstats.Stats(os.path.join(run_dir, "gate.prof"))
+        functions = {name for _, _, name in stats.stats}  # type: ignore[attr-defined]
+        assert "_worker_hash" in functions
+        with open(os.path.join(run_dir, "profile.txt")) as f:
+            assert "_worker_hash" in f.read()
+
+    def test_tracemalloc_top_n(self, tmp_path):
+        with profile_run(ProfilingConfig(tracemalloc_top=3), str(tmp_path)) as run_dir:
+            _ = [bytearray(1024) for _ in range(100)]
+
+        with open(os.path.join(run_dir, "tracemalloc.txt")) as f:
+            assert len(f.readlines()) == 3
+        with open(os.path.join(run_dir, "summary.json")) as f:
+            assert json.load(f)["tracemalloc_peak_bytes"] >= 100 * 1024
+
+    def test_artifacts_written_when_block_raises(self, tmp_path):
+        with pytest.raises(SystemExit):
+            with profile_run(ProfilingConfig(), str(tmp_path)) as run_dir:
+                raise SystemExit(1)
+        assert os.path.exists(os.path.join(run_dir, "gate.prof"))
+
+    def test_unwritable_state_dir_is_logged_not_raised(self, tmp_path, caplog):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        with caplog.at_level(logging.ERROR, logger="gate"):
+            with profile_run(ProfilingConfig(), str(blocker)):
+                pass
+        assert "Could not write profiling artifacts" in caplog.text
+
+
+class TestUploadArtifacts:
+    def test_uploads_under_diagnostics_prefix(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "bucket")
+        monkeypatch.setenv("AWS_S3_PREFIX", "env")
+        run_dir = tmp_path / "20250101T000000Z-1"
+        run_dir.mkdir()
+        (run_dir / "summary.json").write_text("{}")
+        s3 = FakeS3()
+
+        _upload_artifacts(str(run_dir), s3)
+        assert s3.objects == {"env/diagnostics/20250101T000000Z-1/summary.json": b"{}"}
+
+    def test_upload_failure_is_logged(self, tmp_path, monkeypatch, caplog):
+        monkeypatch.setenv("AWS_S3_BUCKET_NAME", "bucket")
+        (tmp_path / "summary.json").write_text("{}")
+        s3 = FakeS3()
+        s3.fail_on["put_object"] = RuntimeError("denied")
+
+        with caplog.at_level(logging.ERROR, logger="gate"):
+            _upload_artifacts(str(tmp_path), s3)
+        assert "Profile upload failed (non-fatal)" in caplog.text
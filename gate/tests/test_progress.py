@@ -0,0 +1,102 @@
+"""Tests for gate.progress -- aggregated upload progress and the per-file upload log."""
+
+import json
+import logging
+
+from gate.compaction import UploadedFile
+from gate.progress import UploadProgress
+from gate.transcript_upload import UploadEntry
+
+
+def _done(key: str, size: int) -> tuple[UploadEntry, UploadedFile]:
+    return UploadEntry(key, f"/t/{key}"), UploadedFile(key, f"/t/{key}", size, 0)
+
+
+class TestUploadProgress:
+    def test_counts_files_bytes_and_failures(self):
+        progress = UploadProgress(interval=3600)
+        progress.record(*_done("a.jsonl", 10), 0.1)
+        progress.record(*_done("b.jsonl", 20), 0.1)
+        progress.record(UploadEntry("c.jsonl", "/t/c.jsonl"), RuntimeError("boom"), 0.1)
+
+        assert (progress.files, progress.failed, progress.bytes) == (3, 1, 30)
+
+    def test_shard_counts_its_range(self):
+        progress = UploadProgress(interval=3600)
+        entry = UploadEntry("a.shards/00000.jsonl", "/t/a.jsonl", "a", 100, 250)
+        progress.record(entry, UploadedFile(entry.key, entry.file_path, 1000, 0), 0.1)
+        assert progress.bytes == 150
+
+    def test_logs_at_most_once_per_interval(self, caplog):
+        progress = UploadProgress(interval=3600)
+        with caplog.at_level(logging.INFO, logger="gate"):
+            for i in range(100):
+                progress.record(*_done(f"{i}.jsonl", 1), 0.0)
+            progress.close()
+
+        lines = [r.message for r in caplog.records if r.message.startswith("Upload progress")]
+        assert len(lines) == 1
+        assert lines[0].startswith("Upload progress: files=100 failed=0 bytes=100 rate=")
+
+    def test_zero_interval_logs_every_upload(self, caplog):
+        progress = UploadProgress(interval=0)
+        with caplog.at_level(logging.INFO, logger="gate"):
+            progress.record(*_done("a.jsonl", 1), 0.0)
+            progress.record(*_done("b.jsonl", 1), 0.0)
+        assert caplog.text.count("Upload progress") == 2
+
+    def test_redacted_secrets_are_summed_into_the_progress_line(self, caplog):
+        progress = UploadProgress(interval=3600)
+        progress.record(*_done("a.jsonl", 1), 0.0)
+        progress.add_redacted(2)
+        progress.add_redacted(3)
+        with caplog.at_level(logging.INFO, logger="gate"):
+            progress.close()
+        assert caplog.records[-1].message.endswith(" redacted=5")
+
+    def test_close_without_uploads_logs_nothing(self, caplog):
+        with caplog.at_level(logging.INFO, logger="gate"):
+            UploadProgress(interval=0).close()
+        assert "Upload progress" not in caplog.text
+
+
+class TestUploadLog:
+    def test_one_json_line_per_upload(self, tmp_path):
+        path = tmp_path / "uploads.jsonl"
+        progress = UploadProgress(interval=3600, detail_path=str(path))
+        progress.record(*_done("a.jsonl", 10), 0.25)
+        progress.record(UploadEntry("b.jsonl", "/t/b.jsonl"), RuntimeError("boom"), 1.0)
+        progress.close()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert lines == [
+            {"key": "a.jsonl", "bytes": 10, "seconds": 0.25},
+            {"key": "b.jsonl", "bytes": 0, "seconds": 1.0, "error": "boom"},
+        ]
+
+    def test_unopenable_path_only_warns(self, tmp_path, caplog):
+        with caplog.at_level(logging.WARNING, logger="gate"):
+            progress = UploadProgress(interval=3600, detail_path=str(tmp_path / "no" / "x"))
+        progress.record(*_done("a.jsonl", 10), 0.1)
+        assert progress.files == 1
+        assert "Cannot open upload log" in caplog.text
+
+    def test_write_error_disables_the_log(self, tmp_path, caplog):
+        progress = UploadProgress(interval=3600, detail_path=str(tmp_path / "uploads.jsonl"))
+
+        class FullDisk:
+            name = "uploads.jsonl"
+
+            def write(self, data: str) -> int:
+                raise OSError(28, "No space left on device")
+
+            def close(self) -> None:
+                pass
+
+        progress._detail = FullDisk()
+        with caplog.at_level(logging.WARNING, logger="gate"):
+            progress.record(*_done("a.jsonl", 10), 0.1)
+            progress.record(*_done("b.jsonl", 10), 0.1)
+
+        assert progress.files == 2
+        assert caplog.text.count("is unwritable") == 1
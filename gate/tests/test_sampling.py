@@ -0,0 +1,156 @@
+"""Tests for gate.sampling -- hash-based sampling and per-file summaries."""
+
+import json
+
+import pytest
+
+from gate.config import TranscriptUploadConfig
+from gate.sampling import (
+    ended_in_error,
+    is_sampled,
+    iter_sampled,
+    sample_point,
+    summarize,
+    summary_key,
+)
+from gate.transcript_upload import _iter_uploads
+from tests.conftest import LEGACY_KEYS
+
+
+def _line(**event) -> bytes:
+    return json.dumps(event).encode() + b"\n"
+
+
+def _session(transcript_dir, session_id: str, last_event: bytes = b"", subagents: int = 1):
+    (transcript_dir / f"{session_id}.jsonl").write_bytes(_line(type="user") + last_event)
+    sub_dir = transcript_dir / session_id / "subagents"
+    sub_dir.mkdir(parents=True)
+    for i in range(subagents):
+        (sub_dir / f"agent-{i}.jsonl").write_bytes(_line(type="user"))
+
+
+class TestSamplePoint:
+    def test_stable_and_in_range(self):
+        assert sample_point("abc") == sample_point("abc")
+        assert all(0 <= sample_point(f"s{i}") < 100 for i in range(100))
+
+    def test_rate_is_roughly_honoured(self):
+        kept = sum(is_sampled(f"session-{i}", 10) for i in range(2000))
+        assert 140 < kept < 260
+
+    def test_bounds(self):
+        assert not is_sampled("abc", 0)
+        assert is_sampled("abc", 100)
+
+
+class TestEndedInError:
+    @pytest.mark.parametrize(
+        ("last", "expected"),
+        [
+            (_line(type="assistant", isApiErrorMessage=True), True),
+            (_line(type="result", subtype="error_max_turns"), True),
+            (_line(message={"content": [{"type": "tool_result", "is_error": True}]}), True),
+            (_line(type="assistant", message={"content": []}), False),
+            (_line(type="result", subtype="success") + b"{partial", False),
+        ],
+    )
+    def test_last_event_decides(self, tmp_path, last, expected):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(_line(type="user", isApiErrorMessage=True) + last)
+        assert ended_in_error(str(path)) is expected
+
+    def test_missing_file(self, tmp_path):
+        assert not ended_in_error(str(tmp_path / "missing.jsonl"))
+
+
+def _split(transcript_dir, uploads, config):
+    sampled = list(iter_sampled(transcript_dir, uploads, config))
+    return [e for e, keep in sampled if keep], [e for e, keep in sampled if not keep]
+
+
+class TestIterSampled:
+    def _uploads(self, tmp_path):
+        transcripts = tmp_path / "t"
+        transcripts.mkdir()
+        _session(transcripts, "ok")
+        _session(transcripts, "failed", _line(type="assistant", isApiErrorMessage=True))
+        files = sorted(str(p) for p in transcripts.glob("*.jsonl"))
+        return str(transcripts), list(
+            _iter_uploads(str(transcripts), files, key_template=LEGACY_KEYS)
+        )
+
+    def test_keeps_mains_and_errored_sessions(self, tmp_path):
+        transcript_dir, uploads = self._uploads(tmp_path)
+        config = TranscriptUploadConfig(
+            bucket_name="b", region="r", sample_subagent_percent=0, key_template=LEGACY_KEYS
+        )
+        kept, skipped = _split(transcript_dir, uploads, config)
+        assert sorted(e.key for e in kept) == [
+            "failed.jsonl",
+            "failed/agent-0.jsonl",
+            "ok.jsonl",
+        ]
+        assert [e.key for e in skipped] == ["ok/agent-0.jsonl"]
+
+    def test_errored_sessions_sampled_when_not_kept(self, tmp_path):
+        transcript_dir, uploads = self._uploads(tmp_path)
+        config = TranscriptUploadConfig(
+            bucket_name="b",
+            region="r",
+            sample_main_percent=0,
+            sample_subagent_percent=0,
+            sample_keep_errors=False,
+            key_template=LEGACY_KEYS,
+        )
+        kept, skipped = _split(transcript_dir, uploads, config)
+        assert (kept, len(skipped)) == ([], 4)
+
+    def test_iter_sampled_decides_as_entries_arrive(self, tmp_path):
+        transcript_dir, uploads = self._uploads(tmp_path)
+        config = TranscriptUploadConfig(
+            bucket_name="b", region="r", sample_subagent_percent=0, key_template=LEGACY_KEYS
+        )
+        consumed: list[str] = []
+
+        def entries():
+            for entry in uploads:
+                consumed.append(entry.key)
+                yield entry
+
+        sampled = iter_sampled(transcript_dir, entries(), config)
+        entry, keep = next(sampled)
+
+        assert consumed == [entry.key]
+        assert keep
+        assert len(list(sampled)) == len(uploads) - 1
+
+
+class TestSummaries:
+    def test_skipped_file_summary_has_counts(self, tmp_path):
+        transcripts = tmp_path / "t"
+        transcripts.mkdir()
+        content = [{"type": "tool_use", "name": "Bash"}, {"type": "tool_result", "is_error": 1}]
+        data = _line(timestamp="t1") + _line(timestamp="t2", message={"content": content})
+        (transcripts / "abc.jsonl").write_bytes(data)
+        [entry] = _iter_uploads(
+            str(transcripts), [str(transcripts / "abc.jsonl")], key_template=LEGACY_KEYS
+        )
+
+        assert summarize(str(transcripts), entry, sampled=False) == {
+            "key": "abc.jsonl",
+            "session_id": "abc",
+            "role": "main",
+            "size": len(data),
+            "sampled": False,
+            "lines": 2,
+            "tool_uses": 1,
+            "errors": 1,
+            "first_timestamp": "t1",
+            "last_timestamp": "t2",
+        }
+        assert summarize(str(transcripts), entry, sampled=True)["sampled"] is True
+
+    def test_summary_key_is_per_depth(self):
+        assert summary_key("env", 3).startswith("env/summaries/")
+        assert summary_key("env", 3).endswith("-depth-00003.jsonl")
+        assert summary_key("", None).startswith("summaries/")
@@ -0,0 +1,70 @@
+"""Tests for gate.sharding -- line-aligned shard planning and the shard index."""
+
+import json
+
+import pytest
+
+from gate.sharding import ShardStats, build_index, index_key, plan_shards, shard_key
+
+
+def _line(ts: str, pad: int = 0) -> bytes:
+    return json.dumps({"type": "user", "timestamp": ts, "text": "x" * pad}).encode() + b"\n"
+
+
+class TestKeys:
+    def test_shard_and_index_keys_replace_extension(self):
+        assert shard_key("env/abc.jsonl", 3) == "env/abc.shards/part-00003.jsonl"
+        assert index_key("env/abc.jsonl") == "env/abc.shards/index.json"
+
+
+class TestPlanShards:
+    def test_boundaries_follow_newlines(self, tmp_path):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"aaa\nbbbbbb\ncc\ndddd\n")
+        assert plan_shards(str(path), 19, 4) == [(0, 11), (11, 19)]
+
+    def test_long_line_extends_shard(self, tmp_path):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"a" * 20 + b"\nb\n")
+        assert plan_shards(str(path), 23, 4) == [(0, 21), (21, 23)]
+
+    def test_single_shard_when_no_later_newline(self, tmp_path):
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(b"a\n" + b"b" * 10)
+        assert plan_shards(str(path), 12, 4) == [(0, 12)]
+
+    @pytest.mark.parametrize("shard_size", [1, 3, 7, 50])
+    def test_ranges_cover_file(self, tmp_path, shard_size):
+        data = b"".join(_line(f"t{i}", pad=i) for i in range(10))
+        path = tmp_path / "t.jsonl"
+        path.write_bytes(data)
+        ranges = plan_shards(str(path), len(data), shard_size)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert all(data[end - 1 : end] == b"\n" for _, end in ranges)
+
+
+class TestShardStats:
+    def test_counts_lines_and_timestamps_across_parts(self):
+        stats = ShardStats("k", 0, 100)
+        data = _line("2025-01-01T00:00:00Z") + _line("2025-01-01T00:00:05Z")
+        stats.feed(memoryview(data)[:30])
+        stats.feed(data[30:])
+        assert (stats.lines, stats.size) == (2, len(data))
+        assert stats.first_timestamp == "2025-01-01T00:00:00Z"
+        assert stats.last_timestamp == "2025-01-01T00:00:05Z"
+
+    def test_ignores_escaped_nested_timestamps(self):
+        stats = ShardStats("k", 0, 10)
+        stats.feed(json.dumps({"content": '{"timestamp": "nested"}'}).encode() + b"\n")
+        assert stats.first_timestamp is None
+
+
+class TestBuildIndex:
+    def test_line_ranges_are_cumulative(self):
+        shards = [ShardStats("a", 0, 10, lines=3, size=10), ShardStats("b", 10, 25, lines=2)]
+        index = json.loads(build_index("abc.jsonl", shards))
+        assert index["source_key"] == "abc.jsonl"
+        assert (index["size"], index["lines"]) == (25, 5)
+        assert [s["line_range"] for s in index["shards"]] == [[0, 3], [3, 5]]
+        assert [s["byte_range"] for s in index["shards"]] == [[0, 10], [10, 25]]
@@ -0,0 +1,97 @@
+"""Tests for gate.spool -- durable spool of failed uploads."""
+
+import json
+
+from gate.spool import UploadSpool
+
+
+def _spool(tmp_path) -> UploadSpool:
+    return UploadSpool(str(tmp_path / "spool"))
+
+
+def _source(tmp_path):
+    source = tmp_path / "abc.jsonl"
+    source.write_bytes(b"a\n")
+    return source
+
+
+class TestUploadSpool:
+    def test_add_snapshots_file_content(self, tmp_path):
+        source = tmp_path / "abc.jsonl"
+        source.write_bytes(b'{"n": 1}\n')
+        spool = _spool(tmp_path)
+        spool.add("env/abc.jsonl", "abc", str(source))
+        source.write_bytes(b"rewritten\n")
+
+        [entry] = spool.entries()
+        assert (entry.key, entry.session_id, entry.source) == ("env/abc.jsonl", "abc", str(source))
+        with open(spool.data_path(entry), "rb") as f:
+            assert f.read() == b'{"n": 1}\n'
+
+    def test_add_snapshots_a_byte_range(self, tmp_path):
+        source = tmp_path / "abc.jsonl"
+        source.write_bytes(b'{"n": 1}\n{"n": 2}\n{"n": 3}\n')
+        spool = _spool(tmp_path)
+        spool.add("abc.deltas/depth-00001.jsonl", "abc", str(source), "delta", start=9, end=18)
+
+        [entry] = spool.entries()
+        assert (entry.reason, entry.size) == ("delta", 9)
+        with open(spool.data_path(entry), "rb") as f:
+            assert f.read() == b'{"n": 2}\n'
+
+    def test_respooling_replaces_snapshot_and_keeps_attempts(self, tmp_path):
+        source = tmp_path / "abc.jsonl"
+        source.write_bytes(b"a\n")
+        spool = _spool(tmp_path)
+        spool.add("abc.jsonl", "abc", str(source))
+        spool.failed(spool.entries()[0])
+        source.write_bytes(b"a\nb\n")
+        spool.add("abc.jsonl", "abc", str(source))
+
+        [entry] = spool.entries()
+        assert (entry.attempts, entry.size) == (1, 4)
+
+    def test_destinations_still_missing_the_object(self, tmp_path):
+        source = tmp_path / "abc.jsonl"
+        source.write_bytes(b"a\n")
+        spool = _spool(tmp_path)
+        spool.add("abc.jsonl", "abc", str(source), destinations=["s3://dr", "s3://audit"])
+
+        [entry] = spool.entries()
+        assert entry.destinations == ["s3://audit", "s3://dr"]
+        spool.failed(entry, ["s3://dr"])
+        [entry] = spool.entries()
+        assert (entry.attempts, entry.destinations) == (1, ["s3://dr"])
+
+    def test_record_without_destinations_goes_to_all(self, tmp_path):
+        spool = _spool(tmp_path)
+        spool.add("abc.jsonl", "abc", str(_source(tmp_path)))
+        record = spool._path("abc.jsonl", ".json")
+        with open(record) as f:
+            data = json.load(f)
+        del data["destinations"]
+        with open(record, "w") as f:
+            json.dump(data, f)
+
+        [entry] = spool.entries()
+        assert entry.destinations == []
+
+    def test_remove_deletes_record_and_data(self, tmp_path):
+        source = tmp_path / "abc.jsonl"
+        source.write_bytes(b"a\n")
+        spool = _spool(tmp_path)
+        spool.add("abc.jsonl", "abc", str(source))
+        spool.remove(spool.entries()[0])
+        assert spool.entries() == []
+        assert list((tmp_path / "spool").iterdir()) == []
+
+    def test_unreadable_or_orphaned_records_are_discarded(self, tmp_path, caplog):
+        spool_dir = tmp_path / "spool"
+        spool_dir.mkdir()
+        (spool_dir / "bad.json").write_text("{not json")
+        (spool_dir / "orphan.json").write_text(
+            json.dumps({"key": "k", "session_id": "s", "source": "x", "size": 1, "spooled_at": 0})
+        )
+        assert _spool(tmp_path).entries() == []
+        assert list(spool_dir.iterdir()) == []
+        assert "Discarding spool record without data: k" in caplog.text
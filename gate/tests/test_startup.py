@@ -0,0 +1,179 @@
+"""Start-up benchmark for the gate CLI -- import-time budget and time to first output.
+
+The ``gate`` console script runs on every workflow cycle, so start-up cost is paid
+each time. What the workflow waits on is the decision output, which is written before
+any upload; it is timed separately from the process exit, which includes the upload.
+Budgets are generous defaults for slow CI runners and can be tightened (or loosened)
+with ``GATE_IMPORT_BUDGET_MS`` and ``GATE_STARTUP_BUDGET_MS``; each measurement takes
+the best of several runs to filter out scheduler noise.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+RUNS = 3
+IMPORT_BUDGET_MS = float(os.environ.get("GATE_IMPORT_BUDGET_MS", "250"))
+STARTUP_BUDGET_MS = float(os.environ.get("GATE_STARTUP_BUDGET_MS", "1500"))
+
+# Modules a decision-only run must never load: they belong to the upload stack
+UPLOAD_ONLY_MODULES = (
+    "boto3",
+    "botocore",
+    "multiprocessing",
+    "gate.transcript_upload",
+    "gate.redaction",
+    "gate.multipart",
+)
+
+
+def _python(*args: str, env: dict[str, str] | None = None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        check=True,
+    )
+
+
+def _import_ms(module: str) -> float:
+    """Cumulative import time of ``module`` in a fresh interpreter, in ms."""
+    stderr = _python("-X", "importtime", "-c", f"import {module}").stderr
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", stderr, re.M)
+    assert match, stderr
+    return int(match.group(1)) / 1000
+
+
+def _run_gate_ms(work_dir, env: dict[str, str] | None = None) -> tuple[float, float]:
+    """Wall time of a ``python -m gate`` run to its decision output and to exit, in ms."""
+    output = work_dir / "output.txt"
+    output.unlink(missing_ok=True)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gate",
+            "--depth",
+            "0",
+            "--max-depth",
+            "5",
+            "--output",
+            str(output),
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "WORK_DIR": str(work_dir), **(env or {})},
+    )
+    first_output = None
+    while first_output is None and proc.poll() is None:
+        if output.exists() and output.read_text() == "true\n":
+            first_output = (time.perf_counter() - started) * 1000
+        else:
+            time.sleep(0.001)
+    assert proc.wait(timeout=60) == 0
+    exited = (time.perf_counter() - started) * 1000
+    assert output.read_text() == "true\n"
+    return first_output if first_output is not None else exited, exited
+
+
+class _FakeS3Handler(BaseHTTPRequestHandler):
+    """Accepts every PUT like S3 would; the server counts them in ``puts``."""
+
+    def do_PUT(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.puts.append(self.path)  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header("ETag", '"0"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def s3_endpoint() -> Iterator[ThreadingHTTPServer]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeS3Handler)
+    server.puts = []  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _upload_env(server: ThreadingHTTPServer) -> dict[str, str]:
+    host, port = server.server_address[:2]
+    return {
+        "AWS_S3_BUCKET_NAME": "bucket",
+        "AWS_ENDPOINT_URL": f"http://{host}:{port}",
+        "AWS_ACCESS_KEY_ID": "test",
+        "AWS_SECRET_ACCESS_KEY": "test",
+        "AWS_EC2_METADATA_DISABLED": "true",
+    }
+
+
+class TestStartup:
+    def test_decision_path_does_not_load_upload_stack(self):
+        loaded = _python("-c", "import sys, gate.cli; print(' '.join(sys.modules))").stdout.split()
+        assert [m for m in UPLOAD_ONLY_MODULES if m in loaded] == []
+
+    def test_cli_import_within_budget(self):
+        best = min(_import_ms("gate.cli") for _ in range(RUNS))
+        print(f"\ngate.cli import: {best:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+        assert best <= IMPORT_BUDGET_MS
+
+    @pytest.mark.parametrize(
+        "env",
+        [
+            pytest.param({"AWS_S3_BUCKET_NAME": ""}, id="decision-only"),
+            pytest.param({"AWS_S3_BUCKET_NAME": "bucket"}, id="upload-nothing-to-send"),
+        ],
+    )
+    def test_time_to_output_within_budget(self, tmp_path, env):
+        runs = [_run_gate_ms(tmp_path, env) for _ in range(RUNS)]
+        first_output, exited = min(r[0] for r in runs), min(r[1] for r in runs)
+        print(
+            f"\ngate run: output {first_output:.1f} ms, exit {exited:.1f} ms"
+            f" (budget {STARTUP_BUDGET_MS:.0f} ms)"
+        )
+        assert first_output <= STARTUP_BUDGET_MS
+
+    def test_time_to_output_with_a_transcript_to_upload(self, tmp_path, s3_endpoint):
+        """The upload (boto3 import, client, PUT) must not delay the decision output."""
+        (tmp_path / ".transcripts").mkdir()
+        (tmp_path / ".transcripts" / "abc.jsonl").write_text('{"n": 1}\n')
+        runs = [_run_gate_ms(tmp_path, _upload_env(s3_endpoint)) for _ in range(RUNS)]
+        first_output, exited = min(r[0] for r in runs), min(r[1] for r in runs)
+        print(
+            f"\ngate run with upload: output {first_output:.1f} ms, exit {exited:.1f} ms"
+            f" (budget {STARTUP_BUDGET_MS:.0f} ms)"
+        )
+        assert len(s3_endpoint.puts) == RUNS
+        assert first_output <= STARTUP_BUDGET_MS
+
+    def test_upload_path_without_transcripts_skips_boto3(self, tmp_path):
+        result = _python(
+            "-X",
+            "importtime",
+            "-m",
+            "gate",
+            "--depth",
+            "0",
+            "--max-depth",
+            "5",
+            "--output",
+            str(tmp_path / "output.txt"),
+            env={"WORK_DIR": str(tmp_path), "AWS_S3_BUCKET_NAME": "bucket"},
+        )
+        assert "No transcript files found" in result.stderr
+        assert not re.search(r"\| +boto3$", result.stderr, re.M)
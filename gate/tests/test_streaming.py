@@ -0,0 +1,132 @@
+"""Tests for gate.streaming -- buffer pool, buffer-backed bodies and checksums."""
+
+import base64
+import hashlib
+import io
+import threading
+import zlib
+
+import pytest
+
+from gate.streaming import BufferBody, BufferPool, Checksum, checksum_kwargs, fill, iter_parts
+
+
+class TestBufferPool:
+    def test_reuses_released_buffers(self):
+        pool = BufferPool(16, 2)
+        with pool.buffer() as first:
+            pass
+        with pool.buffer() as second:
+            assert second is first
+        assert pool.allocated == 1
+
+    def test_allocates_at_most_count_buffers(self):
+        pool = BufferPool(16, 2)
+        a, b = pool.acquire(), pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        waiter.start()
+        waiter.join(timeout=0.05)
+        assert waiter.is_alive(), "third acquire must block until a buffer is released"
+
+        pool.release(a)
+        waiter.join(timeout=1)
+        assert acquired == [a]
+        assert pool.allocated == 2
+        pool.release(b)
+
+
+class TestFill:
+    def test_fills_view_up_to_its_length(self):
+        buf = bytearray(4)
+        n = fill(io.BytesIO(b"0123456789"), memoryview(buf))
+        assert (n, bytes(buf)) == (4, b"0123")
+
+    def test_stops_at_eof(self):
+        buf = bytearray(8)
+        assert fill(io.BytesIO(b"abc"), memoryview(buf)) == 3
+
+
+class TestIterParts:
+    def test_fixed_size_parts(self):
+        parts = iter_parts(io.BytesIO(b"0123456789"), bytearray(4))
+        assert [(bytes(v), end) for v, end in parts] == [
+            (b"0123", 4),
+            (b"4567", 8),
+            (b"89", 10),
+        ]
+
+    def test_starts_at_offset(self):
+        parts = iter_parts(io.BytesIO(b"0123456789"), bytearray(4), start=6)
+        assert [(bytes(v), end) for v, end in parts] == [(b"6789", 10)]
+
+    def test_line_aligned_parts_end_at_newlines(self):
+        data = b"aaaa\nbb\ncccccc\nd\n"
+        parts = [bytes(v) for v, _ in iter_parts(io.BytesIO(data), bytearray(8), line_aligned=True)]
+        assert parts == [b"aaaa\nbb\n", b"cccccc\n", b"d\n"]
+        assert b"".join(parts) == data
+
+    def test_line_aligned_falls_back_to_full_part_without_late_newline(self):
+        data = b"a\nbbbbbbbbbb"
+        parts = [bytes(v) for v, _ in iter_parts(io.BytesIO(data), bytearray(8), line_aligned=True)]
+        assert parts == [b"a\nbbbbbb", b"bbbb"]
+
+    def test_line_aligned_respects_min_part(self):
+        data = b"aaaaa\nbbbbbbbb"
+        parts = iter_parts(io.BytesIO(data), bytearray(8), line_aligned=True, min_part=7)
+        assert [bytes(v) for v, _ in parts] == [b"aaaaa\nbb", b"bbbbbb"]
+
+
+class TestBufferBody:
+    def test_reads_view_contents(self):
+        body = BufferBody(memoryview(b"hello world")[:5])
+        assert body.read() == b"hello"
+        assert body.read() == b""
+
+    def test_seek_allows_rereading_for_retries(self):
+        body = BufferBody(memoryview(b"payload"))
+        body.read(3)
+        body.seek(0)
+        assert body.read() == b"payload"
+
+    def test_length_via_len_and_seek_end(self):
+        body = BufferBody(memoryview(b"payload"))
+        assert len(body) == 7
+        assert body.seek(0, io.SEEK_END) == 7
+        assert body.tell() == 7
+
+    def test_rejects_negative_position(self):
+        with pytest.raises(ValueError):
+            BufferBody(memoryview(b"x")).seek(-1)
+
+    def test_copy_reads_independently_and_charges_same_hook(self):
+        reads = []
+        body = BufferBody(memoryview(b"payload"), on_read=reads.append)
+        body.read(3)
+        copy = body.copy()
+        assert copy.read() == b"payload"
+        assert body.read() == b"load"
+        assert reads == [3, 7, 4]
+
+
+class TestChecksum:
+    def test_crc32_matches_zlib_across_updates(self):
+        checksum = Checksum("CRC32")
+        checksum.update(b"hello ")
+        checksum.update(memoryview(b"world"))
+        expected = base64.b64encode(zlib.crc32(b"hello world").to_bytes(4, "big")).decode()
+        assert checksum.b64digest() == expected
+        assert checksum.param == "ChecksumCRC32"
+
+    def test_sha256_matches_hashlib(self):
+        checksum = Checksum("SHA256")
+        checksum.update(b"hello world")
+        expected = base64.b64encode(hashlib.sha256(b"hello world").digest()).decode()
+        assert checksum.b64digest() == expected
+
+    def test_rejects_unknown_algorithm(self):
+        with pytest.raises(ValueError, match="unsupported"):
+            Checksum("MD5")
+
+    def test_checksum_kwargs_empty_when_disabled(self):
+        assert checksum_kwargs("", b"data") == {}
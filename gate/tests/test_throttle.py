@@ -0,0 +1,103 @@
+"""Tests for gate.throttle -- shared token bucket and per-file minimum share."""
+
+import pytest
+
+from gate.streaming import BufferBody
+from gate.throttle import TokenBucket
+
+
+class FakeClock:
+    """Deterministic clock whose sleep() advances time instantly."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def _bucket(clock, rate, burst=0, min_share=0) -> TokenBucket:
+    return TokenBucket(rate, burst, min_share, clock=clock, sleep=clock.sleep)
+
+
+class TestTokenBucket:
+    def test_burst_is_sent_without_waiting(self, clock):
+        bucket = _bucket(clock, rate=100, burst=100)
+        bucket.consume(100)
+        assert clock.slept == []
+
+    def test_sustained_rate_is_capped(self, clock):
+        bucket = _bucket(clock, rate=100, burst=100)
+        for _ in range(10):
+            bucket.consume(100)
+        # The burst covers the first read and the second is admitted into debt; each of
+        # the remaining eight waits one second for its predecessor's 100 bytes
+        assert clock.now == pytest.approx(8.0)
+
+    def test_read_larger_than_burst_is_admitted_as_debt(self, clock):
+        bucket = _bucket(clock, rate=100, burst=10)
+        bucket.consume(500)
+        assert clock.slept == []
+        bucket.consume(1)
+        assert clock.now == pytest.approx(4.9)
+
+    def test_idle_time_accumulates_at_most_burst(self, clock):
+        bucket = _bucket(clock, rate=100, burst=50)
+        bucket.consume(50)
+        clock.now += 60
+        bucket.consume(50)  # the refill is capped at the 50-byte burst...
+        bucket.consume(50)  # ...so this read goes into debt
+        bucket.consume(1)
+        assert clock.now == pytest.approx(60.5)
+
+    def test_default_burst_is_fraction_of_rate(self):
+        assert TokenBucket(1000).burst == pytest.approx(100)
+
+    def test_rejects_non_positive_rate(self):
+        with pytest.raises(ValueError, match="rate must be positive"):
+            TokenBucket(0)
+
+
+class TestMinimumShare:
+    def test_stream_sends_at_min_share_while_bucket_is_in_debt(self, clock):
+        bucket = _bucket(clock, rate=100, burst=1, min_share=10)
+        bucket.consume(1000)  # another file drives the bucket 10 s into debt
+        stream = bucket.stream()
+        stream(10)  # initial allowance
+        stream(10)  # admitted into allowance debt
+        stream(10)
+        assert clock.now == pytest.approx(1.0)
+
+    def test_guaranteed_bytes_are_charged_to_the_bucket(self, clock):
+        bucket = _bucket(clock, rate=100, burst=1, min_share=10)
+        bucket.consume(1000)
+        stream = bucket.stream()
+        stream(10)
+        bucket.consume(1)  # a read without a share repays the whole debt
+        assert clock.now == pytest.approx(10.09)
+
+    def test_stream_without_min_share_waits_for_bucket(self, clock):
+        bucket = _bucket(clock, rate=100, burst=1)
+        bucket.consume(1000)
+        bucket.stream()(10)
+        assert clock.now == pytest.approx(9.99)
+
+
+class TestBufferBodyReadHook:
+    def test_on_read_receives_read_sizes(self):
+        reads = []
+        body = BufferBody(memoryview(b"0123456789"), on_read=reads.append)
+        body.read(4)
+        body.read(100)
+        body.read(1)
+        assert reads == [4, 6]
@@ -0,0 +1,92 @@
+"""Tests for gate.upload_policy -- which gate cycles upload transcripts."""
+
+import pytest
+
+from gate.config import TranscriptUploadConfig
+from gate.upload_policy import (
+    due_regardless,
+    file_sizes,
+    new_bytes,
+    record_upload,
+    should_upload,
+)
+
+
+def _config(**kwargs) -> TranscriptUploadConfig:
+    return TranscriptUploadConfig(bucket_name="b", region="r", **kwargs)
+
+
+def _transcripts(tmp_path, main=b"", sub=b""):
+    transcripts = tmp_path / ".transcripts"
+    (transcripts / "abc" / "subagents").mkdir(parents=True, exist_ok=True)
+    (transcripts / "abc.jsonl").write_bytes(main)
+    (transcripts / "abc" / "subagents" / "agent-1.jsonl").write_bytes(sub)
+    return str(transcripts)
+
+
+class TestShouldUpload:
+    @pytest.mark.parametrize("policy", ["always", "every", "final", "bytes"])
+    def test_final_cycle_always_uploads(self, tmp_path, policy):
+        config = _config(upload_policy=policy, upload_every=100, upload_min_bytes=10**9)
+        assert should_upload(config, str(tmp_path), str(tmp_path), 3, final=True)[0]
+
+    def test_always(self, tmp_path):
+        assert should_upload(_config(), str(tmp_path), str(tmp_path), 3, final=False)[0]
+
+    def test_every_n_cycles(self, tmp_path):
+        config = _config(upload_policy="every", upload_every=3)
+        due = [should_upload(config, "", "", depth, final=False)[0] for depth in range(7)]
+        assert due == [False, False, True, False, False, True, False]
+
+    def test_final_only(self, tmp_path):
+        config = _config(upload_policy="final")
+        assert not should_upload(config, "", "", 0, final=False)[0]
+
+    def test_bytes_threshold(self, tmp_path):
+        transcripts = _transcripts(tmp_path, main=b"x" * 60, sub=b"y" * 50)
+        state = str(tmp_path / ".gate")
+        config = _config(upload_policy="bytes", upload_min_bytes=100)
+
+        assert should_upload(config, transcripts, state, 0, final=False) == (
+            True,
+            "110 new byte(s), threshold 100",
+        )
+        record_upload(transcripts, state)
+        _transcripts(tmp_path, main=b"x" * 100, sub=b"y" * 50)
+        assert not should_upload(config, transcripts, state, 1, final=False)[0]
+
+
+class TestDueRegardless:
+    @pytest.mark.parametrize(
+        ("policy", "depth", "due"),
+        [
+            ("always", 0, True),
+            ("every", 0, False),
+            ("every", 1, True),
+            ("final", 1, False),
+            ("bytes", 1, False),
+        ],
+    )
+    def test_known_before_the_decision(self, policy, depth, due):
+        assert due_regardless(_config(upload_policy=policy, upload_every=2), depth) is due
+
+
+class TestSizes:
+    def test_counts_main_and_subagent_files(self, tmp_path):
+        transcripts = _transcripts(tmp_path, main=b"ab", sub=b"abc")
+        assert sorted(file_sizes(transcripts).values()) == [2, 3]
+
+    def test_missing_dir(self, tmp_path):
+        assert file_sizes(str(tmp_path / "missing")) == {}
+
+    def test_new_files_count_in_full(self, tmp_path):
+        transcripts = _transcripts(tmp_path, main=b"ab", sub=b"abc")
+        state = str(tmp_path / ".gate")
+        record_upload(transcripts, state)
+        (tmp_path / ".transcripts" / "def.jsonl").write_bytes(b"12345")
+        assert new_bytes(transcripts, state) == 5
+
+    def test_unreadable_state_counts_everything(self, tmp_path):
+        transcripts = _transcripts(tmp_path, main=b"ab", sub=b"abc")
+        (tmp_path / "upload_policy.json").write_text("[")
+        assert new_bytes(transcripts, str(tmp_path)) == 5
@@ -0,0 +1,106 @@
+"""Tests for gate.upload_setup -- client set-up and scan overlapped with the decision."""
+
+import logging
+import threading
+import time
+
+import pytest
+
+import gate.transcript_upload as tu
+from gate import upload_setup
+from gate.config import TranscriptUploadConfig
+from gate.upload_setup import Phase, UploadSetup
+from tests.conftest import FakeS3
+
+
+def _config(**kwargs) -> TranscriptUploadConfig:
+    return TranscriptUploadConfig(bucket_name="b", region="r", **kwargs)
+
+
+class TestPhase:
+    def test_result(self):
+        assert Phase("p", lambda: 42).result() == 42
+
+    def test_error_is_raised_by_result(self):
+        def fail() -> None:
+            raise RuntimeError("sts down")
+
+        phase = Phase("p", fail)
+        with pytest.raises(RuntimeError, match="sts down"):
+            phase.result()
+
+    def test_runs_in_the_background(self):
+        release = threading.Event()
+        phase = Phase("p", lambda: release.wait(5))
+        assert not release.is_set()
+        release.set()
+        assert phase.result() is True
+        assert phase.seconds < 5
+
+
+class TestUploadSetup:
+    def test_scans_then_builds_the_client(self, tmp_path, monkeypatch, caplog):
+        (tmp_path / "abc.jsonl").write_text("x")
+        s3 = FakeS3()
+        monkeypatch.setattr(tu, "prepare_uploader", lambda config: (config, s3))
+
+        setup = UploadSetup(_config(), str(tmp_path), str(tmp_path / ".gate"))
+        with caplog.at_level(logging.INFO, logger="gate"):
+            assert setup.uploader() == (setup.config, s3)
+        assert setup.transcript_files() == [str(tmp_path / "abc.jsonl")]
+        assert "Upload set-up: scan=" in caplog.text
+
+    def test_no_client_when_nothing_to_send(self, tmp_path, monkeypatch):
+        def unexpected(config):
+            raise AssertionError("client built for an empty run")
+
+        monkeypatch.setattr(tu, "prepare_uploader", unexpected)
+        setup = UploadSetup(_config(), str(tmp_path / "missing"), str(tmp_path / ".gate"))
+        assert setup.uploader() == (setup.config, None)
+        assert setup.transcript_files() == []
+
+    def test_spooled_uploads_need_the_client(self, tmp_path, monkeypatch):
+        spool = tmp_path / ".gate" / "spool"
+        spool.mkdir(parents=True)
+        (spool / "entry.json").write_text("{}")
+        s3 = FakeS3()
+        monkeypatch.setattr(tu, "prepare_uploader", lambda config: (config, s3))
+
+        setup = UploadSetup(_config(), str(tmp_path / "missing"), str(tmp_path / ".gate"))
+        assert setup.uploader()[1] is s3
+
+    def test_client_error_surfaces_on_use(self, tmp_path, monkeypatch):
+        (tmp_path / "abc.jsonl").write_text("x")
+
+        def sts_down(config):
+            raise RuntimeError("AssumeRole failed")
+
+        monkeypatch.setattr(tu, "prepare_uploader", sts_down)
+        setup = UploadSetup(_config(), str(tmp_path), str(tmp_path / ".gate"))
+        with pytest.raises(RuntimeError, match="AssumeRole failed"):
+            setup.uploader()
+
+
+class TestStart:
+    def test_started_when_the_cycle_uploads_anyway(self, tmp_path):
+        setup = upload_setup.start(_config(), str(tmp_path), str(tmp_path), 0)
+        assert isinstance(setup, UploadSetup)
+        setup.uploader()
+
+    def test_not_started_when_the_decision_decides(self, tmp_path):
+        config = _config(upload_policy="final")
+        assert upload_setup.start(config, str(tmp_path), str(tmp_path), 0) is None
+
+    def test_overlaps_setup_with_work_on_the_main_thread(self, tmp_path, monkeypatch):
+        (tmp_path / "abc.jsonl").write_text("x")
+
+        def slow_client(config):
+            time.sleep(0.3)
+            return config, FakeS3()
+
+        monkeypatch.setattr(tu, "prepare_uploader", slow_client)
+        started = time.monotonic()
+        setup = upload_setup.start(_config(), str(tmp_path), str(tmp_path), 0)
+        time.sleep(0.3)  # the decision
+        setup.uploader()
+        assert time.monotonic() - started < 0.55